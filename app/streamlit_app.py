@@ -1,17 +1,40 @@
 import os, sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import time
+from functools import partial
 
-import json
 import streamlit as st
 
-from qdrant_client import QdrantClient
-from sentence_transformers import SentenceTransformer
-
-from src.retrieval.hybrid_retriever import build_bm25
+# modul src di bawah ringan saat di-import; torch/transformers/langchain/qdrant
+# baru di-import di loader komponen (lihat get_retrieval_stack / get_llm_components)
+from src.retrieval.hybrid_retriever import build_bm25, load_chunks_payload, QueryEmbeddingCache
 from src.retrieval.reranker import Reranker
+from src.retrieval.section_index import SectionIndex, section_members
 from src.retrieval.query_transform import QueryTransformer
 from src.retrieval.crag import crag_retrieve
+from src.retrieval.followup import ConversationState, followup_retrieve
 from src.generation.ollama_generate import OllamaAnswerer
+from src.utils.admission import AdmissionController, LoadShedError, degradation_plan
+from src.utils.cache import LRUCache
+from src.utils.llm_client import get_llm_client, is_timeout_error
+from src.utils.query_log import QUERY_LOG_PATH, QueryLog, top_questions, start_replay
+from src.utils.qdrant_conn import get_qdrant_client
+from src.utils.startup import ComponentRegistry
+from src.utils.timing import Deadline, STAGE_STATS
+
+# background (default): load di thread saat app start | lazy: load saat pertama dipakai | eager: load semua sebelum render
+STARTUP_MODE = os.environ.get("CRAG_STARTUP", "background")
+# jumlah pertanyaan terpopuler (dari query log) yang di-replay saat app start; 0 = off
+WARMUP_TOP_N = int(os.environ.get("CRAG_WARMUP_TOP_N", "20"))
+# request yang boleh diproses bersamaan (lintas sesi); di atas ini request ditolak
+MAX_IN_FLIGHT = int(os.environ.get("CRAG_MAX_IN_FLIGHT", "8"))
+# default setting UI; warm-up memakai setting yang sama supaya cache yang diisi kena di request asli
+CRAG_MODES = ("sequential", "fusion")
+DEFAULT_CRAG_MODE = os.environ.get("CRAG_MODE", "sequential")
+DEFAULT_USE_SECTIONS = os.environ.get("CRAG_SECTIONS", "0") == "1"
+DEFAULT_FAST_PATH = os.environ.get("CRAG_FAST_PATH", "0") == "1"
+DEFAULT_MIN_RERANK = 0.10
+DEFAULT_MIN_COV = 0.05
 
 
 st.set_page_config(
@@ -245,28 +268,126 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 @st.cache_resource
-def load_components(ollama_model: str):
-    client = QdrantClient(url="http://localhost:6333")
-    embedder = SentenceTransformer("intfloat/multilingual-e5-small")
-    reranker = Reranker("BAAI/bge-reranker-base", device=None)
+def get_retrieval_stack() -> ComponentRegistry:
+    """
+    Stack retrieval (Qdrant, embedder, reranker, chunk store, BM25, section index, section members):
+    1x per proses, di-share semua sesi, TIDAK tergantung model LLM.
+    """
+    reg = ComponentRegistry(mode=STARTUP_MODE, profile_path="logs/startup_profile.jsonl", name="retrieval")
+
+    def load_client():
+        # transport (rest / grpc / embedded) dari index config atau env QDRANT_TRANSPORT
+        return get_qdrant_client()
+
+    def load_embedder():
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer("intfloat/multilingual-e5-small")
+
+    def load_bm25():
+        return build_bm25(reg.get("chunks"))
+
+    def load_sections():
+        # index level section (dibuat index_qdrant.py); opsional
+        return SectionIndex.load("data/sections.jsonl") if os.path.exists("data/sections.jsonl") else None
+
+    reg.add("client", load_client, imports=("qdrant_client",))
+    reg.add("embedder", load_embedder, imports=("torch", "sentence_transformers"))
+    reg.add("reranker", lambda: Reranker("BAAI/bge-reranker-base", device=None, cache=LRUCache(maxsize=50000)),
+            imports=("torch", "sentence_transformers"))
+    reg.add("chunks", lambda: load_chunks_payload("data/chunks.jsonl"))
+    reg.add("bm25", load_bm25, imports=("rank_bm25",))
+    reg.add("sections", load_sections, imports=("rank_bm25",))
+    reg.add("section_members", lambda: section_members(reg.get("chunks")))  # (bab, section) -> chunk, untuk follow-up
+    return reg.start()
+
+
+@st.cache_resource
+def get_llm_components(ollama_model: str) -> ComponentRegistry:
+    """
+    Client LLM per model: murah (tanpa bobot model di proses ini), jadi ganti /
+    A/B model tidak me-reload atau menggandakan stack retrieval.
+    """
+    reg = ComponentRegistry(mode=STARTUP_MODE, profile_path="logs/startup_profile.jsonl", name=f"llm:{ollama_model}")
+
+    def load_llm():
+        llm = get_llm_client(
+            ollama_model,
+            keep_alive=os.environ.get("OLLAMA_KEEP_ALIVE", "30m"),
+            max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", "2")),
+            timeout=float(os.environ.get("LLM_TIMEOUT", "120")),
+        )
+        try:
+            llm.warmup()  # load model ke Ollama sebelum pertanyaan pertama
+        except Exception as e:
+            print(f"[warmup] Ollama warm-up gagal: {e}")
+        return (
+            QueryTransformer(ollama_model=ollama_model, temperature=0.0, llm=llm, cache=LRUCache(maxsize=2048)),
+            OllamaAnswerer(model=ollama_model, temperature=0.1, llm=llm, cache=LRUCache(maxsize=2048)),
+        )
+
+    reg.add("llm", load_llm, imports=("langchain_core", "langchain_ollama"))
+    return reg.start()
+
+
+@st.cache_resource
+def load_embed_cache():
+    # satu cache untuk semua sesi
+    return QueryEmbeddingCache("intfloat/multilingual-e5-small", maxsize=4096)
+
+
+@st.cache_resource
+def get_admission() -> AdmissionController:
+    # 1 controller per proses: in-flight dihitung lintas semua sesi
+    return AdmissionController(max_in_flight=MAX_IN_FLIGHT)
 
-    chunks = [json.loads(l) for l in open("data/chunks.jsonl", "r", encoding="utf-8")]
-    chunks_payload = [{
-        "chunk_id": c["chunk_id"],
-        "text": c["text"],
-        "bab": c.get("bab",""),
-        "section": c.get("section",""),
-        "subsection": c.get("subsection",""),
-        "page_start": c.get("page_start"),
-        "page_end": c.get("page_end"),
-    } for c in chunks]
 
-    bm25 = build_bm25(chunks_payload)
+@st.cache_resource
+def get_query_log() -> QueryLog:
+    return QueryLog(QUERY_LOG_PATH)
 
-    qt = QueryTransformer(ollama_model=ollama_model, temperature=0.0)
-    answerer = OllamaAnswerer(model=ollama_model, temperature=0.1)
 
-    return client, embedder, reranker, chunks_payload, bm25, qt, answerer
+@st.cache_resource
+def start_warmup(_ollama_model: str):
+    """
+    1x per proses: replay top-N pertanyaan dari query log di background,
+    supaya model ter-load dan cache embedding/rerank/transform/answer terisi sebelum traffic asli.
+    Setting retrieval = default UI (DEFAULT_*), dan tiap replay lewat admission control seperti
+    request biasa (ikut dihitung in-flight, ikut degradasi; ditolak kalau penuh).
+    Argumen ber-underscore tidak ikut key cache Streamlit: ganti model di UI tidak me-replay ulang;
+    yang di-warm model yang aktif saat proses start.
+    """
+    questions = top_questions(QUERY_LOG_PATH, n=WARMUP_TOP_N) if WARMUP_TOP_N > 0 else []
+    stack = get_retrieval_stack()
+    llm_components = get_llm_components(_ollama_model)
+    embed_cache = load_embed_cache()
+    admission = get_admission()
+
+    def run_one(q: str) -> None:
+        qt, answerer = llm_components.get("llm")
+        plan = degradation_plan(admission.acquire(llm=answerer.llm))  # LoadShedError: dicatat replay, lanjut
+        try:
+            top, _ = crag_retrieve(
+                question=q,
+                client=stack.get("client"),
+                embedder=stack.get("embedder"),
+                chunks_payload=stack.get("chunks"),
+                bm25=stack.get("bm25"),
+                reranker=stack.get("reranker"),
+                qt=qt,
+                min_rerank=DEFAULT_MIN_RERANK,
+                min_cov=DEFAULT_MIN_COV,
+                mode=DEFAULT_CRAG_MODE,
+                embed_cache=embed_cache,
+                sections=stack.get("sections") if DEFAULT_USE_SECTIONS else None,
+                variants=None if plan["transform"] else [q],
+                corrective=plan["corrective"],
+                k_pool=plan["k_pool"],
+            )
+            answerer.answer(q, top, fast_path=DEFAULT_FAST_PATH, extractive_only=plan["extractive_only"])
+        finally:
+            admission.release()
+
+    return start_replay(questions, run_one)
 
 
 def rujukan_str(p):
@@ -292,14 +413,35 @@ with st.expander("Pengaturan", expanded=False):
         ollama_model = st.text_input("Model Ollama", value="qwen2.5:7b-instruct")
     
     with col_set2:
-        min_rerank = st.slider("Min Rerank Score", 0.0, 1.0, 0.10, 0.01)
-        min_cov = st.slider("Min Coverage", 0.0, 1.0, 0.05, 0.01)
+        min_rerank = st.slider("Min Rerank Score", 0.0, 1.0, DEFAULT_MIN_RERANK, 0.01)
+        min_cov = st.slider("Min Coverage", 0.0, 1.0, DEFAULT_MIN_COV, 0.01)
+        budget_ms = st.number_input("Budget latency (ms, 0 = tanpa batas)", min_value=0, max_value=120000,
+                                    value=int(os.environ.get("CRAG_BUDGET_MS", "0")), step=1000)
     
     with col_set3:
+        crag_mode = st.selectbox("Mode Retrieval", CRAG_MODES, index=CRAG_MODES.index(DEFAULT_CRAG_MODE))
+        use_sections = st.checkbox("Section-first (hierarchical)", value=DEFAULT_USE_SECTIONS)
+        fast_path = st.checkbox("Fast path ekstraktif (tanpa LLM)", value=DEFAULT_FAST_PATH)
+        conversation = st.checkbox("Mode percakapan (follow-up)", value=False)
         show_debug = st.checkbox("Tampilkan Debug Info", value=False)
 
-# Load components
-client, embedder, reranker, chunks_payload, bm25, qt, answerer = load_components(ollama_model)
+# Components: di-load di background / saat pertama dipakai (CRAG_STARTUP)
+stack = get_retrieval_stack()
+llm_components = get_llm_components(ollama_model)
+embed_cache = load_embed_cache()
+query_log = get_query_log()
+admission = get_admission()
+start_warmup(ollama_model)
+
+n_total = len(stack.components) + len(llm_components.components)
+n_ready = stack.n_ready() + llm_components.n_ready()
+if n_ready < n_total:
+    st.caption(f"Memuat model di background... ({n_ready}/{n_total} komponen siap)")
+
+if show_debug:
+    with st.expander("Startup Profile", expanded=False):
+        st.caption(f"mode: {stack.mode} (import/load dalam detik, ready_at_s sejak proses start)")
+        st.table(stack.profile.report() + llm_components.profile.report())
 
 st.markdown("---")
 
@@ -311,30 +453,100 @@ question = st.text_input(
     label_visibility="collapsed"
 )
 
+# state retrieval per sesi browser (pool + section turn sebelumnya)
+if "conversation" not in st.session_state:
+    st.session_state["conversation"] = ConversationState()
+conv_state = st.session_state["conversation"]
+
+if conversation and conv_state.has_context:
+    col_conv1, col_conv2 = st.columns([4, 1])
+    with col_conv1:
+        st.caption(f"Follow-up dari: \"{conv_state.question}\" ({conv_state.turns} turn)")
+    with col_conv2:
+        if st.button("Reset percakapan"):
+            conv_state.clear()
+
 if st.button("Dapatkan Jawaban"):
     if not question:
         st.warning("Silakan masukkan pertanyaan terlebih dahulu!")
     else:
-        with st.spinner("Memproses pertanyaan Anda..."):
-            top, debug = crag_retrieve(
-                question=question,
-                client=client,
-                embedder=embedder,
-                chunks_payload=chunks_payload,
-                bm25=bm25,
-                reranker=reranker,
-                qt=qt,
-                min_rerank=min_rerank,
-                min_cov=min_cov,
-            )
+        t_start = time.perf_counter()
+        deadline = Deadline(budget_ms) if budget_ms > 0 else None  # 1 budget untuk retrieval + jawaban
+        qt, answerer = llm_components.get("llm")
+        try:
+            level = admission.acquire(llm=answerer.llm)
+        except LoadShedError as e:
+            st.error(str(e))
+            st.stop()
+        plan = degradation_plan(level)
+
+        try:
+            with st.spinner("Memproses pertanyaan Anda..."):
+                client = stack.get("client")
+                embedder = stack.get("embedder")
+                reranker = stack.get("reranker")
+                chunks_payload = stack.get("chunks")
+                bm25 = stack.get("bm25")
+                sections = stack.get("sections") if use_sections else None
+
+                retrieve_fn = crag_retrieve
+                if conversation:
+                    retrieve_fn = partial(followup_retrieve, state=conv_state,
+                                          section_map=stack.get("section_members"))
+                top, debug = retrieve_fn(
+                    question=question,
+                    client=client,
+                    embedder=embedder,
+                    chunks_payload=chunks_payload,
+                    bm25=bm25,
+                    reranker=reranker,
+                    qt=qt,
+                    min_rerank=min_rerank,
+                    min_cov=min_cov,
+                    mode=crag_mode,
+                    embed_cache=embed_cache,
+                    sections=sections,
+                    variants=None if plan["transform"] else [question],
+                    corrective=plan["corrective"],
+                    k_pool=plan["k_pool"],
+                    deadline=deadline,
+                )
+                ans = answerer.answer(question, top, fast_path=fast_path,
+                                      extractive_only=plan["extractive_only"], deadline=deadline)
+        except Exception as e:
+            # LLMBusyError / timeout httpx (Ollama, Qdrant) yang lolos dari fallback ekstraktif
+            if not is_timeout_error(e):
+                raise
+            st.error("Server sedang sibuk atau timeout. Silakan coba lagi beberapa saat lagi.")
+            st.stop()
+        finally:
+            admission.release()
+
+        query_log.append(
+            question, (time.perf_counter() - t_start) * 1000.0,
+            "answer" if top else "abstain", mode=debug["mode"], degradation_level=level,
+        )
+        debug["degradation_level"] = level
+        debug["degradation"] = plan["name"]
+        debug["admission"] = admission.stats()
+        debug["stage_estimates_ms"] = STAGE_STATS.snapshot()
+        debug["embed_cache"] = embed_cache.stats()
+        debug["answerer"] = answerer.stats()
+        debug["llm"] = answerer.llm.stats()
+        debug["caches"] = {
+            "transform": qt.cache.stats() if qt.cache is not None else None,
+            "rerank": reranker.cache.stats() if reranker.cache is not None else None,
+            "answer": answerer.cache.stats() if answerer.cache is not None else None,
+        }
 
         st.markdown("---")
-        
+        if level > 0:
+            st.caption(f"Beban tinggi: mode ringkas ({plan['name']}).")
+
         col1, col2 = st.columns([1, 1])
 
         with col1:
             st.markdown("## Jawaban")
-            ans = answerer.answer(question, top)
             st.markdown(f"""
             <div style='background: white; padding: 2rem; border-radius: 12px; 
                         box-shadow: 0 2px 8px rgba(0,0,0,0.08); 
@@ -0,0 +1,137 @@
+# Jawab banyak pertanyaan sekaligus (FAQ refresh / regression check).
+# Kerja di-batch lintas pertanyaan: embedding, Qdrant, cross-encoder, dan LLM call paralel.
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
+
+from sentence_transformers import SentenceTransformer
+
+from src.retrieval.hybrid_retriever import build_bm25, load_chunks_payload, QueryEmbeddingCache
+from src.retrieval.reranker import Reranker
+from src.retrieval.query_transform import QueryTransformer
+from src.retrieval.crag import crag_retrieve_batch
+from src.generation.ollama_generate import OllamaAnswerer
+from src.utils.llm_client import get_llm_client
+from src.utils.qdrant_conn import QDRANT_TRANSPORTS, get_qdrant_client
+from src.utils.timing import latency_summary
+
+
+def load_questions(path: str) -> List[Dict[str, Any]]:
+    """JSONL, per baris minimal {"question": "..."}; field lain (mis. "id") ikut ditulis ke output."""
+    return [json.loads(l) for l in open(path, "r", encoding="utf-8") if l.strip()]
+
+
+def transform_or_question(qt: QueryTransformer, question: str) -> List[str]:
+    """Query transform 1 pertanyaan; kalau gagal, pakai pertanyaan asli saja (batch tetap jalan)."""
+    try:
+        return qt.transform(question)
+    except Exception as e:
+        print(f"[transform] gagal untuk {question[:60]!r}: {e}")
+        return [question]
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, (time.perf_counter() - t0) * 1000.0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="inp", required=True, help="questions.jsonl")
+    ap.add_argument("--out", required=True, help="answers.jsonl")
+    ap.add_argument("--chunks", default="data/chunks.jsonl")
+    ap.add_argument("--transport", choices=QDRANT_TRANSPORTS, default=None, help="default: index config")
+    ap.add_argument("--qdrant_url", default=None, help="default: index config")
+    ap.add_argument("--ollama_model", default="qwen2.5:7b-instruct")
+    ap.add_argument("--batch_size", type=int, default=32, help="pertanyaan per batch retrieval")
+    ap.add_argument("--llm_concurrency", type=int, default=4, help="LLM call paralel ke Ollama")
+    ap.add_argument("--min_rerank", type=float, default=0.10)
+    ap.add_argument("--min_cov", type=float, default=0.05)
+    ap.add_argument("--no_transform", action="store_true", help="pakai pertanyaan asli saja (tanpa LLM transform)")
+    args = ap.parse_args()
+
+    client = get_qdrant_client(transport=args.transport, url=args.qdrant_url)
+    embedder = SentenceTransformer("intfloat/multilingual-e5-small")
+    reranker = Reranker("BAAI/bge-reranker-base", device=None)
+    chunks_payload = load_chunks_payload(args.chunks)
+    bm25 = build_bm25(chunks_payload)
+    embed_cache = QueryEmbeddingCache("intfloat/multilingual-e5-small", maxsize=16384)
+
+    llm = get_llm_client(args.ollama_model, max_concurrency=args.llm_concurrency)
+    qt = QueryTransformer(ollama_model=args.ollama_model, temperature=0.0, llm=llm)
+    answerer = OllamaAnswerer(model=args.ollama_model, temperature=0.1, llm=llm)
+
+    rows = load_questions(args.inp)
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    pool = ThreadPoolExecutor(max_workers=args.llm_concurrency)
+
+    t_start = time.perf_counter()
+    stage_ms: Dict[str, List[float]] = {"transform": [], "retrieve_batch": [], "answer": []}
+    n_answered = 0
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        for b in range(0, len(rows), args.batch_size):
+            batch = rows[b:b + args.batch_size]
+            questions = [r["question"] for r in batch]
+
+            # 1) query transform: LLM call paralel
+            if args.no_transform:
+                transformed = [([q], 0.0) for q in questions]
+            else:
+                transformed = list(pool.map(lambda q: timed(transform_or_question, qt, q), questions))
+            variants_list = [v for v, _ in transformed]
+
+            # 2) retrieval + rerank: 1 batch untuk semua pertanyaan
+            results, retrieve_ms = timed(lambda: crag_retrieve_batch(
+                questions, variants_list, client, embedder, chunks_payload, bm25, reranker,
+                min_rerank=args.min_rerank, min_cov=args.min_cov, embed_cache=embed_cache,
+            ))
+
+            # 3) answer: LLM call paralel
+            answered = list(pool.map(
+                lambda qt_: timed(answerer.answer, qt_[0], qt_[1]),
+                [(q, top) for q, (top, _) in zip(questions, results)],
+            ))
+
+            # retrieval jalan 1 batch: waktunya hanya dilaporkan per batch, bukan per pertanyaan
+            stage_ms["retrieve_batch"].append(retrieve_ms)
+            for r, (variants, t_ms), (top, debug), (ans, a_ms) in zip(batch, transformed, results, answered):
+                timings = {
+                    "transform_ms": t_ms,
+                    "retrieve_batch_ms": retrieve_ms,
+                    "batch_size": len(batch),
+                    "answer_ms": a_ms,
+                }
+                stage_ms["transform"].append(t_ms)
+                stage_ms["answer"].append(a_ms)
+                n_answered += bool(top)
+                f.write(json.dumps({
+                    **r,
+                    "answer": ans,
+                    "evidence_ids": [t["chunk_id"] for t in top],
+                    "attempts": debug["attempts"],
+                    "timings": timings,
+                }, ensure_ascii=False) + "\n")
+
+            done = b + len(batch)
+            print(f"[{done}/{len(rows)}] {done / (time.perf_counter() - t_start):.2f} q/s")
+
+    pool.shutdown()
+    total_s = time.perf_counter() - t_start
+    print(f"\nSaved {len(rows)} answers to {args.out}")
+    print(f"total {total_s:.1f}s, {len(rows) / max(total_s, 1e-9):.2f} questions/s, answered {n_answered}/{len(rows)}")
+    for stage, values in stage_ms.items():
+        summ = latency_summary(values)
+        print(f"  {stage:<14} mean {summ['mean_ms']:8.1f} ms  p95 {summ['p95_ms']:8.1f} ms")
+    print(f"  answerer       {answerer.stats()}")
+    print(f"  embed cache hit rate {embed_cache.stats()['hit_rate']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# Bandingkan crag_retrieve mode "sequential" vs "fusion": latency + recall@k.
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import json
+import time
+from typing import Dict, Any, List
+
+from qdrant_client import QdrantClient
+from sentence_transformers import SentenceTransformer
+
+from src.retrieval.hybrid_retriever import build_bm25, load_chunks_payload
+from src.retrieval.reranker import Reranker
+from src.retrieval.query_transform import QueryTransformer
+from src.retrieval.crag import crag_retrieve
+from src.utils.timing import latency_summary
+
+MODES = ("sequential", "fusion")
+
+
+def load_questions(path: str) -> List[Dict[str, Any]]:
+    """
+    JSONL, per baris: {"question": "...", "gold_chunk_ids": ["p12_p13_00042", ...]}
+    gold_chunk_ids opsional; tanpa gold hanya latency yang dilaporkan.
+    """
+    return [json.loads(l) for l in open(path, "r", encoding="utf-8") if l.strip()]
+
+
+def recall_at_k(top: List[Dict[str, Any]], gold: List[str], k: int) -> float:
+    if not gold:
+        return 0.0
+    got = {t["chunk_id"] for t in top[:k]}
+    return sum(1 for g in gold if g in got) / len(gold)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--questions", required=True, help="questions.jsonl")
+    ap.add_argument("--chunks", default="data/chunks.jsonl")
+    ap.add_argument("--qdrant_url", default="http://localhost:6333")
+    ap.add_argument("--ollama_model", default="qwen2.5:7b-instruct")
+    ap.add_argument("--k_final", type=int, default=6)
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--out", default="", help="opsional: simpan hasil per pertanyaan (jsonl)")
+    args = ap.parse_args()
+
+    client = QdrantClient(url=args.qdrant_url)
+    embedder = SentenceTransformer("intfloat/multilingual-e5-small")
+    reranker = Reranker("BAAI/bge-reranker-base", device=None)
+    chunks_payload = load_chunks_payload(args.chunks)
+    bm25 = build_bm25(chunks_payload)
+    qt = QueryTransformer(ollama_model=args.ollama_model, temperature=0.0)
+
+    questions = load_questions(args.questions)
+
+    # query transform sekali per pertanyaan, supaya yang dibandingkan hanya retrieval
+    for q in questions:
+        q["variants"] = qt.transform(q["question"], max_variants=6)
+
+    # Mode di-interleave per pertanyaan dan urutannya digilir, supaya cache yang dipanaskan
+    # satu mode (page cache Qdrant, encoder/reranker) tidak selalu menguntungkan mode berikutnya.
+    rows = []
+    for rep in range(args.repeat):
+        for qi, q in enumerate(questions):
+            shift = (qi + rep) % len(MODES)
+            for mode in MODES[shift:] + MODES[:shift]:
+                t0 = time.perf_counter()
+                top, debug = crag_retrieve(
+                    question=q["question"],
+                    client=client,
+                    embedder=embedder,
+                    chunks_payload=chunks_payload,
+                    bm25=bm25,
+                    reranker=reranker,
+                    qt=qt,
+                    k_final=args.k_final,
+                    mode=mode,
+                    variants=q["variants"],
+                )
+                rows.append({
+                    "mode": mode,
+                    "question": q["question"],
+                    "latency_ms": (time.perf_counter() - t0) * 1000.0,
+                    "attempts": len(debug["attempts"]),
+                    "answered": bool(top),
+                    "recall": recall_at_k(top, q.get("gold_chunk_ids") or [], args.k_final),
+                    "has_gold": bool(q.get("gold_chunk_ids")),
+                    "top_chunk_ids": [t["chunk_id"] for t in top],
+                })
+
+    print(f"{'mode':<12} {'n':>4} {'mean_ms':>9} {'p50_ms':>9} {'p95_ms':>9} {'attempts':>9} {'answered':>9} {f'recall@{args.k_final}':>10}")
+    for mode in MODES:
+        rs = [r for r in rows if r["mode"] == mode]
+        lat = latency_summary([r["latency_ms"] for r in rs])
+        gold = [r["recall"] for r in rs if r["has_gold"]]
+        recall = f"{sum(gold) / len(gold):.3f}" if gold else "-"
+        print(
+            f"{mode:<12} {lat['n']:>4} {lat['mean_ms']:>9.1f} {lat['p50_ms']:>9.1f} {lat['p95_ms']:>9.1f} "
+            f"{sum(r['attempts'] for r in rs) / max(1, len(rs)):>9.2f} "
+            f"{sum(r['answered'] for r in rs) / max(1, len(rs)):>9.2f} {recall:>10}"
+        )
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            for r in rows:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        print(f"Saved {len(rows)} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# Bandingkan transport Qdrant: REST (pooled vs client baru per query), gRPC, embedded lokal.
+# Per transport: latency per query dengan dan tanpa payload teks chunk (biaya serialisasi).
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import json
+import shutil
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+from qdrant_client.http import models as qm
+from sentence_transformers import SentenceTransformer
+
+from src.indexing.index_qdrant import COLLECTION, load_chunks, embed_chunks, create_collection
+from src.utils.qdrant_conn import make_qdrant_client
+from src.utils.queries import load_queries
+from src.utils.timing import latency_summary
+
+TRANSPORTS = ("rest", "rest_nopool", "grpc", "embedded")
+
+
+def upsert_with_text(client, name: str, chunks: List[Dict[str, Any]], vectors: np.ndarray, batch_size: int = 256) -> None:
+    """Seperti upsert_chunks, tapi payload ikut menyimpan teks chunk (skenario payload penuh)."""
+    points = [
+        qm.PointStruct(id=i, vector=vectors[i].tolist(), payload={
+            "chunk_id": c["chunk_id"],
+            "bab": c.get("bab", ""),
+            "section": c.get("section", ""),
+            "page_start": c.get("page_start"),
+            "page_end": c.get("page_end"),
+            "text": c["text"],
+        })
+        for i, c in enumerate(chunks)
+    ]
+    for s in range(0, len(points), batch_size):
+        client.upsert(collection_name=name, points=points[s:s + batch_size])
+
+
+def run(get_client, name: str, qvecs: List[List[float]], k: int, with_payload: bool, close_each: bool = False):
+    lat, payload_bytes = [], []
+    for q in qvecs:
+        t0 = time.perf_counter()
+        client = get_client()
+        res = client.query_points(collection_name=name, query=q, limit=k, with_payload=with_payload)
+        lat.append((time.perf_counter() - t0) * 1000.0)
+        if close_each:
+            client.close()
+        if with_payload:
+            payload_bytes.append(sum(len(json.dumps(p.payload, ensure_ascii=False).encode("utf-8")) for p in res.points))
+    return latency_summary(lat), (sum(payload_bytes) / len(payload_bytes) if payload_bytes else 0.0)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", default="data/chunks.jsonl")
+    ap.add_argument("--questions", default="", help="opsional: questions.jsonl")
+    ap.add_argument("--n_queries", type=int, default=200)
+    ap.add_argument("--embed_model", default="intfloat/multilingual-e5-small")
+    ap.add_argument("--qdrant_url", default="http://localhost:6333")
+    ap.add_argument("--grpc_port", type=int, default=6334)
+    ap.add_argument("--qdrant_path", default="data/qdrant_bench_local", help="folder sementara untuk embedded")
+    ap.add_argument("--transports", default=",".join(TRANSPORTS), help=f"subset dari {','.join(TRANSPORTS)}")
+    ap.add_argument("--k", type=int, default=20)
+    ap.add_argument("--keep", action="store_true", help="jangan hapus collection / folder benchmark")
+    args = ap.parse_args()
+
+    transports = [t for t in args.transports.split(",") if t]
+    for t in transports:
+        if t not in TRANSPORTS:
+            raise ValueError(f"Unknown transport: {t!r}")
+
+    embedder = SentenceTransformer(args.embed_model)
+    chunks = load_chunks(args.chunks)
+    vectors = embed_chunks(embedder, chunks)
+    n, dim = vectors.shape
+
+    queries = load_queries(args.questions, chunks, args.n_queries)
+    qvecs = embedder.encode(["query: " + q for q in queries], normalize_embeddings=True)
+    qvecs = [v.tolist() for v in np.asarray(qvecs, dtype=np.float32)]
+
+    name = f"{COLLECTION}_bench_transport"
+    clients = {}
+    if any(t != "embedded" for t in transports):
+        clients["rest"] = make_qdrant_client("rest", url=args.qdrant_url)
+        create_collection(clients["rest"], name, dim)
+        upsert_with_text(clients["rest"], name, chunks, vectors)
+        if "grpc" in transports:
+            clients["grpc"] = make_qdrant_client("grpc", url=args.qdrant_url, grpc_port=args.grpc_port)
+    if "embedded" in transports:
+        clients["embedded"] = make_qdrant_client("embedded", path=args.qdrant_path)
+        create_collection(clients["embedded"], name, dim)
+        upsert_with_text(clients["embedded"], name, chunks, vectors)
+
+    print(f"n={n} dim={dim} queries={len(qvecs)} k={args.k}")
+    print(f"{'transport':<12} {'payload':>7} {'p50_ms':>8} {'p95_ms':>8} {'mean_ms':>8} {'resp_kb':>8}")
+    for t in transports:
+        if t == "rest_nopool":
+            get_client = lambda: make_qdrant_client("rest", url=args.qdrant_url)  # koneksi baru tiap query
+        else:
+            get_client = lambda c=clients[t]: c
+        run(get_client, name, qvecs[:5], args.k, with_payload=False, close_each=(t == "rest_nopool"))  # warm-up
+        for with_payload in (False, True):
+            summ, pbytes = run(get_client, name, qvecs, args.k, with_payload, close_each=(t == "rest_nopool"))
+            print(f"{t:<12} {str(with_payload):>7} {summ['p50_ms']:>8.2f} {summ['p95_ms']:>8.2f} "
+                  f"{summ['mean_ms']:>8.2f} {pbytes / 1024:>8.1f}")
+
+    if not args.keep:
+        if "rest" in clients:
+            clients["rest"].delete_collection(name)
+        if "embedded" in clients:
+            clients["embedded"].close()
+            shutil.rmtree(args.qdrant_path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# Bandingkan float32 vs scalar int8 vs binary quantization: memory, latency, recall@k.
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qm
+from sentence_transformers import SentenceTransformer
+
+from src.indexing.index_qdrant import (
+    COLLECTION, QUANTIZATION_MODES, load_chunks, embed_chunks, create_collection, upsert_chunks, wait_indexed,
+)
+from src.retrieval.hybrid_retriever import search_vector
+from src.utils.qdrant_conn import segment_usage_mb
+from src.utils.queries import load_queries
+from src.utils.timing import latency_summary
+
+
+def vector_memory_mb(n: int, dim: int, mode: str, on_disk: bool):
+    """Estimasi (rumus) ukuran vektor (RAM, disk) dalam MB; HNSW graph & payload tidak dihitung."""
+    float_bytes = n * dim * 4
+    quant_bytes = {"none": 0, "scalar": n * dim, "binary": n * ((dim + 7) // 8)}[mode]
+    if on_disk:
+        ram, disk = quant_bytes, float_bytes
+    else:
+        ram, disk = float_bytes + quant_bytes, 0
+    return ram / 2**20, disk / 2**20
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", default="data/chunks.jsonl")
+    ap.add_argument("--questions", default="", help="opsional: questions.jsonl")
+    ap.add_argument("--n_queries", type=int, default=200)
+    ap.add_argument("--qdrant_url", default="http://localhost:6333")
+    ap.add_argument("--embed_model", default="intfloat/multilingual-e5-small")
+    ap.add_argument("--k", type=int, default=20)
+    ap.add_argument("--oversampling", type=float, default=2.0)
+    ap.add_argument("--on_disk", action=argparse.BooleanOptionalAction, default=True,
+                    help="vektor float asli di disk untuk mode terkuantisasi")
+    ap.add_argument("--keep", action="store_true", help="jangan hapus collection benchmark")
+    args = ap.parse_args()
+
+    client = QdrantClient(url=args.qdrant_url)
+    embedder = SentenceTransformer(args.embed_model)
+    chunks = load_chunks(args.chunks)
+    vectors = embed_chunks(embedder, chunks)
+    n, dim = vectors.shape
+
+    queries = load_queries(args.questions, chunks, args.n_queries)
+    qvecs = embedder.encode(["query: " + q for q in queries], normalize_embeddings=True)
+    qvecs = [v.tolist() for v in np.asarray(qvecs, dtype=np.float32)]
+
+    names = {}
+    for mode in QUANTIZATION_MODES:
+        name = f"{COLLECTION}_bench_{mode}"
+        # indexing_threshold kecil + tunggu optimizer: tanpa ini korpus pedoman tidak dapat graph HNSW
+        # maupun segmen terkuantisasi, jadi semua mode sebenarnya mengukur plain float search
+        create_collection(client, name, dim, quantization=mode, on_disk=args.on_disk and mode != "none",
+                          indexing_threshold=1)
+        upsert_chunks(client, name, chunks, vectors)
+        wait_indexed(client, name, n)
+        names[mode] = name
+
+    # ground truth: exact search di collection float
+    exact = qm.SearchParams(exact=True)
+    truth = [set(search_vector(client, q, topk=args.k, collection=names["none"], search_params=exact).idx.tolist()) for q in qvecs]
+
+    # baseline eksplisit (HNSW float, ef default collection): jangan fallback ke
+    # default_search_params() dari index config produksi
+    runs = [("none", qm.SearchParams())]
+    for mode in ("scalar", "binary"):
+        for rescore in (True, False):
+            runs.append((mode, qm.SearchParams(
+                quantization=qm.QuantizationSearchParams(rescore=rescore, oversampling=args.oversampling),
+            )))
+
+    print(f"n={n} dim={dim} queries={len(qvecs)} k={args.k} oversampling={args.oversampling}")
+    # est_*: rumus vector_memory_mb (vektor saja); seg_*: terukur dari telemetry segmen (vektor + graph + payload)
+    print(f"{'mode':<8} {'rescore':>7} {'est_ram_mb':>10} {'est_disk_mb':>11} {'seg_ram_mb':>10} {'seg_disk_mb':>11} "
+          f"{'p50_ms':>8} {'p95_ms':>8} {f'recall@{args.k}':>10}")
+    for mode, params in runs:
+        lat, recalls = [], []
+        for q, gold in zip(qvecs, truth):
+            t0 = time.perf_counter()
+            got = search_vector(client, q, topk=args.k, collection=names[mode], search_params=params)
+            lat.append((time.perf_counter() - t0) * 1000.0)
+            recalls.append(len(gold & set(got.idx.tolist())) / max(1, len(gold)))
+
+        ram, disk = vector_memory_mb(n, dim, mode, args.on_disk and mode != "none")
+        measured = segment_usage_mb(args.qdrant_url, names[mode])
+        seg_ram, seg_disk = ("n/a", "n/a") if measured is None else (f"{measured[0]:.2f}", f"{measured[1]:.2f}")
+        summ = latency_summary(lat)
+        rescore = "-" if params.quantization is None else str(params.quantization.rescore)
+        print(f"{mode:<8} {rescore:>7} {ram:>10.2f} {disk:>11.2f} {seg_ram:>10} {seg_disk:>11} "
+              f"{summ['p50_ms']:>8.2f} {summ['p95_ms']:>8.2f} {sum(recalls) / len(recalls):>10.3f}")
+
+    if not args.keep:
+        for name in names.values():
+            client.delete_collection(name)
+
+
+if __name__ == "__main__":
+    main()
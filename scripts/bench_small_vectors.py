@@ -0,0 +1,130 @@
+# Bandingkan 1 vektor full vs small vector (PCA / truncate) + rescore full: memory, latency, recall@k.
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import time
+from typing import List
+
+import numpy as np
+from qdrant_client.http import models as qm
+from sentence_transformers import SentenceTransformer
+
+from src.indexing.index_qdrant import (
+    COLLECTION, load_chunks, embed_chunks, create_collection, upsert_chunks, wait_indexed,
+)
+from src.indexing.small_vectors import SMALL_METHODS, SMALL_VECTOR, SmallProjection
+from src.retrieval.hybrid_retriever import search_vector
+from src.utils.qdrant_conn import QDRANT_TRANSPORTS, get_qdrant_client, qdrant_settings, segment_usage_mb
+from src.utils.queries import load_queries
+from src.utils.timing import latency_summary
+
+
+def int_list(s: str) -> List[int]:
+    return [int(x) for x in s.split(",") if x.strip()]
+
+
+def vector_ram_mb(n: int, dim: int, small_dim: int, full_on_disk: bool) -> float:
+    """Estimasi RAM vektor (MB): small selalu di RAM, full di RAM kecuali on_disk."""
+    full = 0 if full_on_disk else n * dim * 4
+    return (full + n * small_dim * 4) / 2**20
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", default="data/chunks.jsonl")
+    ap.add_argument("--questions", default="", help="opsional: questions.jsonl")
+    ap.add_argument("--n_queries", type=int, default=200)
+    ap.add_argument("--transport", choices=QDRANT_TRANSPORTS, default=None, help="default: index config")
+    ap.add_argument("--qdrant_url", default=None, help="default: index config")
+    ap.add_argument("--embed_model", default="intfloat/multilingual-e5-small")
+    ap.add_argument("--k", type=int, default=20)
+    ap.add_argument("--dims", default="64,96,128,192")
+    ap.add_argument("--methods", default=",".join(SMALL_METHODS))
+    ap.add_argument("--oversampling", default="2,4")
+    ap.add_argument("--hnsw_ef", type=int, default=None, help="hnsw_ef semua setup (default: default collection)")
+    ap.add_argument("--on_disk", action=argparse.BooleanOptionalAction, default=True,
+                    help="vektor full di disk untuk collection small+full (RAM cuma small)")
+    ap.add_argument("--keep", action="store_true", help="jangan hapus collection benchmark")
+    args = ap.parse_args()
+
+    client = get_qdrant_client(transport=args.transport, url=args.qdrant_url)
+    conn = qdrant_settings(transport=args.transport, url=args.qdrant_url)
+    embedded = conn["transport"] == "embedded"  # tanpa HNSW & telemetry: hanya est_ram_mb yang berarti
+    embedder = SentenceTransformer(args.embed_model)
+    chunks = load_chunks(args.chunks)
+    vectors = embed_chunks(embedder, chunks)
+    n, dim = vectors.shape
+
+    queries = load_queries(args.questions, chunks, args.n_queries)
+    qvecs = np.asarray(embedder.encode(["query: " + q for q in queries], normalize_embeddings=True), dtype=np.float32)
+
+    def build(name, small_vectors=None, **collection_kwargs):
+        # indexing_threshold kecil + tunggu optimizer: tanpa ini korpus pedoman tidak dapat graph HNSW,
+        # jadi semua setup sebenarnya mengukur brute-force scan (lihat bench_quantization.py)
+        create_collection(client, name, dim, indexing_threshold=1, **collection_kwargs)
+        upsert_chunks(client, name, chunks, vectors, small_vectors=small_vectors)
+        if not embedded:
+            wait_indexed(client, name, n)
+
+    def seg_mb(name):
+        measured = None if embedded else segment_usage_mb(conn["url"], name)
+        return ("n/a", "n/a") if measured is None else (f"{measured[0]:.2f}", f"{measured[1]:.2f}")
+
+    # search params eksplisit untuk semua setup: default_search_params() dari index config
+    # produksi (hnsw_ef, quantization) tidak boleh ikut masuk ke perbandingan
+    params = qm.SearchParams(hnsw_ef=args.hnsw_ef)
+
+    # baseline: 1 vektor full di RAM (setup sekarang); exact search = ground truth
+    base = f"{COLLECTION}_bench_full"
+    build(base)
+    names = [base]
+    exact = qm.SearchParams(exact=True)
+    truth = [set(search_vector(client, q, topk=args.k, collection=base, search_params=exact).idx.tolist()) for q in qvecs]
+
+    def measure(search):
+        lat, recalls = [], []
+        for q, gold in zip(qvecs, truth):
+            t0 = time.perf_counter()
+            got = search(q)
+            lat.append((time.perf_counter() - t0) * 1000.0)
+            recalls.append(len(gold & set(got)) / max(1, len(gold)))
+        return latency_summary(lat), sum(recalls) / len(recalls)
+
+    def row(label, est_ram, seg, summ, rec):
+        print(f"{label:<24} {est_ram:>10.2f} {seg[0]:>10} {seg[1]:>11} {summ['p50_ms']:>8.2f} {summ['p95_ms']:>8.2f} {rec:>10.3f}")
+
+    print(f"n={n} dim={dim} queries={len(qvecs)} k={args.k} full_on_disk={args.on_disk} hnsw_ef={args.hnsw_ef or 'default'}")
+    # est_ram_mb: rumus vector_ram_mb (vektor saja); seg_*: terukur dari telemetry segmen (vektor + graph + payload)
+    print(f"{'setup':<24} {'est_ram_mb':>10} {'seg_ram_mb':>10} {'seg_disk_mb':>11} {'p50_ms':>8} {'p95_ms':>8} {f'recall@{args.k}':>10}")
+    summ, rec = measure(lambda q: search_vector(client, q, topk=args.k, collection=base, search_params=params).idx.tolist())
+    row("full (baseline)", vector_ram_mb(n, dim, 0, False), seg_mb(base), summ, rec)
+
+    for method in [m for m in args.methods.split(",") if m]:
+        for small_dim in int_list(args.dims):
+            proj = SmallProjection.fit(vectors, small_dim, method=method)
+            name = f"{COLLECTION}_bench_{method}{small_dim}"
+            build(name, on_disk=args.on_disk, small_dim=small_dim, small_vectors=proj.project(vectors))
+            names.append(name)
+            ram = vector_ram_mb(n, dim, small_dim, args.on_disk)
+            seg = seg_mb(name)
+
+            # small saja (tanpa rescore): batas bawah kualitas tahap 1
+            summ, rec = measure(lambda q: [p.id for p in client.query_points(
+                collection_name=name, query=proj.project(q).tolist(), using=SMALL_VECTOR,
+                limit=args.k, search_params=params, with_payload=False).points])
+            row(f"{method}{small_dim} small-only", ram, seg, summ, rec)
+
+            for os_ in int_list(args.oversampling):
+                proj.oversampling = os_
+                summ, rec = measure(lambda q: search_vector(
+                    client, q, topk=args.k, collection=name, search_params=params, small=proj).idx.tolist())
+                row(f"{method}{small_dim} +rescore x{os_}", ram, seg, summ, rec)
+
+    if not args.keep:
+        for name in names:
+            client.delete_collection(name)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,13 @@ import argparse
 import json
 import os
 import re
+import sys
 from collections import Counter
 from typing import Dict, Any, List, Tuple
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.indexing.dedup import dedup_chunks, rerank_pool_shrink
+
 
 BAB_RE = re.compile(r"^\s*BAB\s+([IVXLCDM]+)\s*$", re.IGNORECASE)
 LETTER_RE = re.compile(r"^\s*([A-Z])\.\s+(.+)$")
@@ -173,10 +177,30 @@ def main():
     ap.add_argument("--in", dest="inp", required=True, help="Input raw_pages.jsonl")
     ap.add_argument("--out", required=True, help="Output chunks.jsonl")
     ap.add_argument("--max_chars", type=int, default=3500)
+    ap.add_argument("--dedup", action=argparse.BooleanOptionalAction, default=False,
+                    help="gabungkan chunk near-duplicate (MinHash-LSH); mengubah isi & chunk id chunks.jsonl, "
+                         "jadi index Qdrant harus dibangun ulang")
+    ap.add_argument("--dedup_threshold", type=float, default=0.85, help="min Jaccard shingle untuk dianggap duplikat")
+    ap.add_argument("--pool_k", type=int, default=30, help="ukuran pool rerank untuk laporan shrink (0 = skip)")
     args = ap.parse_args()
 
     pages = load_jsonl(args.inp)
     chunks = chunk_pages(pages, max_chars=args.max_chars)
+    if args.dedup:
+        kept, st = dedup_chunks(chunks, threshold=args.dedup_threshold)
+        print(
+            f"Dedup: {st['chunks_in']} -> {st['chunks_out']} chunks "
+            f"({st['removed']} removed in {st['clusters']} clusters), "
+            f"index -{st['index_shrink']:.1%}, text -{st['text_shrink']:.1%}"
+        )
+        if args.pool_k > 0 and st["removed"]:
+            ps = rerank_pool_shrink(chunks, kept, k_pool=args.pool_k)
+            print(
+                f"Rerank pool (BM25 top-{args.pool_k}, {ps['pool_queries']} query sintetis): "
+                f"{ps['pool_slots_avg']:.1f} -> {ps['pool_unique_avg']:.1f} chunk unik per query, "
+                f"cross-encoder calls -{ps['pool_shrink']:.1%}"
+            )
+        chunks = kept
     save_jsonl(args.out, chunks)
 
     print(f"Saved {len(chunks)} chunks to {args.out}")
@@ -0,0 +1,146 @@
+# Stand-in Ollama lokal untuk load test: endpoint /api/chat dengan latency yang bisa diatur.
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER_JSON = {
+    "summary": "Jawaban simulasi dari fake Ollama.",
+    "steps": ["Langkah simulasi 1", "Langkah simulasi 2"],
+    "notes": [],
+    "rujukan": "",
+}
+
+
+def _reply_text(body: dict) -> str:
+    """Isi respon kira-kira sesuai pemanggil: answerer (format JSON), decompose, atau rewrite/step-back."""
+    if body.get("format"):
+        return json.dumps(ANSWER_JSON, ensure_ascii=False)
+    messages = body.get("messages") or []
+    last = (messages[-1].get("content") if messages else "") or ""
+    if (body.get("options") or {}).get("num_predict") == 1:
+        return "ok"
+    if "sub-queries" in last:
+        return "1. syarat pengajuan\n2. prosedur pengajuan\n3. batas waktu pengajuan"
+    first = last.splitlines()[0] if last else "query"
+    return first.replace("Original query:", "").strip() or "query"
+
+
+class FakeOllama:
+    """
+    HTTP server kecil yang meniru /api/chat Ollama (stream & non-stream).
+    `slots` meniru OLLAMA_NUM_PARALLEL: request di atas itu antri di server.
+    """
+    def __init__(self, latency_ms: float = 800.0, jitter_ms: float = 200.0, slots: int = 1,
+                 host: str = "127.0.0.1", port: int = 0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.slots = slots
+        self._sem = threading.Semaphore(slots)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.busy_s = 0.0
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllama":
+        threading.Thread(target=self.server.serve_forever, name="fake-ollama", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+
+    def _sleep(self) -> None:
+        with self._lock:
+            delay = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000.0
+        with self._sem:
+            time.sleep(delay)
+        with self._lock:
+            self.requests += 1
+            self.busy_s += delay
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, obj, status=200):
+                data = json.dumps(obj).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.startswith("/api/tags"):
+                    return self._send_json({"models": []})
+                self._send_json({"error": "not found"}, status=404)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.startswith("/api/chat"):
+                    return self._send_json({"error": "not found"}, status=404)
+
+                fake._sleep()
+                text = _reply_text(body)
+                now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+                final = {
+                    "model": body.get("model", "fake"),
+                    "created_at": now,
+                    "message": {"role": "assistant", "content": ""},
+                    "done": True,
+                    "done_reason": "stop",
+                    "total_duration": 0,
+                    "load_duration": 0,
+                    "prompt_eval_count": 0,
+                    "prompt_eval_duration": 0,
+                    "eval_count": len(text.split()),
+                    "eval_duration": 0,
+                }
+
+                if body.get("stream", True):
+                    chunk = {
+                        "model": final["model"],
+                        "created_at": now,
+                        "message": {"role": "assistant", "content": text},
+                        "done": False,
+                    }
+                    data = (json.dumps(chunk) + "\n" + json.dumps(final) + "\n").encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                else:
+                    final["message"]["content"] = text
+                    self._send_json(final)
+
+        return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=11435)
+    ap.add_argument("--latency_ms", type=float, default=800.0)
+    ap.add_argument("--jitter_ms", type=float, default=200.0)
+    ap.add_argument("--slots", type=int, default=1)
+    args = ap.parse_args()
+
+    fake = FakeOllama(args.latency_ms, args.jitter_ms, args.slots, port=args.port)
+    print(f"Fake Ollama on {fake.base_url} (latency {args.latency_ms}±{args.jitter_ms} ms, slots={args.slots})")
+    fake.server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,129 @@
 # src/ingest_pdf.py
 import argparse
+import hashlib
 import json
 import os
-from typing import Dict, Any, List
+import time
+from typing import Dict, Any, List, Optional
 import pdfplumber
 
+# naikkan kalau cara ekstraksi / normalisasi di extract_page_text berubah (cache lama otomatis tidak terpakai)
+EXTRACTOR_VERSION = "1"
 
-def extract_pages(pdf_path: str) -> List[Dict[str, Any]]:
+
+def extract_page_text(page) -> str:
+    text = page.extract_text() or ""
+    # normalisasi sederhana
+    return text.replace("\u00a0", " ").strip()
+
+
+def _hash_pdf_obj(obj, h, seen: set, memo: Dict[int, bytes]) -> None:
+    """
+    Hash isi objek PDF secara rekursif (ref di-resolve): dict, array, stream (raw data + dict-nya).
+    Isi yang sama dengan nomor objek berbeda (PDF ditulis ulang) -> hash sama.
+    `memo`: digest per objid (font / XObject dipakai banyak halaman), `seen`: putus siklus.
+    """
+    from pdfminer.pdftypes import PDFObjRef, PDFStream
+
+    if isinstance(obj, PDFObjRef):
+        if obj.objid in seen:
+            h.update(b"<cycle>")
+            return
+        digest = memo.get(obj.objid)
+        if digest is None:
+            sub = hashlib.sha256()
+            seen.add(obj.objid)
+            _hash_pdf_obj(obj.resolve(), sub, seen, memo)
+            seen.discard(obj.objid)
+            digest = memo[obj.objid] = sub.digest()
+        h.update(digest)
+    elif isinstance(obj, PDFStream):
+        h.update(b"stream")
+        _hash_pdf_obj(obj.attrs, h, seen, memo)
+        h.update(obj.get_rawdata() or b"")
+    elif isinstance(obj, dict):
+        h.update(b"{")
+        for k in sorted(obj, key=str):
+            h.update(str(k).encode("utf-8") + b"=")
+            _hash_pdf_obj(obj[k], h, seen, memo)
+        h.update(b"}")
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"[")
+        for v in obj:
+            _hash_pdf_obj(v, h, seen, memo)
+        h.update(b"]")
+    else:
+        h.update(repr(obj).encode("utf-8"))  # angka, nama (/Name), string
+
+
+def page_content_hash(page, memo: Optional[Dict[int, bytes]] = None) -> str:
+    """
+    Hash isi mentah halaman: content stream + ukuran/rotasi + seluruh Resources
+    (Form XObject beserta resources-nya, font lengkap dengan Encoding / ToUnicode / Widths),
+    plus versi extractor & pdfplumber. Halaman yang tidak berubah antar revisi PDF -> hash sama.
+    `memo` di-share antar halaman 1 dokumen supaya font yang sama tidak di-hash ulang.
+    """
+    from pdfminer.pdftypes import resolve1
+
+    memo = {} if memo is None else memo
+    h = hashlib.sha256(f"{EXTRACTOR_VERSION}|pdfplumber-{pdfplumber.__version__}".encode("utf-8"))
+    h.update(repr((page.bbox, page.rotation)).encode("utf-8"))
+    for ref in page.page_obj.contents or []:
+        h.update(resolve1(ref).get_data())
+    _hash_pdf_obj(page.page_obj.resources or {}, h, set(), memo)
+    return h.hexdigest()
+
+
+class PageCache:
+    """Cache teks per halaman: 1 file JSON per hash di `cache_dir/<2 char>/<hash>.json`."""
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = json.load(f)["text"]
+                self.hits += 1
+                return text
+            except (ValueError, KeyError):
+                pass  # file rusak -> extract ulang
+        self.misses += 1
+        return None
+
+    def put(self, key: str, text: str) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"text": text}, f, ensure_ascii=False)
+        os.replace(tmp, path)  # atomic: run yang terputus tidak meninggalkan file setengah jadi
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": (self.hits / total) if total else 0.0}
+
+
+def extract_pages(pdf_path: str, cache: Optional[PageCache] = None) -> List[Dict[str, Any]]:
+    """Layout analysis pdfplumber hanya untuk halaman yang hash-nya belum ada di `cache`."""
     pages = []
+    memo: Dict[int, bytes] = {}
     with pdfplumber.open(pdf_path) as pdf:
         for idx, page in enumerate(pdf.pages, start=1):
-            text = page.extract_text() or ""
-            # normalisasi sederhana
-            text = text.replace("\u00a0", " ").strip()
+            if cache is None:
+                text = extract_page_text(page)
+            else:
+                key = page_content_hash(page, memo)
+                text = cache.get(key)
+                if text is None:
+                    text = extract_page_text(page)
+                    cache.put(key, text)
             pages.append({"page": idx, "text": text})
     return pages
 
@@ -21,17 +132,25 @@ def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--pdf", required=True, help="Path ke PDF")
     ap.add_argument("--out", required=True, help="Output raw_pages.jsonl")
+    ap.add_argument("--cache_dir", default="data/cache/pages", help="cache ekstraksi per halaman")
+    ap.add_argument("--no_cache", action="store_true", help="extract ulang semua halaman")
     args = ap.parse_args()
 
     os.makedirs(os.path.dirname(args.out), exist_ok=True)
-    pages = extract_pages(args.pdf)
+    cache = None if args.no_cache else PageCache(args.cache_dir)
+    t0 = time.perf_counter()
+    pages = extract_pages(args.pdf, cache=cache)
+    elapsed = time.perf_counter() - t0
 
     with open(args.out, "w", encoding="utf-8") as f:
         for row in pages:
             f.write(json.dumps(row, ensure_ascii=False) + "\n")
 
     n_nonempty = sum(1 for p in pages if p["text"].strip())
-    print(f"Saved {len(pages)} pages to {args.out} (non-empty: {n_nonempty})")
+    print(f"Saved {len(pages)} pages to {args.out} (non-empty: {n_nonempty}) in {elapsed:.1f}s")
+    if cache is not None:
+        st = cache.stats()
+        print(f"Page cache: {st['hits']} hit, {st['misses']} re-extracted (hit rate {st['hit_rate']:.2f})")
 
 
 if __name__ == "__main__":
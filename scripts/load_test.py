@@ -0,0 +1,169 @@
+# Load test: simulasi banyak mahasiswa bertanya bersamaan ke pipeline penuh
+# (crag_retrieve + OllamaAnswerer.answer), dengan fake Ollama + Qdrant in-memory.
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
+
+from qdrant_client import QdrantClient
+from sentence_transformers import SentenceTransformer
+
+from fake_ollama import FakeOllama
+from src.indexing.index_qdrant import COLLECTION, load_chunks, embed_chunks, create_collection, upsert_chunks
+from src.retrieval.hybrid_retriever import build_bm25, load_chunks_payload, QueryEmbeddingCache, default_small_projection
+from src.retrieval.reranker import Reranker
+from src.retrieval.query_transform import QueryTransformer
+from src.retrieval.crag import crag_retrieve
+from src.generation.ollama_generate import OllamaAnswerer
+from src.utils.llm_client import get_llm_client
+from src.utils.admission import AdmissionController, LoadShedError, degradation_plan
+from src.utils.timing import Deadline, latency_summary, percentile
+
+
+def load_mix(path: str) -> List[Dict[str, Any]]:
+    """JSONL: {"question": "...", "weight": 3} ; weight opsional (default 1)."""
+    return [json.loads(l) for l in open(path, "r", encoding="utf-8") if l.strip()]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--questions", required=True, help="question mix (jsonl)")
+    ap.add_argument("--chunks", default="data/chunks.jsonl")
+    ap.add_argument("--rate", type=float, default=1.0, help="arrival rate (request/detik, Poisson)")
+    ap.add_argument("--duration", type=float, default=60.0, help="lama generate arrival (detik)")
+    ap.add_argument("--max_users", type=int, default=32, help="worker thread = request yang diproses bersamaan")
+    ap.add_argument("--mode", choices=("sequential", "fusion"), default="sequential")
+    ap.add_argument("--llm_latency_ms", type=float, default=800.0)
+    ap.add_argument("--llm_jitter_ms", type=float, default=200.0)
+    ap.add_argument("--llm_slots", type=int, default=1, help="paralelisme fake Ollama (OLLAMA_NUM_PARALLEL)")
+    ap.add_argument("--llm_concurrency", type=int, default=2, help="semaphore LLMClient di app")
+    ap.add_argument("--max_in_flight", type=int, default=0, help="admission control (0 = off, semua request full path)")
+    ap.add_argument("--budget_ms", type=float, default=0.0, help="latency budget per request (0 = tanpa batas)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="", help="opsional: simpan hasil per request (jsonl)")
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    mix = load_mix(args.questions)
+    weights = [float(m.get("weight", 1.0)) for m in mix]
+
+    # --- stand-ins lokal ---
+    fake = FakeOllama(args.llm_latency_ms, args.llm_jitter_ms, args.llm_slots, seed=args.seed).start()
+    client = QdrantClient(":memory:")
+    embedder = SentenceTransformer("intfloat/multilingual-e5-small")
+    chunks = load_chunks(args.chunks)
+    # layout collection ikut index config (dense_search pakai small vector kalau dikonfigurasi)
+    proj = default_small_projection()
+    vectors = embed_chunks(embedder, chunks)
+    create_collection(client, COLLECTION, embedder.get_sentence_embedding_dimension(),
+                      small_dim=proj.dim if proj is not None else None)
+    upsert_chunks(client, COLLECTION, chunks, vectors,
+                  small_vectors=proj.project(vectors) if proj is not None else None)
+
+    reranker = Reranker("BAAI/bge-reranker-base", device=None)
+    chunks_payload = load_chunks_payload(args.chunks)
+    bm25 = build_bm25(chunks_payload)
+    embed_cache = QueryEmbeddingCache("intfloat/multilingual-e5-small")
+    llm = get_llm_client("fake-model", base_url=fake.base_url, max_concurrency=args.llm_concurrency,
+                         queue_timeout=max(60.0, args.duration))
+    qt = QueryTransformer(ollama_model="fake-model", llm=llm)
+    answerer = OllamaAnswerer(model="fake-model", llm=llm)
+
+    admission = AdmissionController(max_in_flight=args.max_in_flight) if args.max_in_flight > 0 else None
+
+    rows: List[Dict[str, Any]] = []
+    rows_lock = threading.Lock()
+
+    def run_one(question: str, arrival: float) -> None:
+        start = time.perf_counter()
+        row: Dict[str, Any] = {"question": question, "queue_ms": (start - arrival) * 1000.0, "error": None}
+        try:
+            deadline = Deadline(args.budget_ms) if args.budget_ms > 0 else None
+            level = admission.acquire(llm=llm) if admission is not None else 0
+            plan = degradation_plan(level)
+            row["level"] = level
+            try:
+                top, debug = crag_retrieve(
+                    question=question, client=client, embedder=embedder, chunks_payload=chunks_payload,
+                    bm25=bm25, reranker=reranker, qt=qt, mode=args.mode, embed_cache=embed_cache,
+                    variants=None if plan["transform"] else [question],
+                    corrective=plan["corrective"], k_pool=plan["k_pool"], deadline=deadline,
+                )
+                t_ans = time.perf_counter()
+                answerer.answer(question, top, extractive_only=plan["extractive_only"], deadline=deadline)
+            finally:
+                if admission is not None:
+                    admission.release()
+            row["stages_ms"] = {**debug["timings_ms"], "answer": (time.perf_counter() - t_ans) * 1000.0}
+            row["answered"] = bool(top)
+            row["budget_exhausted"] = debug.get("budget_exhausted", False)
+        except LoadShedError:
+            row["error"] = "shed"
+        except Exception as e:
+            row["error"] = repr(e)
+        end = time.perf_counter()
+        row["latency_ms"] = (end - arrival) * 1000.0
+        row["end"] = end
+        with rows_lock:
+            rows.append(row)
+
+    # --- open-loop arrivals (Poisson) ---
+    executor = ThreadPoolExecutor(max_workers=args.max_users)
+    t0 = time.perf_counter()
+    next_t = 0.0
+    n_sent = 0
+    while True:
+        next_t += rng.expovariate(args.rate)
+        if next_t > args.duration:
+            break
+        time.sleep(max(0.0, t0 + next_t - time.perf_counter()))
+        q = rng.choices(mix, weights=weights, k=1)[0]["question"]
+        executor.submit(run_one, q, time.perf_counter())
+        n_sent += 1
+    executor.shutdown(wait=True)
+    wall_s = max(r["end"] for r in rows) - t0 if rows else args.duration
+    fake.stop()
+
+    ok = [r for r in rows if r["error"] is None]
+    lat = [r["latency_ms"] for r in ok]
+    queue = [r["queue_ms"] for r in rows]
+    print(f"offered {n_sent / args.duration:.2f} req/s for {args.duration:.0f}s, mode={args.mode}, "
+          f"max_users={args.max_users}, llm {args.llm_latency_ms:.0f}ms x{args.llm_slots} slots")
+    print(f"completed {len(ok)}/{n_sent} (errors {len(rows) - len(ok)}), throughput {len(ok) / wall_s:.2f} req/s")
+    summ = latency_summary(lat)
+    print(f"latency  p50 {summ['p50_ms']:.0f}  p95 {summ['p95_ms']:.0f}  p99 {percentile(lat, 99):.0f}  max {summ['max_ms']:.0f} ms")
+    print(f"queueing p50 {percentile(queue, 50):.0f}  p95 {percentile(queue, 95):.0f} ms (arrival -> worker start)")
+
+    # saturation: total waktu di stage dibagi kapasitas stage selama run (util > 1 = antrian di stage tsb)
+    capacity = {"transform": args.llm_slots, "answer": args.llm_slots, "rerank": 1, "retrieve": args.max_users}
+    print(f"\n{'stage':<10} {'mean_ms':>9} {'p95_ms':>9} {'util':>6}")
+    for stage, cap in capacity.items():
+        vals = [r["stages_ms"].get(stage, 0.0) for r in ok]
+        s = latency_summary(vals)
+        util = sum(vals) / (wall_s * 1000.0 * cap)
+        print(f"{stage:<10} {s['mean_ms']:>9.1f} {s['p95_ms']:>9.1f} {util:>6.2f}")
+    print(f"\nfake ollama: {fake.requests} calls, util {fake.busy_s / (wall_s * args.llm_slots):.2f}")
+    print(f"llm client: {llm.stats()}")
+    if admission is not None:
+        print(f"admission: {admission.stats()}")
+    if args.budget_ms > 0:
+        n_exh = sum(1 for r in ok if r.get("budget_exhausted"))
+        n_over = sum(1 for r in ok if r["latency_ms"] - r["queue_ms"] > args.budget_ms)
+        print(f"budget {args.budget_ms:.0f} ms: exhausted {n_exh}/{len(ok)}, over budget {n_over}/{len(ok)}, "
+              f"answerer {answerer.stats()['budget_extractive']} budget-extractive")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            for r in rows:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        print(f"Saved {len(rows)} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# Tuning HNSW: grid m / ef_construct saat build, sweep hnsw_ef saat query, exact search sebagai ground truth.
+# Laporan: recall@k, p95 latency, waktu build, estimasi memori; opsional tulis pilihan ke index config.
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+from qdrant_client.http import models as qm
+from sentence_transformers import SentenceTransformer
+
+from src.indexing.index_config import load_index_config, save_index_config
+from src.indexing.index_qdrant import COLLECTION, load_chunks, embed_chunks, create_collection, upsert_chunks, wait_indexed
+from src.retrieval.hybrid_retriever import search_vector
+from src.utils.qdrant_conn import QDRANT_TRANSPORTS, get_qdrant_client
+from src.utils.queries import load_queries
+from src.utils.timing import latency_summary
+
+
+def int_list(s: str) -> List[int]:
+    return [int(x) for x in s.split(",") if x.strip()]
+
+
+def memory_mb(n: int, dim: int, m: int) -> Dict[str, float]:
+    """Estimasi RAM: vektor float32 + link graph (level 0: 2*m link x 4 byte per node, level atas diabaikan)."""
+    return {"vectors_mb": n * dim * 4 / 2**20, "graph_mb": n * 2 * m * 4 / 2**20}
+
+
+def main():
+    cfg = load_index_config()
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", default="data/chunks.jsonl")
+    ap.add_argument("--questions", default="", help="opsional: questions.jsonl")
+    ap.add_argument("--n_queries", type=int, default=200)
+    ap.add_argument("--transport", choices=QDRANT_TRANSPORTS, default=None, help="default: index config")
+    ap.add_argument("--qdrant_url", default=None, help="default: index config")
+    ap.add_argument("--embed_model", default="intfloat/multilingual-e5-small")
+    ap.add_argument("--k", type=int, default=20)
+    ap.add_argument("--m", default="8,16,32")
+    ap.add_argument("--ef_construct", default="64,100,200")
+    ap.add_argument("--hnsw_ef", default="16,32,64,128,256")
+    ap.add_argument("--replicate", type=int, default=1,
+                    help="gandakan korpus (vektor + noise kecil) untuk simulasi korpus yang tumbuh")
+    ap.add_argument("--indexing_threshold", type=int, default=1,
+                    help="KB; dipakai collection tuning DAN ditulis ke config (default Qdrant tidak membuat graph di korpus kecil)")
+    ap.add_argument("--target_recall", type=float, default=0.98, help="pilih titik tercepat (p95) dengan recall >= ini")
+    ap.add_argument("--write_config", action="store_true", help="tulis pilihan ke index config (lalu re-run index_qdrant.py)")
+    ap.add_argument("--keep", action="store_true", help="jangan hapus collection benchmark")
+    args = ap.parse_args()
+
+    client = get_qdrant_client(transport=args.transport, url=args.qdrant_url)
+    if args.transport == "embedded" or (args.transport is None and cfg["transport"] == "embedded"):
+        print("WARNING: mode embedded tidak punya HNSW (selalu exact); jalankan terhadap server Qdrant.")
+
+    embedder = SentenceTransformer(args.embed_model)
+    chunks = load_chunks(args.chunks)
+    vectors = embed_chunks(embedder, chunks)
+    if args.replicate > 1:
+        rng = np.random.default_rng(0)
+        noisy = [vectors + rng.normal(0, 0.02, vectors.shape).astype(np.float32) for _ in range(args.replicate - 1)]
+        vectors = np.concatenate([vectors] + noisy)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        chunks = [chunks[i % len(chunks)] for i in range(len(vectors))]
+    n, dim = vectors.shape
+
+    queries = load_queries(args.questions, chunks, args.n_queries)
+    qvecs = embedder.encode(["query: " + q for q in queries], normalize_embeddings=True)
+    qvecs = [v.tolist() for v in np.asarray(qvecs, dtype=np.float32)]
+
+    rows: List[Dict[str, Any]] = []
+    truth = None
+    print(f"n={n} dim={dim} queries={len(qvecs)} k={args.k}")
+    print(f"{'m':>4} {'ef_con':>6} {'hnsw_ef':>7} {'build_s':>8} {'vec_mb':>7} {'graph_mb':>8} "
+          f"{'p50_ms':>8} {'p95_ms':>8} {f'recall@{args.k}':>10}")
+    for m in int_list(args.m):
+        for ef_construct in int_list(args.ef_construct):
+            name = f"{COLLECTION}_tune_m{m}_ef{ef_construct}"
+            t0 = time.perf_counter()
+            # indexing_threshold kecil: korpus pedoman jauh di bawah default, tanpa ini tidak ada graph
+            create_collection(client, name, dim, hnsw_m=m, hnsw_ef_construct=ef_construct,
+                              indexing_threshold=args.indexing_threshold)
+            upsert_chunks(client, name, chunks, vectors)
+            wait_indexed(client, name, n)
+            build_s = time.perf_counter() - t0
+
+            if truth is None:
+                exact = qm.SearchParams(exact=True)
+                truth = [set(search_vector(client, q, topk=args.k, collection=name, search_params=exact).idx.tolist())
+                         for q in qvecs]
+
+            mem = memory_mb(n, dim, m)
+            for ef in int_list(args.hnsw_ef):
+                params = qm.SearchParams(hnsw_ef=ef)
+                lat, recalls = [], []
+                for q, gold in zip(qvecs, truth):
+                    t1 = time.perf_counter()
+                    got = search_vector(client, q, topk=args.k, collection=name, search_params=params)
+                    lat.append((time.perf_counter() - t1) * 1000.0)
+                    recalls.append(len(gold & set(got.idx.tolist())) / max(1, len(gold)))
+                summ = latency_summary(lat)
+                row = {
+                    "m": m, "ef_construct": ef_construct, "hnsw_ef": ef, "build_s": build_s,
+                    "p50_ms": summ["p50_ms"], "p95_ms": summ["p95_ms"],
+                    "recall": sum(recalls) / len(recalls), **mem,
+                }
+                rows.append(row)
+                print(f"{m:>4} {ef_construct:>6} {ef:>7} {build_s:>8.2f} {mem['vectors_mb']:>7.2f} {mem['graph_mb']:>8.2f} "
+                      f"{summ['p50_ms']:>8.2f} {summ['p95_ms']:>8.2f} {row['recall']:>10.3f}")
+
+            if not args.keep:
+                client.delete_collection(name)
+
+    ok = [r for r in rows if r["recall"] >= args.target_recall]
+    if not ok:
+        print(f"\nTidak ada titik dengan recall >= {args.target_recall}; pakai recall tertinggi.")
+        ok = [max(rows, key=lambda r: (r["recall"], -r["p95_ms"]))]
+    best = min(ok, key=lambda r: (r["p95_ms"], r["build_s"], r["graph_mb"]))
+    print(f"\nchosen: m={best['m']} ef_construct={best['ef_construct']} hnsw_ef={best['hnsw_ef']} "
+          f"(recall {best['recall']:.3f}, p95 {best['p95_ms']:.2f} ms)")
+
+    if args.write_config:
+        # indexing_threshold ikut ditulis: tanpa itu collection produksi tidak punya graph dan
+        # m / ef_construct / hnsw_ef pilihan tidak berefek (recall & p95 di atas tidak menggambarkannya)
+        cfg.update({"hnsw_m": best["m"], "hnsw_ef_construct": best["ef_construct"], "hnsw_ef": best["hnsw_ef"],
+                    "indexing_threshold": args.indexing_threshold})
+        save_index_config(cfg)
+        print("index config updated; re-run src/indexing/index_qdrant.py untuk rebuild collection.")
+
+
+if __name__ == "__main__":
+    main()
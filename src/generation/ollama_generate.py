@@ -1,11 +1,18 @@
 from __future__ import annotations
 
+import json
+import threading
+import time
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 import re
-from langchain_ollama import ChatOllama
-from langchain_core.prompts import ChatPromptTemplate
 
-EXTRACT_PROMPT = ChatPromptTemplate.from_messages([
+from src.utils.cache import LRUCache
+from src.utils.llm_client import LLMClient, get_llm_client, is_timeout_error
+from src.utils.query_log import normalize_question
+from src.utils.timing import Deadline
+
+EXTRACT_MESSAGES = [
     ("system",
      "Kamu adalah asisten pedoman akademik UNESA.\n"
      "TUGAS: EKSTRAK informasi dari KONTEXT, jangan menambah fakta baru.\n\n"
@@ -32,7 +39,31 @@ EXTRACT_PROMPT = ChatPromptTemplate.from_messages([
     ("human",
      "Pertanyaan:\n{question}\n\n"
      "KONTEXT:\n{context}\n")
-])
+]
+
+
+# Skema structured output Ollama: decoding dibatasi ke JSON dengan field ini
+ANSWER_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "steps": {"type": "array", "items": {"type": "string"}},
+        "notes": {"type": "array", "items": {"type": "string"}},
+        "rujukan": {"type": "string"},
+    },
+    "required": ["summary", "steps", "notes", "rujukan"],
+}
+
+# stop kalau model mulai keluar dari objek JSON (whitespace/markdown berulang)
+ANSWER_STOP = ["\n\n\n\n", "```"]
+
+
+@lru_cache(maxsize=1)
+def extract_prompt():
+    # langchain di-import saat pertama dipakai, bukan saat import modul
+    from langchain_core.prompts import ChatPromptTemplate
+
+    return ChatPromptTemplate.from_messages(EXTRACT_MESSAGES)
 
 
 def _pick_top_payload(top_chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -59,6 +90,34 @@ def _safe_json_extract(text: str) -> str:
     return m.group(0).strip() if m else ""
 
 
+def _str_list(value: Any) -> List[str]:
+    if not isinstance(value, list):
+        return []
+    return [v.strip() for v in value if isinstance(v, str) and v.strip()]
+
+
+def _parse_answer_json(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse respon structured output pakai json.loads (bukan regex).
+    Kalau ada teks di luar objek, coba sekali lagi di blok JSON pertama.
+    """
+    for blob in (text.strip(), _safe_json_extract(text)):
+        if not blob:
+            continue
+        try:
+            data = json.loads(blob)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict):
+            return {
+                "summary": data.get("summary") if isinstance(data.get("summary"), str) else "",
+                "steps": _str_list(data.get("steps")),
+                "notes": _str_list(data.get("notes")),
+                "rujukan": data.get("rujukan") if isinstance(data.get("rujukan"), str) else "",
+            }
+    return None
+
+
 def _is_grounded(answer_text: str, context: str) -> bool:
     """
     Heuristic grounding check:
@@ -77,17 +136,58 @@ def _is_grounded(answer_text: str, context: str) -> bool:
     return True
 
 
-def _fallback_extractive(context: str, payload: Dict[str, Any]) -> str:
-    """
-    Kalau LLM ngaco, kita jawab dengan ekstraksi sederhana dari konteks:
-    ambil baris yang terlihat seperti mekanisme/syarat (a., b., c., dst).
-    """
+def _list_items(context: str) -> List[str]:
+    """Baris yang terlihat seperti mekanisme/syarat (a., b., c., dst), tanpa hurufnya."""
     lines = [ln.strip() for ln in context.splitlines() if ln.strip()]
     picked = []
     for ln in lines:
         if re.match(r"^[a-z]\.\s+", ln):  # a. b. c.
             picked.append(re.sub(r"^[a-z]\.\s+", "", ln).strip())
-    picked = picked[:8]
+    return picked
+
+
+# kata tanya yang jawabannya memang berupa daftar langkah/syarat
+PROCEDURE_WORDS = ("bagaimana", "prosedur", "mekanisme", "langkah", "tahapan", "tata cara",
+                   "cara", "syarat", "persyaratan", "ketentuan", "alur")
+# kata tanya yang butuh jawaban spesifik (angka/waktu/ya-tidak), bukan daftar
+SPECIFIC_WORDS = ("berapa", "kapan", "siapa", "apakah", "mengapa", "kenapa")
+
+
+def _is_procedure_question(question: str) -> bool:
+    q = " ".join(question.lower().split())
+    if any(re.search(rf"\b{w}\b", q) for w in SPECIFIC_WORDS):
+        return False
+    return any(re.search(rf"\b{w}\b", q) for w in PROCEDURE_WORDS)
+
+
+def fast_path_reason(
+    question: str,
+    top_chunks: List[Dict[str, Any]],
+    context: str,
+    min_rerank: float = 0.5,
+    min_items: int = 3,
+) -> Optional[str]:
+    """
+    Cek SEBELUM generate apakah evidence teratas bisa dijawab ekstraktif (tanpa LLM).
+    Return None kalau boleh, atau alasan singkat kenapa tidak.
+    """
+    top_score = max((t.get("score_rerank", float("-inf")) for t in top_chunks), default=float("-inf"))
+    if top_score < min_rerank:
+        return "low_rerank"
+    if len(_list_items(context)) < min_items:
+        return "no_list"
+    if not _is_procedure_question(question):
+        return "question_type"
+    return None
+
+
+def _fallback_extractive(context: str, payload: Dict[str, Any]) -> str:
+    """
+    Kalau LLM ngaco, kita jawab dengan ekstraksi sederhana dari konteks:
+    ambil baris yang terlihat seperti mekanisme/syarat (a., b., c., dst).
+    Dipakai juga oleh fast path ekstraktif.
+    """
+    picked = _list_items(context)[:8]
 
     ruj = f"{payload.get('bab','')} – {payload.get('section','')} (hlm {payload.get('page_start')}-{payload.get('page_end')})"
     if not picked:
@@ -101,52 +201,176 @@ def _fallback_extractive(context: str, payload: Dict[str, Any]) -> str:
     )
 
 
+def _extractive_excerpt(context: str, payload: Dict[str, Any], max_chars: int = 600) -> str:
+    """Jawaban tanpa LLM: daftar a./b./c. kalau ada, kalau tidak potongan awal teks chunk teratas."""
+    if _list_items(context):
+        return _fallback_extractive(context, payload)
+    text = " ".join((payload.get("text") or "").split())
+    if len(text) > max_chars:
+        text = text[:max_chars].rsplit(" ", 1)[0] + " ..."
+    ruj = f"{payload.get('bab','')} – {payload.get('section','')} (hlm {payload.get('page_start')}-{payload.get('page_end')})"
+    return (
+        "Kutipan pedoman yang paling relevan:\n"
+        f"> {text}\n\n"
+        f"Rujukan: {ruj}."
+    )
+
+
 class OllamaAnswerer:
     def __init__(
         self,
         model: str = "qwen2.5:7b-instruct",
         base_url: Optional[str] = None,
         temperature: float = 0.0,
+        llm: Optional[LLMClient] = None,
+        num_predict: int = 512,
+        stop: Optional[List[str]] = None,
+        fast_path: bool = False,
+        fast_min_rerank: float = 0.5,
+        fast_min_items: int = 3,
+        cache: Optional[LRUCache] = None,
     ):
-        self.llm = ChatOllama(model=model, base_url=base_url, temperature=temperature)
-        self.chain = EXTRACT_PROMPT | self.llm
+        self.llm = llm or get_llm_client(model, base_url)
+        self.temperature = temperature
+        self.num_predict = num_predict  # token budget jawaban
+        self.stop = list(ANSWER_STOP if stop is None else stop)
+
+        # fast path: jawab ekstraktif tanpa LLM kalau evidence teratas sudah berupa daftar
+        self.fast_path = fast_path
+        self.fast_min_rerank = fast_min_rerank
+        self.fast_min_items = fast_min_items
+
+        # (pertanyaan ternormalisasi, chunk teratas, fast path) -> jawaban final
+        self.cache = cache
+
+        self._lock = threading.Lock()
+        self.counts = {"answers": 0, "llm_calls": 0, "parse_fail": 0, "ungrounded": 0, "fallback": 0, "fast_path": 0,
+                       "extractive_only": 0, "budget_extractive": 0, "llm_timeout": 0}
+        self.llm_ms = 0.0
+
+    def _count(self, *keys: str) -> None:
+        with self._lock:
+            for k in keys:
+                self.counts[k] += 1
+
+    def avg_llm_ms(self) -> float:
+        return self.llm_ms / self.counts["llm_calls"] if self.counts["llm_calls"] else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        n = max(1, self.counts["llm_calls"])
+        avg_llm_ms = self.avg_llm_ms()
+        return {
+            **self.counts,
+            "parse_fail_rate": self.counts["parse_fail"] / n,
+            "fallback_rate": self.counts["fallback"] / n,
+            "fast_path_rate": self.counts["fast_path"] / max(1, self.counts["answers"]),
+            "avg_llm_ms": avg_llm_ms,
+            # estimasi: tiap fast path menghemat 1 LLM call dengan durasi rata-rata
+            "est_saved_ms": self.counts["fast_path"] * avg_llm_ms,
+        }
 
-    def answer(self, question: str, top_chunks: List[Dict[str, Any]]) -> str:
+    def answer(
+        self,
+        question: str,
+        top_chunks: List[Dict[str, Any]],
+        fast_path: Optional[bool] = None,
+        extractive_only: bool = False,
+        deadline: Optional[Deadline] = None,
+    ) -> str:
+        """
+        `fast_path` None = ikut setting answerer; True/False = override per request.
+        `extractive_only`: tanpa LLM sama sekali (degradasi saat beban tinggi);
+        jawaban LLM yang sudah ada di cache tetap dipakai.
+        `deadline`: kalau sisa budget < rata-rata durasi LLM call (atau call-nya timeout),
+        jawab ekstraktif. Antrian LLM penuh / timeout tanpa deadline juga jawab ekstraktif.
+        """
         if not top_chunks:
             return "Tidak ditemukan di Pedoman Administrasi Akademik dan Kelulusan UNESA 2024."
 
         payload = _pick_top_payload(top_chunks)
         context = _build_context(payload)
-        section = (payload.get("section") or "").strip() or "bagian yang relevan"
-        rujukan = f"{payload.get('bab','')} – {payload.get('section','')} (hlm {payload.get('page_start')}-{payload.get('page_end')})"
 
         if not context.strip():
             return "Tidak ditemukan di Pedoman Administrasi Akademik dan Kelulusan UNESA 2024."
 
-        resp = self.chain.invoke({
+        use_fast = self.fast_path if fast_path is None else fast_path
+        key = (normalize_question(question), payload.get("chunk_id"), bool(use_fast))
+        if self.cache is not None:
+            hit = self.cache.get(key)
+            if hit is not None:
+                return hit
+        if extractive_only:
+            self._count("extractive_only")
+            return _extractive_excerpt(context, payload)  # tidak di-cache: jawaban terdegradasi
+        if deadline is not None and (deadline.expired or not deadline.fits(self.avg_llm_ms())):
+            self._count("budget_extractive")
+            return _extractive_excerpt(context, payload)
+
+        try:
+            ans = self._generate(question, top_chunks, payload, context, use_fast, deadline)
+        except Exception as e:
+            if not is_timeout_error(e):
+                raise
+            self._count("budget_extractive" if deadline is not None else "llm_timeout")
+            return _extractive_excerpt(context, payload)  # tidak di-cache
+        if self.cache is not None:
+            self.cache.put(key, ans)
+        return ans
+
+    def _generate(
+        self,
+        question: str,
+        top_chunks: List[Dict[str, Any]],
+        payload: Dict[str, Any],
+        context: str,
+        use_fast: bool,
+        deadline: Optional[Deadline] = None,
+    ) -> str:
+        section = (payload.get("section") or "").strip() or "bagian yang relevan"
+        rujukan = f"{payload.get('bab','')} – {payload.get('section','')} (hlm {payload.get('page_start')}-{payload.get('page_end')})"
+
+        self._count("answers")
+        if use_fast and fast_path_reason(
+            question, top_chunks, context,
+            min_rerank=self.fast_min_rerank, min_items=self.fast_min_items,
+        ) is None:
+            self._count("fast_path")
+            return _fallback_extractive(context, payload)
+
+        limits = {}
+        if deadline is not None:
+            remaining_s = deadline.remaining_ms() / 1000.0
+            limits = {"timeout": remaining_s, "queue_timeout": remaining_s}
+
+        t0 = time.perf_counter()
+        resp = self.llm.invoke(extract_prompt(), {
             "question": question,
             "context": context,
             "section": section,
-        }).content
+        },
+            temperature=self.temperature,
+            format=ANSWER_SCHEMA,
+            num_predict=self.num_predict,
+            stop=self.stop,
+            **limits,
+        )
+        with self._lock:
+            self.counts["llm_calls"] += 1
+            self.llm_ms += (time.perf_counter() - t0) * 1000.0
 
-        json_blob = _safe_json_extract(resp)
-        if not json_blob:
+        data = _parse_answer_json(resp)
+        if data is None:
+            self._count("parse_fail", "fallback")
             return _fallback_extractive(context, payload)
 
         # grounding check: kalau ada red flag yang tidak ada di context -> fallback
-        if not _is_grounded(json_blob, context):
+        if not _is_grounded(resp, context):
+            self._count("ungrounded", "fallback")
             return _fallback_extractive(context, payload)
 
-        summary = re.search(r"\"summary\"\s*:\s*\"(.*?)\"", json_blob, flags=re.DOTALL)
-        summary_txt = summary.group(1).strip() if summary else ""
-
-        steps = re.findall(r"\"steps\"\s*:\s*\[(.*?)\]", json_blob, flags=re.DOTALL)
-        steps_block = steps[0] if steps else ""
-        step_items = re.findall(r"\"(.*?)\"", steps_block, flags=re.DOTALL)
-
-        notes = re.findall(r"\"notes\"\s*:\s*\[(.*?)\]", json_blob, flags=re.DOTALL)
-        notes_block = notes[0] if notes else ""
-        note_items = re.findall(r"\"(.*?)\"", notes_block, flags=re.DOTALL)
+        summary_txt = data["summary"].strip()
+        step_items = data["steps"]
+        note_items = data["notes"]
 
         # Render final 2–5 kalimat + bullet
         out = []
@@ -162,4 +386,4 @@ class OllamaAnswerer:
             out.extend([f"- {n}" for n in note_items[:6]])
 
         out.append(f"\nRujukan: {rujukan}.")
-        return "\n".join(out).strip()
\ No newline at end of file
+        return "\n".join(out).strip()
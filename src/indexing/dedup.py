@@ -0,0 +1,155 @@
+import hashlib
+import random
+from typing import List, Dict, Any, Set, Tuple
+
+import numpy as np
+
+from src.utils.text_utils import tokenize_basic
+
+
+def shingles(text: str, k: int = 5) -> Set[str]:
+    toks = tokenize_basic(text)
+    if len(toks) < k:
+        return {" ".join(toks)} if toks else set()
+    return {" ".join(toks[i:i + k]) for i in range(len(toks) - k + 1)}
+
+
+def _hash64(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def minhash_signatures(shingle_sets: List[Set[str]], num_perm: int = 64, seed: int = 0) -> np.ndarray:
+    """
+    MinHash: h_i(x) = hash64(x) XOR mask_i (XOR dengan mask acak = permutasi ruang 64-bit).
+    Return array (n_docs, num_perm) uint64.
+    """
+    u64_max = np.iinfo(np.uint64).max
+    masks = np.random.default_rng(seed).integers(0, u64_max, size=num_perm, dtype=np.uint64, endpoint=True)
+    empty = np.full(num_perm, u64_max, dtype=np.uint64)
+    sigs = []
+    for sh in shingle_sets:
+        if not sh:
+            sigs.append(empty)
+            continue
+        hv = np.fromiter((_hash64(s) for s in sh), dtype=np.uint64, count=len(sh))
+        sigs.append((hv[:, None] ^ masks[None, :]).min(axis=0))
+    return np.stack(sigs) if sigs else np.zeros((0, num_perm), dtype=np.uint64)
+
+
+def _lsh_candidates(sigs: np.ndarray, bands: int) -> Set[Tuple[int, int]]:
+    rows = sigs.shape[1] // bands
+    pairs: Set[Tuple[int, int]] = set()
+    for b in range(bands):
+        buckets: Dict[bytes, List[int]] = {}
+        for i, row in enumerate(sigs[:, b * rows:(b + 1) * rows]):
+            buckets.setdefault(row.tobytes(), []).append(i)
+        for ids in buckets.values():
+            for x in range(len(ids)):
+                for y in range(x + 1, len(ids)):
+                    pairs.add((ids[x], ids[y]))
+    return pairs
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def dedup_chunks(
+    chunks: List[Dict[str, Any]],
+    threshold: float = 0.85,
+    num_perm: int = 64,
+    bands: int = 16,
+    k: int = 5,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Gabungkan chunk near-duplicate (boilerplate berulang, heading carry-over, klausul identik).
+    Kandidat dari MinHash-LSH, lalu diverifikasi dengan Jaccard shingle >= threshold.
+    Chunk pertama tiap cluster jadi kanonik dan menyimpan provenance semua salinan di "duplicates".
+    """
+    sets = [shingles(c["text"], k=k) for c in chunks]
+    sigs = minhash_signatures(sets, num_perm=num_perm)
+
+    parent = list(range(len(chunks)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in _lsh_candidates(sigs, bands):
+        if _jaccard(sets[i], sets[j]) >= threshold:
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)  # root = index terkecil (urutan dokumen)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(chunks)):
+        groups.setdefault(find(i), []).append(i)
+
+    kept = []
+    for root in sorted(groups):
+        canon = dict(chunks[root])
+        dups = groups[root][1:]
+        if dups:
+            canon["duplicates"] = [{
+                "chunk_id": chunks[d]["chunk_id"],
+                "bab": chunks[d].get("bab", ""),
+                "section": chunks[d].get("section", ""),
+                "subsection": chunks[d].get("subsection", ""),
+                "page_start": chunks[d].get("page_start"),
+                "page_end": chunks[d].get("page_end"),
+            } for d in dups]
+        kept.append(canon)
+
+    chars_in = sum(len(c["text"]) for c in chunks)
+    chars_out = sum(len(c["text"]) for c in kept)
+    stats = {
+        "chunks_in": len(chunks),
+        "chunks_out": len(kept),
+        "removed": len(chunks) - len(kept),
+        "clusters": sum(1 for g in groups.values() if len(g) > 1),
+        "chars_in": chars_in,
+        "chars_out": chars_out,
+        "index_shrink": 1.0 - (len(kept) / max(1, len(chunks))),
+        "text_shrink": 1.0 - (chars_out / max(1, chars_in)),
+    }
+    return kept, stats
+
+
+def rerank_pool_shrink(
+    chunks: List[Dict[str, Any]],
+    kept: List[Dict[str, Any]],
+    k_pool: int = 30,
+    n_queries: int = 50,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """
+    Ukur berapa slot pool rerank yang terisi salinan sebelum dedup (proxy BM25, tanpa embedder):
+    query sintetis = potongan teks chunk acak, pool = top-`k_pool` BM25 di chunk asli.
+    Slot yang chunk-nya satu cluster dengan chunk lain yang sudah ada di pool = 1 call cross-encoder terbuang.
+    """
+    from src.retrieval.hybrid_retriever import build_bm25, bm25_search
+
+    canon = {c["chunk_id"]: c["chunk_id"] for c in kept}
+    for c in kept:
+        for d in c.get("duplicates", []):
+            canon[d["chunk_id"]] = c["chunk_id"]
+
+    bm25 = build_bm25(chunks)
+    rnd = random.Random(seed)
+    queries = [c["text"][:200] for c in rnd.sample(chunks, k=min(n_queries, len(chunks)))]
+    slots, unique = 0, 0
+    for q in queries:
+        pool = bm25_search(bm25, q, topk=k_pool)
+        slots += len(pool)
+        unique += len({canon.get(chunks[i]["chunk_id"], chunks[i]["chunk_id"]) for i in pool.idx})
+    return {
+        "pool_queries": len(queries),
+        "pool_slots_avg": slots / max(1, len(queries)),
+        "pool_unique_avg": unique / max(1, len(queries)),
+        # porsi pair cross-encoder yang hilang setelah dedup (pool yang sama berisi chunk unik saja)
+        "pool_shrink": 1.0 - (unique / max(1, slots)),
+    }
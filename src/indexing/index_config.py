@@ -0,0 +1,45 @@
+import json
+import os
+from typing import Dict, Any, Optional
+
+# Config index Qdrant: ditulis oleh index_qdrant.py, dibaca dense_search & app saat query.
+INDEX_CONFIG_PATH = os.environ.get("CRAG_INDEX_CONFIG", "data/index_config.json")
+
+DEFAULT_INDEX_CONFIG: Dict[str, Any] = {
+    "quantization": "none",   # none | scalar (int8) | binary
+    "on_disk": False,         # vektor float asli di disk (mmap), yang terkuantisasi tetap di RAM
+    "oversampling": 2.0,      # query: ambil limit * oversampling kandidat dari vektor terkuantisasi
+    "rescore": True,          # query: rescore shortlist pakai vektor float asli
+    # HNSW (pilih pakai scripts/tune_hnsw.py); None = default Qdrant
+    "hnsw_m": None,           # index: jumlah edge per node
+    "hnsw_ef_construct": None,  # index: lebar beam saat build graph
+    "hnsw_ef": None,          # query: lebar beam saat search
+    # KB; None = default Qdrant (korpus pedoman di bawahnya -> tanpa graph HNSW, hnsw_* tidak berefek)
+    "indexing_threshold": None,
+    # small vector (named vector "small" di samping "full"); None = 1 vektor saja
+    "small_dim": None,        # mis. 96 / 128
+    "small_method": "pca",    # pca (fit saat indexing) | truncate (model Matryoshka)
+    "small_oversampling": 4.0,  # tahap 1 ambil topk * ini kandidat, lalu rescore dengan vektor full
+    "small_projection": "data/small_projection.npz",
+    # koneksi (lihat src/utils/qdrant_conn.py); env QDRANT_TRANSPORT / QDRANT_URL / QDRANT_PATH meng-override
+    "transport": "rest",      # rest | grpc | embedded (QdrantClient(path=...), tanpa service docker)
+    "qdrant_url": "http://localhost:6333",
+    "grpc_port": 6334,
+    "qdrant_path": "data/qdrant_local",
+}
+
+
+def load_index_config(path: Optional[str] = None) -> Dict[str, Any]:
+    path = path or INDEX_CONFIG_PATH
+    cfg = dict(DEFAULT_INDEX_CONFIG)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            cfg.update(json.load(f))
+    return cfg
+
+
+def save_index_config(cfg: Dict[str, Any], path: Optional[str] = None) -> None:
+    path = path or INDEX_CONFIG_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cfg, f, ensure_ascii=False, indent=2)
@@ -1,42 +1,98 @@
-import argparse, json
-from typing import List, Dict, Any
+import os, sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import argparse, json, time
+from typing import List, Dict, Any, Optional
+
+import numpy as np
 from tqdm import tqdm
 
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as qm
 from sentence_transformers import SentenceTransformer
 
+from src.indexing.index_config import load_index_config, save_index_config
+from src.indexing.small_vectors import FULL_VECTOR, SMALL_VECTOR, SMALL_METHODS, SmallProjection
+from src.utils.qdrant_conn import QDRANT_TRANSPORTS, get_qdrant_client
+from src.retrieval.section_index import SECTION_COLLECTION, build_sections, section_vectors, save_sections
+
 COLLECTION = "unesa_pedoman"
+QUANTIZATION_MODES = ("none", "scalar", "binary")
 
 def load_chunks(path: str) -> List[Dict[str, Any]]:
     return [json.loads(l) for l in open(path, "r", encoding="utf-8")]
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--chunks", required=True, help="data/chunks.jsonl")
-    ap.add_argument("--qdrant_url", default="http://localhost:6333")
-    ap.add_argument("--embed_model", default="intfloat/multilingual-e5-small")
-    args = ap.parse_args()
+def quantization_config(mode: str) -> Optional[qm.QuantizationConfig]:
+    if mode == "scalar":
+        return qm.ScalarQuantization(
+            scalar=qm.ScalarQuantizationConfig(type=qm.ScalarType.INT8, quantile=0.99, always_ram=True),
+        )
+    if mode == "binary":
+        return qm.BinaryQuantization(
+            binary=qm.BinaryQuantizationConfig(always_ram=True),
+        )
+    if mode == "none":
+        return None
+    raise ValueError(f"Unknown quantization mode: {mode!r}")
 
-    client = QdrantClient(url=args.qdrant_url)
-    embedder = SentenceTransformer(args.embed_model)
-
-    chunks = load_chunks(args.chunks)
-    dim = embedder.get_sentence_embedding_dimension()
+def embed_chunks(embedder: SentenceTransformer, chunks: List[Dict[str, Any]], batch_size: int = 32) -> np.ndarray:
+    texts = ["passage: " + c["text"] for c in chunks]
+    return np.asarray(embedder.encode(
+        texts,
+        batch_size=batch_size,
+        normalize_embeddings=True,
+        show_progress_bar=True,
+    ), dtype=np.float32)
 
+def create_collection(
+    client: QdrantClient,
+    name: str,
+    dim: int,
+    quantization: str = "none",
+    on_disk: bool = False,
+    hnsw_m: Optional[int] = None,
+    hnsw_ef_construct: Optional[int] = None,
+    indexing_threshold: Optional[int] = None,
+    small_dim: Optional[int] = None,
+) -> None:
     # recreate collection (dev-friendly)
-    if client.collection_exists(COLLECTION):
-        client.delete_collection(COLLECTION)
+    if client.collection_exists(name):
+        client.delete_collection(name)
+
+    hnsw = None
+    if hnsw_m is not None or hnsw_ef_construct is not None:
+        hnsw = qm.HnswConfigDiff(m=hnsw_m, ef_construct=hnsw_ef_construct)
+    optimizers = None
+    if indexing_threshold is not None:
+        # KB; korpus kecil di bawah default threshold tidak dibuatkan graph HNSW sama sekali
+        optimizers = qm.OptimizersConfigDiff(indexing_threshold=indexing_threshold)
+
+    vectors_config = qm.VectorParams(size=dim, distance=qm.Distance.COSINE, on_disk=on_disk)
+    if small_dim:
+        # named vectors: "small" (tahap 1, selalu di RAM) + "full" (rescore, boleh di disk)
+        vectors_config = {
+            FULL_VECTOR: vectors_config,
+            SMALL_VECTOR: qm.VectorParams(size=small_dim, distance=qm.Distance.COSINE, on_disk=False),
+        }
 
     client.create_collection(
-        collection_name=COLLECTION,
-        vectors_config=qm.VectorParams(size=dim, distance=qm.Distance.COSINE),
+        collection_name=name,
+        vectors_config=vectors_config,
+        quantization_config=quantization_config(quantization),
+        hnsw_config=hnsw,
+        optimizers_config=optimizers,
     )
 
+def upsert_chunks(
+    client: QdrantClient,
+    name: str,
+    chunks: List[Dict[str, Any]],
+    vectors: np.ndarray,
+    batch_size: int = 256,
+    small_vectors: Optional[np.ndarray] = None,
+) -> None:
     points = []
-    for i, c in enumerate(tqdm(chunks, desc="Embedding chunks")):
-        text = c["text"]
-        vec = embedder.encode("passage: " + text, normalize_embeddings=True).tolist()
+    for i, c in enumerate(chunks):
         payload = {
             "chunk_id": c["chunk_id"],
             "bab": c.get("bab",""),
@@ -44,12 +100,119 @@ def main():
             "subsection": c.get("subsection",""),
             "page_start": c.get("page_start"),
             "page_end": c.get("page_end"),
-            "text": text,  # simpan text untuk display + BM25
+            "section_id": c.get("section_id"),
+            # text tidak disimpan: retrieval cuma minta id, teks diambil dari chunks.jsonl lokal
         }
-        points.append(qm.PointStruct(id=i, vector=vec, payload=payload))
+        # id = posisi chunk di chunks.jsonl -> index langsung ke chunk store di app
+        vector = vectors[i].tolist()
+        if small_vectors is not None:
+            vector = {FULL_VECTOR: vector, SMALL_VECTOR: small_vectors[i].tolist()}
+        points.append(qm.PointStruct(id=i, vector=vector, payload=payload))
+
+    for s in tqdm(range(0, len(points), batch_size), desc="Upserting"):
+        client.upsert(collection_name=name, points=points[s:s + batch_size])
+
+def wait_indexed(client: QdrantClient, name: str, n: int, timeout_s: float = 600.0) -> None:
+    """Tunggu optimizer selesai (status green, semua vektor ter-index di graph HNSW / segmen terkuantisasi)."""
+    t_end = time.perf_counter() + timeout_s
+    while time.perf_counter() < t_end:
+        info = client.get_collection(name)
+        if info.status == qm.CollectionStatus.GREEN and (info.indexed_vectors_count or 0) >= n:
+            return
+        time.sleep(0.2)
+    raise TimeoutError(f"collection {name} belum selesai di-index setelah {timeout_s:.0f}s")
+
+def index_sections(
+    client: QdrantClient,
+    sections: List[Dict[str, Any]],
+    chunk_vectors: np.ndarray,
+) -> None:
+    """Collection level section (1 vektor per bab/section) untuk retrieval coarse-to-fine."""
+    vecs = section_vectors(sections, chunk_vectors)
+    create_collection(client, SECTION_COLLECTION, vecs.shape[1])
+    client.upsert(collection_name=SECTION_COLLECTION, points=[
+        qm.PointStruct(id=s["section_id"], vector=vecs[j].tolist(), payload={
+            "bab": s["bab"],
+            "section": s["section"],
+            "n_chunks": len(s["chunk_idx"]),
+        })
+        for j, s in enumerate(sections)
+    ])
+
+def main():
+    cfg = load_index_config()
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", required=True, help="data/chunks.jsonl")
+    ap.add_argument("--transport", choices=QDRANT_TRANSPORTS, default=cfg["transport"],
+                    help="rest | grpc (prefer_grpc) | embedded (QdrantClient(path=...), tanpa docker)")
+    ap.add_argument("--qdrant_url", default=cfg["qdrant_url"])
+    ap.add_argument("--qdrant_path", default=cfg["qdrant_path"], help="folder data untuk transport embedded")
+    ap.add_argument("--embed_model", default="intfloat/multilingual-e5-small")
+    ap.add_argument("--sections_out", default="data/sections.jsonl", help="output index level section")
+    ap.add_argument("--quantization", choices=QUANTIZATION_MODES, default=cfg["quantization"])
+    ap.add_argument("--on_disk", action=argparse.BooleanOptionalAction, default=cfg["on_disk"],
+                    help="simpan vektor float asli di disk (butuh quantization supaya search tetap cepat)")
+    ap.add_argument("--oversampling", type=float, default=cfg["oversampling"],
+                    help="oversampling saat query untuk collection terkuantisasi")
+    ap.add_argument("--hnsw_m", type=int, default=cfg["hnsw_m"], help="default: index config / Qdrant")
+    ap.add_argument("--hnsw_ef_construct", type=int, default=cfg["hnsw_ef_construct"], help="default: index config / Qdrant")
+    ap.add_argument("--indexing_threshold", type=int, default=cfg["indexing_threshold"],
+                    help="KB; kecil (mis. 1) supaya korpus kecil tetap dibuatkan graph HNSW (default: index config / Qdrant)")
+    ap.add_argument("--small_dim", type=int, default=cfg["small_dim"] or 0,
+                    help="simpan juga named vector 'small' berdimensi ini untuk search 2 tahap (0 = off)")
+    ap.add_argument("--small_method", choices=SMALL_METHODS, default=cfg["small_method"])
+    ap.add_argument("--small_oversampling", type=float, default=cfg["small_oversampling"])
+    args = ap.parse_args()
+
+    client = get_qdrant_client(transport=args.transport, url=args.qdrant_url, path=args.qdrant_path)
+    embedder = SentenceTransformer(args.embed_model)
+
+    chunks = load_chunks(args.chunks)
+    dim = embedder.get_sentence_embedding_dimension()
+
+    sections = build_sections(chunks)
+    for sec in sections:
+        for i in sec["chunk_idx"]:
+            # list: chunk hasil dedup bisa ada di > 1 section (MatchAny cocok ke salah satunya)
+            chunks[i].setdefault("section_id", []).append(sec["section_id"])
+
+    vectors = embed_chunks(embedder, chunks)
+    small_vecs = None
+    if args.small_dim:
+        proj = SmallProjection.fit(vectors, args.small_dim, method=args.small_method)
+        proj.save(cfg["small_projection"])  # dipakai dense_search untuk memproyeksikan query
+        small_vecs = proj.project(vectors)
+
+    create_collection(client, COLLECTION, dim, quantization=args.quantization, on_disk=args.on_disk,
+                      hnsw_m=args.hnsw_m, hnsw_ef_construct=args.hnsw_ef_construct,
+                      indexing_threshold=args.indexing_threshold, small_dim=args.small_dim or None)
+    client.create_payload_index(COLLECTION, field_name="section_id", field_schema=qm.PayloadSchemaType.INTEGER)
+    upsert_chunks(client, COLLECTION, chunks, vectors, small_vectors=small_vecs)
+    if args.indexing_threshold is not None and args.transport != "embedded":  # embedded: tanpa HNSW
+        wait_indexed(client, COLLECTION, len(chunks))
+
+    index_sections(client, sections, vectors)
+    save_sections(args.sections_out, sections)
 
-    client.upsert(collection_name=COLLECTION, points=points)
-    print(f"Indexed {len(points)} chunks into Qdrant collection='{COLLECTION}'")
+    cfg.update({
+        "quantization": args.quantization,
+        "on_disk": args.on_disk,
+        "oversampling": args.oversampling,
+        "hnsw_m": args.hnsw_m,
+        "hnsw_ef_construct": args.hnsw_ef_construct,
+        "indexing_threshold": args.indexing_threshold,
+        "small_dim": args.small_dim or None,
+        "small_method": args.small_method,
+        "small_oversampling": args.small_oversampling,
+        # app & script lain konek dengan cara yang sama (embedded: folder yang sama)
+        "transport": args.transport,
+        "qdrant_url": args.qdrant_url,
+        "qdrant_path": args.qdrant_path,
+    })
+    save_index_config(cfg)
+    print(f"Indexed {len(chunks)} chunks into Qdrant collection='{COLLECTION}' (quantization={args.quantization}, on_disk={args.on_disk}, transport={args.transport}, small_dim={args.small_dim or '-'})")
+    print(f"Indexed {len(sections)} sections into Qdrant collection='{SECTION_COLLECTION}', saved {args.sections_out}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
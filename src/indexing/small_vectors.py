@@ -0,0 +1,61 @@
+import os
+from typing import Optional
+
+import numpy as np
+
+# nama vektor di collection kalau small vector aktif
+FULL_VECTOR = "full"
+SMALL_VECTOR = "small"
+SMALL_METHODS = ("pca", "truncate")
+
+
+class SmallProjection:
+    """
+    Proyeksi embedding ke dimensi kecil untuk tahap 1 dense search:
+    - pca: di-fit dari vektor chunk saat indexing (cocok untuk model biasa seperti e5-small)
+    - truncate: ambil `dim` komponen pertama (hanya bagus untuk model Matryoshka)
+    Hasil proyeksi dinormalisasi ulang supaya tetap pakai cosine.
+    """
+    def __init__(self, mean: np.ndarray, components: np.ndarray, method: str = "pca", oversampling: float = 4.0):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.asarray(components, dtype=np.float32)  # (dim_small, dim_full)
+        self.method = method
+        self.oversampling = oversampling  # tahap 1 ambil topk * oversampling kandidat
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[0]
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, dim: int, method: str = "pca", oversampling: float = 4.0) -> "SmallProjection":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n, full = vectors.shape
+        if not 0 < dim < full:
+            raise ValueError(f"small dim must be in (0, {full}), got {dim}")
+        if method == "pca" and dim > n:
+            # SVD cuma menghasilkan min(n, full) komponen -> vektor small lebih pendek dari small_dim collection
+            raise ValueError(f"pca small dim {dim} needs at least {dim} vectors to fit, got {n}")
+        if method == "truncate":
+            return cls(np.zeros(full), np.eye(full, dtype=np.float32)[:dim], method, oversampling)
+        if method == "pca":
+            mean = vectors.mean(axis=0)
+            _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+            return cls(mean, vt[:dim], method, oversampling)
+        raise ValueError(f"Unknown small vector method: {method!r}")
+
+    def project(self, vectors: np.ndarray) -> np.ndarray:
+        """(n, dim_full) atau (dim_full,) -> vektor kecil ternormalisasi, float32."""
+        out = (np.asarray(vectors, dtype=np.float32) - self.mean) @ self.components.T
+        norm = np.linalg.norm(out, axis=-1, keepdims=True)
+        return (out / np.maximum(norm, 1e-12)).astype(np.float32)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, mean=self.mean, components=self.components, method=np.array(self.method))
+
+    @classmethod
+    def load(cls, path: str, oversampling: float = 4.0) -> Optional["SmallProjection"]:
+        if not os.path.exists(path):
+            return None
+        data = np.load(path)
+        return cls(data["mean"], data["components"], str(data["method"]), oversampling)
@@ -0,0 +1,103 @@
+from __future__ import annotations
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+SCORE_FIELDS = ("dense", "lex", "hybrid", "rerank")
+
+
+def _scores(values, n: int, fill: float) -> np.ndarray:
+    if values is None:
+        return np.full(n, fill, dtype=np.float32)
+    return np.asarray(values, dtype=np.float32)
+
+
+class CandidatePool:
+    """
+    Representasi kompak kandidat retrieval:
+    - idx: index chunk (posisi di chunks.jsonl == point id di Qdrant)
+    - dense / lex / hybrid / rerank: array skor sejajar dengan idx
+      (rerank = NaN kalau belum di-rerank; untuk pool hasil fusion, hybrid = skor RRF)
+
+    Teks dan metadata TIDAK disimpan di sini; ambil dari chunk store lokal
+    (chunks_payload) hanya saat dibutuhkan, lewat `texts()` atau `to_hits()`.
+    """
+    __slots__ = ("idx",) + SCORE_FIELDS
+
+    def __init__(
+        self,
+        idx,
+        dense=None,
+        lex=None,
+        hybrid=None,
+        rerank=None,
+    ):
+        self.idx = np.asarray(idx, dtype=np.int64)
+        n = len(self.idx)
+        self.dense = _scores(dense, n, 0.0)
+        self.lex = _scores(lex, n, 0.0)
+        self.hybrid = _scores(hybrid, n, 0.0)
+        self.rerank = _scores(rerank, n, np.nan)
+
+    @classmethod
+    def empty(cls) -> "CandidatePool":
+        return cls(np.zeros(0, dtype=np.int64))
+
+    def __len__(self) -> int:
+        return len(self.idx)
+
+    def take(self, order) -> "CandidatePool":
+        order = np.asarray(order, dtype=np.int64)
+        return CandidatePool(
+            self.idx[order],
+            dense=self.dense[order],
+            lex=self.lex[order],
+            hybrid=self.hybrid[order],
+            rerank=self.rerank[order],
+        )
+
+    def head(self, k: int) -> "CandidatePool":
+        return self.take(np.arange(min(k, len(self))))
+
+    def sort_by(self, field: str) -> "CandidatePool":
+        # NaN (belum di-rerank) selalu di belakang
+        scores = np.nan_to_num(getattr(self, field), nan=-np.inf)
+        return self.take(np.argsort(-scores, kind="stable"))
+
+    def exclude(self, idx) -> "CandidatePool":
+        return self.take(np.flatnonzero(~np.isin(self.idx, idx)))
+
+    def concat(self, other: "CandidatePool") -> "CandidatePool":
+        return CandidatePool(
+            np.concatenate([self.idx, other.idx]),
+            dense=np.concatenate([self.dense, other.dense]),
+            lex=np.concatenate([self.lex, other.lex]),
+            hybrid=np.concatenate([self.hybrid, other.hybrid]),
+            rerank=np.concatenate([self.rerank, other.rerank]),
+        )
+
+    def texts(self, chunks_payload: List[Dict[str, Any]]) -> List[str]:
+        return [chunks_payload[i]["text"] for i in self.idx]
+
+    def to_hits(
+        self,
+        chunks_payload: List[Dict[str, Any]],
+        topk: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Materialisasi jadi list dict (format lama) untuk gate, answerer, dan UI."""
+        n = len(self) if topk is None else min(topk, len(self))
+        out: List[Dict[str, Any]] = []
+        for j in range(n):
+            i = int(self.idx[j])
+            hit = {
+                "idx": i,
+                "chunk_id": chunks_payload[i]["chunk_id"],
+                "payload": chunks_payload[i],
+                "score_dense": float(self.dense[j]),
+                "score_lex": float(self.lex[j]),
+                "score_hybrid": float(self.hybrid[j]),
+            }
+            if not np.isnan(self.rerank[j]):
+                hit["score_rerank"] = float(self.rerank[j])
+            out.append(hit)
+        return out
@@ -1,8 +1,16 @@
 from __future__ import annotations
-from typing import List, Dict, Any, Tuple
+import time
+from functools import partial
+from typing import Callable, List, Dict, Any, Optional, Tuple
 
-from src.retrieval.hybrid_retriever import dense_search, bm25_search, merge_hybrid
+from src.retrieval.candidates import CandidatePool
+from src.retrieval.hybrid_retriever import (
+    dense_search, dense_search_batch, encode_queries, search_vectors_batch, default_small_projection,
+    bm25_search, merge_hybrid, rrf_fuse, QueryEmbeddingCache,
+)
+from src.retrieval.section_index import SectionIndex, section_filter
 from src.utils.text_utils import content_keywords
+from src.utils.timing import Deadline, StageStats, StageTimer, STAGE_STATS
 from src.retrieval.reranker import Reranker
 from src.retrieval.query_transform import QueryTransformer
 
@@ -30,6 +38,162 @@ def evidence_good(
     ok = (top_r >= min_rerank) and (cov >= min_cov)
     return ok, {"rerank_top": float(top_r), "coverage": float(cov)}
 
+def _hybrid_pool(
+    v: str,
+    k_dense: int,
+    k_lex: int,
+    k_pool: int,
+    client,
+    embedder,
+    bm25,
+    embed_cache: Optional[QueryEmbeddingCache] = None,
+    sections: Optional[SectionIndex] = None,
+    top_sections: int = 3,
+) -> Tuple[CandidatePool, List[str]]:
+    """
+    Dense + BM25 + merge untuk 1 variant.
+    Kalau `sections` diisi: pilih top section dulu, lalu chunk search hanya di section tsb.
+    Return (pool, label section terpilih).
+    """
+    qfilter, restrict, labels = None, None, []
+    if sections is not None:
+        sel = sections.select(client, embedder, v, top_sections=top_sections, cache=embed_cache)
+        qfilter, restrict, labels = section_filter(sel), sections.chunks_in(sel), sections.labels(sel)
+
+    dense = dense_search(client, embedder, v, topk=k_dense, cache=embed_cache, query_filter=qfilter)
+    lex = bm25_search(bm25, v, topk=k_lex, restrict=restrict)
+    return merge_hybrid(dense, lex, topk=k_pool), labels
+
+def _hybrid_pools_batch(
+    variants: List[str],
+    k_dense: int,
+    k_lex: int,
+    k_pool: int,
+    client,
+    embedder,
+    bm25,
+    embed_cache: Optional[QueryEmbeddingCache] = None,
+    sections: Optional[SectionIndex] = None,
+    top_sections: int = 3,
+) -> Tuple[List[CandidatePool], List[str]]:
+    """
+    Seperti _hybrid_pool untuk semua variant sekaligus: 1 batch encode, 1 request Qdrant untuk
+    pilih section (kalau `sections` diisi) dan 1 untuk chunk search; BM25 tetap per variant.
+    Return (pool per variant, label section terpilih gabungan).
+    """
+    qvecs = encode_queries(embedder, variants, cache=embed_cache)
+    filters, restricts, labels = [None] * len(variants), [None] * len(variants), []
+    if sections is not None:
+        sels = sections.select_batch(client, variants, qvecs, top_sections=top_sections)
+        filters = [section_filter(sel) for sel in sels]
+        restricts = [sections.chunks_in(sel) for sel in sels]
+        for sel in sels:
+            labels.extend(l for l in sections.labels(sel) if l not in labels)
+
+    dense = search_vectors_batch(client, qvecs, topk=k_dense, query_filters=filters, small=default_small_projection())
+    pools = [
+        merge_hybrid(d, bm25_search(bm25, v, topk=k_lex, restrict=r), topk=k_pool)
+        for v, d, r in zip(variants, dense, restricts)
+    ]
+    return pools, labels
+
+def _best_so_far(
+    best: Optional[Tuple[float, List[Dict[str, Any]], CandidatePool]],
+    min_rerank: float,
+    debug: Dict[str, Any],
+    allow_partial: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Budget habis sebelum ada attempt yang lolos gate penuh: default abstain ([]).
+    `allow_partial=True` (opt-in): kembalikan evidence terbaik sejauh ini kalau skor rerank
+    teratasnya lolos bagian rerank dari gate (coverage boleh kurang).
+    debug["partial_gate"] = evidence setengah-lolos gate itu dikembalikan atau tidak.
+    """
+    debug["budget_exhausted"] = True
+    debug["partial_gate"] = False
+    if not allow_partial or best is None or best[0] < min_rerank:
+        return []
+    debug["partial_gate"] = True
+    debug["pool_idx"] = best[2].idx.tolist()
+    return best[1]
+
+def _crag_fusion(
+    question: str,
+    variants: List[str],
+    retrieve_batch: Callable[..., Tuple[List[CandidatePool], List[str]]],
+    retrieve_full: Callable[..., Tuple[CandidatePool, List[str]]],
+    chunks_payload,
+    reranker: Reranker,
+    k_dense: int,
+    k_lex: int,
+    k_pool: int,
+    k_final: int,
+    min_rerank: float,
+    min_cov: float,
+    debug: Dict[str, Any],
+    timer: StageTimer,
+    corrective: bool = True,
+    deadline: Optional[Deadline] = None,
+    stats: StageStats = STAGE_STATS,
+    allow_partial: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Mode "fusion": semua variant di-retrieve sekaligus (1 batch encode + query_batch_points,
+    lihat _hybrid_pools_batch), hasilnya digabung (RRF) jadi 1 pool unik, rerank sekali, lalu gate.
+    Corrective pass hanya menambah kandidat baru ke pool yang sama.
+    """
+    t0 = time.perf_counter()
+    with timer.stage("retrieve"):
+        per_variant, labels = retrieve_batch(variants, k_dense, k_lex, k_pool)
+        pool = rrf_fuse(per_variant, topk=k_pool)
+    with timer.stage("rerank"):
+        pool = reranker.rerank(question, pool, chunks_payload, topk=len(pool))  # skor semua kandidat
+    top = pool.to_hits(chunks_payload, topk=k_final)
+    stats.observe("fusion", (time.perf_counter() - t0) * 1000.0)
+
+    ok, metrics = evidence_good(question, top, min_rerank=min_rerank, min_cov=min_cov)
+    debug["attempts"].append({
+        "variant": f"fusion ({len(variants)} variants)",
+        "sections": labels,
+        "pool_size": len(pool),
+        "top_chunk_ids": [t["chunk_id"] for t in top],
+        **metrics,
+        "ok": ok,
+    })
+    if ok:
+        debug["pool_idx"] = pool.idx.tolist()
+        return top
+    if not corrective:
+        return []
+    if deadline is not None and not deadline.fits(stats.estimate("corrective")):
+        return _best_so_far((metrics["rerank_top"], top, pool), min_rerank, debug, allow_partial)
+
+    # Corrective: bigger k on best variant (seluruh korpus), rerank kandidat baru saja
+    t0 = time.perf_counter()
+    v = variants[0] if variants else question
+    with timer.stage("retrieve"):
+        new, _ = retrieve_full(v, max(40, k_dense), max(40, k_lex), max(60, k_pool))
+    with timer.stage("rerank"):
+        new = reranker.rerank(question, new.exclude(pool.idx), chunks_payload, topk=len(new))
+
+    pool = pool.concat(new).sort_by("rerank")
+    top = pool.to_hits(chunks_payload, topk=k_final)
+    stats.observe("corrective", (time.perf_counter() - t0) * 1000.0)
+
+    ok, metrics = evidence_good(question, top, min_rerank=min_rerank, min_cov=min_cov)
+    debug["attempts"].append({
+        "variant": v + " (corrective: extend pool)",
+        "pool_size": len(pool),
+        "new_candidates": len(new),
+        "top_chunk_ids": [t["chunk_id"] for t in top],
+        **metrics,
+        "ok": ok,
+    })
+    if ok:
+        debug["pool_idx"] = pool.idx.tolist()
+        return top
+    return []
+
 def crag_retrieve(
     question: str,
     client,
@@ -44,34 +208,109 @@ def crag_retrieve(
     k_final: int = 6,
     min_rerank: float = 0.1,
     min_cov: float = 0.25,
+    mode: str = "sequential",
+    n_variants: int = 3,
+    variants: Optional[List[str]] = None,
+    embed_cache: Optional[QueryEmbeddingCache] = None,
+    sections: Optional[SectionIndex] = None,
+    top_sections: int = 3,
+    corrective: bool = True,
+    budget_ms: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+    stage_stats: Optional[StageStats] = None,
+    allow_partial: bool = False,
 ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
-    variants = qt.transform(question, max_variants=6)
-    debug: Dict[str, Any] = {"variants": variants, "attempts": []}
+    """
+    mode="sequential": coba variant satu per satu, berhenti di variant pertama yang lolos gate.
+    mode="fusion": semua variant sekaligus + RRF, rerank sekali (lihat _crag_fusion).
+    `variants` boleh diisi dari luar (mis. benchmark) supaya query transform tidak dipanggil ulang.
+    `embed_cache` (QueryEmbeddingCache) dipakai untuk semua dense_search.
+    `sections` (SectionIndex): retrieval coarse-to-fine, chunk search & rerank hanya di
+    `top_sections` section teratas; corrective pass tetap ke seluruh korpus.
+    `corrective=False`: tanpa corrective pass (mis. saat degradasi karena beban tinggi).
+    Kalau lolos gate, debug["pool_idx"] = index chunk pool yang di-rerank (dipakai follow-up).
+    `budget_ms` / `deadline` (Deadline, bisa di-share dengan answerer): transform dan attempt
+    berikutnya hanya dijalankan kalau estimasi biayanya (EWMA di `stage_stats`) muat di sisa budget.
+    Kalau budget habis sebelum ada yang lolos gate penuh: abstain; dengan `allow_partial=True`
+    evidence terbaik yang lolos bagian rerank dari gate dikembalikan (lihat _best_so_far).
+    """
+    if mode not in ("sequential", "fusion"):
+        raise ValueError(f"Unknown crag mode: {mode!r}")
+    if deadline is None and budget_ms is not None:
+        deadline = Deadline(budget_ms)
+    stats = stage_stats or STAGE_STATS
+
+    timer = StageTimer()
+    skipped_transform = False
+    if variants is None:
+        attempt_ms = stats.estimate("fusion" if mode == "fusion" else "attempt")
+        if deadline is not None and not deadline.fits(stats.estimate("transform") + attempt_ms):
+            variants, skipped_transform = [question], True
+        else:
+            with timer.stage("transform"):
+                variants = qt.transform(question, max_variants=6, deadline=deadline)
+            stats.observe("transform", timer.ms["transform"])
+    debug: Dict[str, Any] = {"mode": mode, "variants": variants, "attempts": [], "timings_ms": timer.ms}
+    if deadline is not None:
+        debug["budget_ms"] = deadline.budget_ms
+        debug["skipped_transform"] = skipped_transform
+
+    retrieve_full = partial(_hybrid_pool, client=client, embedder=embedder, bm25=bm25, embed_cache=embed_cache)
+    retrieve = partial(retrieve_full, sections=sections, top_sections=top_sections)
+
+    if mode == "fusion":
+        retrieve_batch = partial(
+            _hybrid_pools_batch, client=client, embedder=embedder, bm25=bm25, embed_cache=embed_cache,
+            sections=sections, top_sections=top_sections,
+        )
+        top = _crag_fusion(
+            question, variants[:n_variants] or [question], retrieve_batch, retrieve_full,
+            chunks_payload, reranker,
+            k_dense, k_lex, k_pool, k_final, min_rerank, min_cov, debug, timer,
+            corrective=corrective, deadline=deadline, stats=stats, allow_partial=allow_partial,
+        )
+        return top, debug
 
-    # Try a few variants (normal)
-    for v in variants[:3]:
-        dense = dense_search(client, embedder, v, topk=k_dense)
-        lex = bm25_search(bm25, chunks_payload, v, topk=k_lex)
-        pool = merge_hybrid(dense, lex, topk=k_pool)
-        top = reranker.rerank(question, pool, topk=k_final)
+    # Try a few variants (normal); attempt pertama selalu jalan
+    best = None  # (rerank_top, top, pool) terbaik yang belum lolos gate
+    for i, v in enumerate(variants[:n_variants]):
+        if i > 0 and deadline is not None and not deadline.fits(stats.estimate("attempt")):
+            return _best_so_far(best, min_rerank, debug, allow_partial), debug
+
+        t0 = time.perf_counter()
+        with timer.stage("retrieve"):
+            pool, labels = retrieve(v, k_dense, k_lex, k_pool)
+        with timer.stage("rerank"):
+            top = reranker.rerank(question, pool, chunks_payload, topk=k_final).to_hits(chunks_payload)
+        stats.observe("attempt", (time.perf_counter() - t0) * 1000.0)
 
         ok, metrics = evidence_good(question, top, min_rerank=min_rerank, min_cov=min_cov)
         debug["attempts"].append({
             "variant": v,
+            "sections": labels,
             "pool_size": len(pool),
             "top_chunk_ids": [t["chunk_id"] for t in top],
             **metrics,
             "ok": ok,
         })
         if ok:
+            debug["pool_idx"] = pool.idx.tolist()
             return top, debug
+        if best is None or metrics["rerank_top"] > best[0]:
+            best = (metrics["rerank_top"], top, pool)
+    if not corrective:
+        return [], debug
+    if deadline is not None and not deadline.fits(stats.estimate("corrective")):
+        return _best_so_far(best, min_rerank, debug, allow_partial), debug
 
-    # Corrective: bigger k on best variant
+    # Corrective: bigger k on best variant (seluruh korpus)
+    t0 = time.perf_counter()
     v = variants[0] if variants else question
-    dense = dense_search(client, embedder, v, topk=max(40, k_dense))
-    lex = bm25_search(bm25, chunks_payload, v, topk=max(40, k_lex))
-    pool = merge_hybrid(dense, lex, topk=max(60, k_pool))
-    top = reranker.rerank(question, pool, topk=k_final)
+    with timer.stage("retrieve"):
+        pool, _ = retrieve_full(v, max(40, k_dense), max(40, k_lex), max(60, k_pool))
+    with timer.stage("rerank"):
+        top = reranker.rerank(question, pool, chunks_payload, topk=k_final).to_hits(chunks_payload)
+    stats.observe("corrective", (time.perf_counter() - t0) * 1000.0)
 
     ok, metrics = evidence_good(question, top, min_rerank=min_rerank, min_cov=min_cov)
     debug["attempts"].append({
@@ -83,6 +322,91 @@ def crag_retrieve(
     })
 
     if ok:
+        debug["pool_idx"] = pool.idx.tolist()
         return top, debug
 
-    return [], debug
\ No newline at end of file
+    return [], debug
+
+def crag_retrieve_batch(
+    questions: List[str],
+    variants_list: List[List[str]],
+    client,
+    embedder,
+    chunks_payload,
+    bm25,
+    reranker: Reranker,
+    k_dense: int = 20,
+    k_lex: int = 20,
+    k_pool: int = 30,
+    k_final: int = 6,
+    min_rerank: float = 0.1,
+    min_cov: float = 0.25,
+    n_variants: int = 3,
+    embed_cache: Optional[QueryEmbeddingCache] = None,
+) -> List[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+    """
+    Mode fusion untuk banyak pertanyaan sekaligus (batch CLI):
+    semua variant semua pertanyaan di-encode + dicari di Qdrant dalam 1 batch,
+    rerank semua pool dalam 1 predict, lalu corrective pass (juga batch) untuk yang gagal gate.
+    Query transform dilakukan di luar (`variants_list`), supaya bisa diparalelkan.
+    """
+    n = len(questions)
+    qvariants = [vs[:n_variants] or [q] for q, vs in zip(questions, variants_list)]
+    debugs = [{"mode": "fusion-batch", "variants": vs, "attempts": []} for vs in qvariants]
+
+    flat = [v for vs in qvariants for v in vs]
+    dense_all = iter(dense_search_batch(client, embedder, flat, topk=k_dense, cache=embed_cache))
+    pools = []
+    for vs in qvariants:
+        per_variant = [
+            merge_hybrid(next(dense_all), bm25_search(bm25, v, topk=k_lex), topk=k_pool)
+            for v in vs
+        ]
+        pools.append(rrf_fuse(per_variant, topk=k_pool))
+    pools = reranker.rerank_batch(questions, pools, chunks_payload)
+
+    results: List[List[Dict[str, Any]]] = [[] for _ in range(n)]
+    retry = []
+    for i in range(n):
+        top = pools[i].to_hits(chunks_payload, topk=k_final)
+        ok, metrics = evidence_good(questions[i], top, min_rerank=min_rerank, min_cov=min_cov)
+        debugs[i]["attempts"].append({
+            "variant": f"fusion ({len(qvariants[i])} variants)",
+            "pool_size": len(pools[i]),
+            "top_chunk_ids": [t["chunk_id"] for t in top],
+            **metrics,
+            "ok": ok,
+        })
+        if ok:
+            results[i] = top
+        else:
+            retry.append(i)
+
+    if not retry:
+        return list(zip(results, debugs))
+
+    # Corrective (batch): bigger k on best variant, rerank kandidat baru saja
+    first = [qvariants[i][0] for i in retry]
+    dense_big = dense_search_batch(client, embedder, first, topk=max(40, k_dense), cache=embed_cache)
+    new_pools = [
+        merge_hybrid(d, bm25_search(bm25, v, topk=max(40, k_lex)), topk=max(60, k_pool)).exclude(pools[i].idx)
+        for i, v, d in zip(retry, first, dense_big)
+    ]
+    new_pools = reranker.rerank_batch([questions[i] for i in retry], new_pools, chunks_payload)
+
+    for i, v, new in zip(retry, first, new_pools):
+        pool = pools[i].concat(new).sort_by("rerank")
+        top = pool.to_hits(chunks_payload, topk=k_final)
+        ok, metrics = evidence_good(questions[i], top, min_rerank=min_rerank, min_cov=min_cov)
+        debugs[i]["attempts"].append({
+            "variant": v + " (corrective: extend pool)",
+            "pool_size": len(pool),
+            "new_candidates": len(new),
+            "top_chunk_ids": [t["chunk_id"] for t in top],
+            **metrics,
+            "ok": ok,
+        })
+        if ok:
+            results[i] = top
+
+    return list(zip(results, debugs))
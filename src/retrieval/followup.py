@@ -0,0 +1,152 @@
+from __future__ import annotations
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from src.retrieval.candidates import CandidatePool
+from src.retrieval.crag import crag_retrieve, evidence_good
+from src.retrieval.reranker import Reranker
+from src.retrieval.section_index import section_members
+from src.retrieval.query_transform import QueryTransformer
+from src.utils.timing import Deadline, StageStats, StageTimer, STAGE_STATS
+
+
+class ConversationState:
+    """
+    State retrieval per sesi chat: pool hasil rerank turn sebelumnya + section evidence teratasnya.
+    `question` = pertanyaan jangkar (turn terakhir yang dijawab lewat retrieval penuh, jadi berdiri
+    sendiri); follow-up yang dijawab dari pool tidak menggantinya, supaya konteks tidak hilang
+    setelah 1 hop ("cuti akademik?" -> "berapa lama?" -> "biayanya?").
+    Disimpan di session (mis. st.session_state), bukan di komponen yang dipakai bersama.
+    """
+    def __init__(self, max_candidates: int = 60):
+        self.max_candidates = max_candidates
+        self.clear()
+
+    def clear(self) -> None:
+        self.question = ""
+        self.pool_idx = np.zeros(0, dtype=np.int64)
+        self.section: Optional[Tuple[str, str]] = None  # (bab, section)
+        self.turns = 0
+
+    @property
+    def has_context(self) -> bool:
+        return len(self.pool_idx) > 0 or self.section is not None
+
+    def update(self, question: str, top: List[Dict[str, Any]], pool_idx, followup: bool = False) -> None:
+        """
+        Simpan hasil turn ini; kalau tidak ada evidence, state dikosongkan.
+        `followup=True`: dijawab dari pool turn sebelumnya, pertanyaan jangkar tetap.
+        """
+        if not top:
+            self.clear()
+            return
+        p = top[0]["payload"]
+        if not followup or not self.question:
+            self.question = question
+        self.pool_idx = np.asarray(pool_idx, dtype=np.int64)
+        self.section = (p.get("bab", ""), p.get("section", ""))
+        self.turns += 1
+
+    def candidates(self, section_map: Dict[Tuple[str, str], np.ndarray], limit: Optional[int] = None) -> CandidatePool:
+        """
+        Pool turn sebelumnya ∪ chunk di section-nya (pool duluan), dibatasi `limit` (default max_candidates).
+        `section_map`: hasil section_members(chunks_payload).
+        """
+        parts = [self.pool_idx]
+        if self.section is not None:
+            parts.append(section_map.get(self.section, np.zeros(0, dtype=np.int64)))
+        idx = np.concatenate(parts)
+        _, first = np.unique(idx, return_index=True)
+        return CandidatePool(idx[np.sort(first)][:self.max_candidates if limit is None else limit])
+
+
+def followup_retrieve(
+    question: str,
+    state: ConversationState,
+    client,
+    embedder,
+    chunks_payload,
+    bm25,
+    reranker: Reranker,
+    qt: QueryTransformer,
+    k_pool: int = 30,
+    k_final: int = 6,
+    min_rerank: float = 0.1,
+    min_cov: float = 0.25,
+    section_map: Optional[Dict[Tuple[str, str], np.ndarray]] = None,
+    budget_ms: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+    stage_stats: Optional[StageStats] = None,
+    **crag_kwargs,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Retrieval untuk chat multi-turn:
+    1) kalau ada state, rerank evidence turn sebelumnya (pool ∪ section) terhadap
+       "pertanyaan jangkar + follow-up", lalu gate top-k dengan skor follow-up saja;
+    2) kalau gagal gate (atau belum ada state), fallback ke crag_retrieve penuh.
+    State di-update dengan hasil akhirnya. `crag_kwargs` diteruskan ke crag_retrieve.
+    `section_map`: section_members(chunks_payload), dibangun sekali di luar (kalau None dibangun di sini).
+    `k_pool` (mis. dari degradation_plan) juga membatasi kandidat cached path: maks 2 * k_pool.
+    `budget_ms` / `deadline`: seperti crag_retrieve; cached path selalu jalan (attempt pertama),
+    fallback hanya kalau estimasi 1 attempt masih muat, deadline yang sama diteruskan ke crag_retrieve.
+    """
+    if deadline is None and budget_ms is not None:
+        deadline = Deadline(budget_ms)
+    stats = stage_stats or STAGE_STATS
+    attempts: List[Dict[str, Any]] = []
+    timer = StageTimer()
+
+    if state.has_context:
+        if section_map is None:
+            section_map = section_members(chunks_payload)
+        t0 = time.perf_counter()
+        cand = state.candidates(section_map, limit=min(state.max_candidates, 2 * k_pool))
+        # follow-up sering elips ("lalu berapa lama?") -> urutan pakai konteks pertanyaan jangkar,
+        # tapi gate (rerank + coverage) dihitung dari follow-up itu sendiri: pertanyaan jangkar
+        # selalu menarik chunk section lama di atas threshold, jadi ganti topik tidak akan fallback
+        rq = f"{state.question} {question}".strip()
+        with timer.stage("rerank"):
+            pool = reranker.rerank(rq, cand, chunks_payload, topk=len(cand))
+            own = reranker.rerank(question, pool.head(k_final), chunks_payload, topk=k_final)
+        top = pool.to_hits(chunks_payload, topk=k_final)
+        stats.observe("followup", (time.perf_counter() - t0) * 1000.0)
+
+        ok, metrics = evidence_good(question, own.to_hits(chunks_payload), min_rerank=min_rerank, min_cov=min_cov)
+        attempts.append({
+            "variant": f"follow-up (turn {state.turns + 1}, cached pool)",
+            "pool_size": len(pool),
+            "top_chunk_ids": [t["chunk_id"] for t in top],
+            "rerank_top_with_context": float(pool.rerank[0]) if len(pool) else 0.0,
+            **metrics,
+            "ok": ok,
+        })
+        debug: Dict[str, Any] = {
+            "mode": "followup",
+            "variants": [question],
+            "attempts": attempts,
+            "timings_ms": timer.ms,
+        }
+        if deadline is not None:
+            debug["budget_ms"] = deadline.budget_ms
+        if ok:
+            state.update(question, top, pool.idx, followup=True)
+            debug["pool_idx"] = pool.idx.tolist()
+            return top, debug
+        if deadline is not None and not deadline.fits(stats.estimate("attempt")):
+            debug["budget_exhausted"] = True
+            debug["partial_gate"] = False
+            state.clear()
+            return [], debug
+
+    top, debug = crag_retrieve(
+        question, client, embedder, chunks_payload, bm25, reranker, qt,
+        k_pool=k_pool, k_final=k_final, min_rerank=min_rerank, min_cov=min_cov,
+        deadline=deadline, stage_stats=stage_stats, **crag_kwargs,
+    )
+    debug["attempts"] = attempts + debug["attempts"]
+    if "rerank" in timer.ms:
+        debug["timings_ms"]["followup_rerank"] = timer.ms["rerank"]
+    state.update(question, top, debug.get("pool_idx", []))
+    return top, debug
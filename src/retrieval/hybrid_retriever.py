@@ -1,97 +1,345 @@
-from typing import List, Dict, Any
-from qdrant_client import QdrantClient
-from sentence_transformers import SentenceTransformer
-from rank_bm25 import BM25Okapi
+from __future__ import annotations
+import json
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
 
+import numpy as np
+
+if TYPE_CHECKING:  # import berat (torch, qdrant) hanya saat dipakai, biar startup app cepat
+    from qdrant_client import QdrantClient
+    from qdrant_client.http import models as qm
+    from sentence_transformers import SentenceTransformer
+    from rank_bm25 import BM25Okapi
+
+from src.indexing.index_config import load_index_config
+from src.indexing.small_vectors import FULL_VECTOR, SMALL_VECTOR, SmallProjection
+from src.retrieval.candidates import CandidatePool
+from src.utils.cache import LRUCache
 from src.utils.text_utils import tokenize_basic
 
 COLLECTION = "unesa_pedoman"
 
+def load_chunks_payload(path: str = "data/chunks.jsonl") -> List[Dict[str, Any]]:
+    chunks = [json.loads(l) for l in open(path, "r", encoding="utf-8")]
+    return [{
+        "chunk_id": c["chunk_id"],
+        "text": c["text"],
+        "bab": c.get("bab",""),
+        "section": c.get("section",""),
+        "subsection": c.get("subsection",""),
+        "page_start": c.get("page_start"),
+        "page_end": c.get("page_end"),
+        "duplicates": c.get("duplicates", []),  # provenance salinan yang digabung saat dedup
+    } for c in chunks]
+
 def build_bm25(chunks_payload: List[Dict[str, Any]]) -> BM25Okapi:
+    from rank_bm25 import BM25Okapi
+
     corpus = [tokenize_basic(p["text"]) for p in chunks_payload]
     return BM25Okapi(corpus)
 
-def dense_search(
+@lru_cache(maxsize=1)
+def default_search_params() -> Optional[qm.SearchParams]:
+    """Search params dari index config (hnsw_ef, quantization); None kalau semua default Qdrant."""
+    from qdrant_client.http import models as qm
+
+    cfg = load_index_config()
+    quantization = None
+    if cfg["quantization"] != "none":
+        quantization = qm.QuantizationSearchParams(
+            rescore=cfg["rescore"],
+            oversampling=cfg["oversampling"],
+        )
+    if quantization is None and cfg["hnsw_ef"] is None:
+        return None
+    return qm.SearchParams(hnsw_ef=cfg["hnsw_ef"], quantization=quantization)
+
+@lru_cache(maxsize=1)
+def default_small_projection() -> Optional[SmallProjection]:
+    """
+    Proyeksi small vector dari index config; None kalau collection chunk cuma punya 1 vektor.
+    Kalau small_dim diset tapi file proyeksi tidak ada / beda dimensi, error di sini:
+    tanpa proyeksi, query tanpa nama vektor ke collection named-vector selalu gagal di Qdrant.
+    """
+    cfg = load_index_config()
+    if not cfg["small_dim"]:
+        return None
+    proj = SmallProjection.load(cfg["small_projection"], oversampling=cfg["small_oversampling"])
+    if proj is None:
+        raise FileNotFoundError(
+            f"index config has small_dim={cfg['small_dim']} but projection file {cfg['small_projection']!r} "
+            f"is missing; re-run src/indexing/index_qdrant.py (or set small_dim to null)"
+        )
+    if proj.dim != cfg["small_dim"]:
+        raise ValueError(
+            f"projection {cfg['small_projection']!r} has dim {proj.dim}, index config small_dim={cfg['small_dim']}; "
+            f"re-run src/indexing/index_qdrant.py"
+        )
+    return proj
+
+def _dense_query(
+    qvec,
+    topk: int,
+    params: Optional[qm.SearchParams],
+    query_filter: Optional[qm.Filter],
+    small: Optional[SmallProjection],
+) -> Dict[str, Any]:
+    """
+    Argumen query Qdrant untuk 1 vektor query.
+    Dengan `small`: tahap 1 di vektor "small" (prefetch, topk * oversampling kandidat),
+    tahap 2 rescore shortlist dengan vektor "full".
+    """
+    from qdrant_client.http import models as qm
+
+    qvec = np.asarray(qvec, dtype=np.float32)
+    if small is None:
+        return {"query": qvec.tolist()}
+    return {
+        "query": qvec.tolist(),
+        "using": FULL_VECTOR,
+        "prefetch": qm.Prefetch(
+            query=small.project(qvec).tolist(),
+            using=SMALL_VECTOR,
+            limit=max(topk, int(topk * small.oversampling)),
+            filter=query_filter,
+            params=params,
+        ),
+    }
+
+def search_vector(
     client: QdrantClient,
+    qvec: List[float],
+    topk: int = 20,
+    collection: str = COLLECTION,
+    search_params: Optional[qm.SearchParams] = None,
+    query_filter: Optional[qm.Filter] = None,
+    small: Optional[SmallProjection] = None,
+) -> CandidatePool:
+    """`small`: two-stage search (collection harus punya named vector "small" + "full")."""
+    params = default_search_params() if search_params is None else search_params
+    res = client.query_points(
+        collection_name=collection,
+        **_dense_query(qvec, topk, params, query_filter, small),
+        query_filter=query_filter,
+        limit=topk,
+        search_params=params,
+        with_payload=False,         # cukup id; teks diambil dari chunk store lokal
+    )
+
+    return CandidatePool(
+        [p.id for p in res.points],
+        dense=[p.score for p in res.points],
+    )
+
+class QueryEmbeddingCache(LRUCache):
+    """
+    Cache embedding query (float32), key = (model_name, "query: " + query).
+    Satu instance di-share lintas sesi supaya query berulang skip forward pass encoder.
+    """
+    def __init__(self, model_name: str, maxsize: int = 4096):
+        super().__init__(maxsize=maxsize)
+        self.model_name = model_name
+
+    def encode(self, embedder: SentenceTransformer, text: str) -> np.ndarray:
+        key = (self.model_name, text)
+        vec = self.get(key)
+        if vec is None:
+            vec = np.asarray(embedder.encode(text, normalize_embeddings=True), dtype=np.float32)
+            self.put(key, vec)
+        return vec
+
+def encode_query(
     embedder: SentenceTransformer,
     query: str,
+    cache: Optional[QueryEmbeddingCache] = None,
+) -> np.ndarray:
+    text = "query: " + query
+    if cache is not None:
+        return cache.encode(embedder, text)
+    return np.asarray(embedder.encode(text, normalize_embeddings=True), dtype=np.float32)
+
+def encode_queries(
+    embedder: SentenceTransformer,
+    queries: List[str],
+    cache: Optional[QueryEmbeddingCache] = None,
+    batch_size: int = 64,
+) -> np.ndarray:
+    """Encode banyak query sekaligus (1 forward pass per batch); yang sudah ada di cache dilewati."""
+    texts = ["query: " + q for q in queries]
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    out: List[Optional[np.ndarray]] = [None] * len(texts)
+    if cache is not None:
+        for i, t in enumerate(texts):
+            out[i] = cache.get((cache.model_name, t))
+
+    todo = [i for i, v in enumerate(out) if v is None]
+    if todo:
+        vecs = np.asarray(embedder.encode(
+            [texts[i] for i in todo],
+            batch_size=batch_size,
+            normalize_embeddings=True,
+        ), dtype=np.float32)
+        for i, v in zip(todo, vecs):
+            out[i] = v
+            if cache is not None:
+                cache.put((cache.model_name, texts[i]), v)
+    return np.stack(out)
+
+def search_vectors_batch(
+    client: QdrantClient,
+    qvecs,
     topk: int = 20,
-) -> List[Dict[str, Any]]:
-    qvec = embedder.encode("query: " + query, normalize_embeddings=True).tolist()
+    collection: str = COLLECTION,
+    search_params: Optional[qm.SearchParams] = None,
+    query_filters: Optional[List[Optional[qm.Filter]]] = None,
+    small: Optional[SmallProjection] = None,
+) -> List[CandidatePool]:
+    """
+    Seperti search_vector untuk banyak vektor query: 1 request Qdrant (query_batch_points).
+    `query_filters`: filter per query (sejajar dengan `qvecs`, boleh None).
+    """
+    from qdrant_client.http import models as qm
 
-    res = client.query_points(
-        collection_name=COLLECTION,
-        query=qvec,                 # vector query
-        limit=topk,
-        with_payload=True,
+    if len(qvecs) == 0:
+        return []
+    params = default_search_params() if search_params is None else search_params
+    filters = query_filters or [None] * len(qvecs)
+    responses = client.query_batch_points(
+        collection_name=collection,
+        requests=[
+            qm.QueryRequest(
+                **_dense_query(v, topk, params, f, small),
+                filter=f, limit=topk, params=params, with_payload=False,
+            )
+            for v, f in zip(qvecs, filters)
+        ],
+    )
+    return [
+        CandidatePool([p.id for p in r.points], dense=[p.score for p in r.points])
+        for r in responses
+    ]
+
+def dense_search_batch(
+    client: QdrantClient,
+    embedder: SentenceTransformer,
+    queries: List[str],
+    topk: int = 20,
+    collection: str = COLLECTION,
+    search_params: Optional[qm.SearchParams] = None,
+    cache: Optional[QueryEmbeddingCache] = None,
+) -> List[CandidatePool]:
+    """Batch encode + 1 request Qdrant (query_batch_points) untuk semua query."""
+    if not queries:
+        return []
+    return search_vectors_batch(
+        client, encode_queries(embedder, queries, cache=cache), topk=topk, collection=collection,
+        search_params=search_params,
+        small=default_small_projection() if collection == COLLECTION else None,
     )
 
-    out: List[Dict[str, Any]] = []
-    for p in res.points:
-        out.append({
-            "chunk_id": p.payload["chunk_id"],
-            "score_dense": float(p.score),
-            "payload": p.payload,
-        })
-    return out
+def dense_search(
+    client: QdrantClient,
+    embedder: SentenceTransformer,
+    query: str,
+    topk: int = 20,
+    collection: str = COLLECTION,
+    search_params: Optional[qm.SearchParams] = None,
+    cache: Optional[QueryEmbeddingCache] = None,
+    query_filter: Optional[qm.Filter] = None,
+) -> CandidatePool:
+    qvec = encode_query(embedder, query, cache=cache)
+    return search_vector(
+        client, qvec, topk=topk, collection=collection,
+        search_params=search_params, query_filter=query_filter,
+        small=default_small_projection() if collection == COLLECTION else None,
+    )
 
 def bm25_search(
     bm25: BM25Okapi,
-    chunks_payload: List[Dict[str, Any]],
     query: str,
     topk: int = 20,
-) -> List[Dict[str, Any]]:
+    restrict: Optional[np.ndarray] = None,
+) -> CandidatePool:
+    """`restrict`: hanya skor chunk dengan index ini (mis. chunk di section terpilih)."""
     qtok = tokenize_basic(query)
-    scores = bm25.get_scores(qtok)
-    idx_sorted = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:topk]
-    out = []
-    for i in idx_sorted:
-        out.append({
-            "chunk_id": chunks_payload[i]["chunk_id"],
-            "score_lex": float(scores[i]),
-            "payload": chunks_payload[i],
-        })
-    return out
+    if restrict is None:
+        ids = None
+        scores = np.asarray(bm25.get_scores(qtok), dtype=np.float32)
+    else:
+        ids = np.asarray(restrict, dtype=np.int64)
+        scores = np.asarray(bm25.get_batch_scores(qtok, ids.tolist()), dtype=np.float32)
+    k = min(topk, len(scores))
+    if k <= 0:
+        return CandidatePool.empty()
+
+    order = np.argpartition(-scores, k - 1)[:k]
+    order = order[np.argsort(-scores[order], kind="stable")]
+    idx = order if ids is None else ids[order]
+    return CandidatePool(idx, lex=scores[order])
+
+def _unique_first(idx: np.ndarray):
+    """
+    Seperti np.unique(return_inverse=True), tapi urutan = kemunculan pertama
+    (sama dengan urutan insert dict di pipeline lama, jadi tie-break skor tidak berubah).
+    """
+    uniq, first, inv = np.unique(idx, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind="stable")
+    pos = np.empty_like(order)
+    pos[order] = np.arange(len(order))
+    return uniq[order], pos[inv.reshape(-1)]
 
 def merge_hybrid(
-    dense_hits: List[Dict[str, Any]],
-    lex_hits: List[Dict[str, Any]],
+    dense_hits: CandidatePool,
+    lex_hits: CandidatePool,
     w_dense: float = 0.7,
     w_lex: float = 0.3,
     topk: int = 30,
-) -> List[Dict[str, Any]]:
+) -> CandidatePool:
     # normalize lexical scores
-    lex_max = max([h.get("score_lex", 0.0) for h in lex_hits] + [1.0])
-
-    merged: Dict[str, Dict[str, Any]] = {}
-
-    for h in dense_hits:
-        cid = h["chunk_id"]
-        merged.setdefault(cid, {
-            "chunk_id": cid,
-            "payload": h["payload"],
-            "score_dense": 0.0,
-            "score_lex": 0.0
-        })
-        merged[cid]["score_dense"] = max(merged[cid]["score_dense"], h.get("score_dense", 0.0))
-
-    for h in lex_hits:
-        cid = h["chunk_id"]
-        merged.setdefault(cid, {
-            "chunk_id": cid,
-            "payload": h["payload"],
-            "score_dense": 0.0,
-            "score_lex": 0.0
-        })
-        merged[cid]["score_lex"] = max(merged[cid]["score_lex"], h.get("score_lex", 0.0) / lex_max)
-
-    results = []
-    for cid, row in merged.items():
-        score = (w_dense * row["score_dense"]) + (w_lex * row["score_lex"])
-        results.append({
-            **row,
-            "score_hybrid": float(score),
-        })
-
-    results.sort(key=lambda x: x["score_hybrid"], reverse=True)
-    return results[:topk]
\ No newline at end of file
+    lex_max = max(float(lex_hits.lex.max()) if len(lex_hits) else 0.0, 1.0)
+
+    idx, inv = _unique_first(np.concatenate([dense_hits.idx, lex_hits.idx]))
+    n_dense = len(dense_hits)
+
+    score_dense = np.zeros(len(idx), dtype=np.float32)
+    score_lex = np.zeros(len(idx), dtype=np.float32)
+    np.maximum.at(score_dense, inv[:n_dense], dense_hits.dense)
+    np.maximum.at(score_lex, inv[n_dense:], lex_hits.lex / lex_max)
+
+    merged = CandidatePool(
+        idx,
+        dense=score_dense,
+        lex=score_lex,
+        hybrid=(w_dense * score_dense) + (w_lex * score_lex),
+    )
+    return merged.sort_by("hybrid").head(topk)
+
+def rrf_fuse(
+    pools: List[CandidatePool],
+    k_rrf: int = 60,
+    topk: int = 30,
+) -> CandidatePool:
+    """
+    Reciprocal-rank fusion: gabung hasil beberapa query variant jadi 1 pool unik.
+    Skor per chunk = sum(1 / (k_rrf + rank)) di semua variant, disimpan di `hybrid`.
+    """
+    pools = [p for p in pools if len(p)]
+    if not pools:
+        return CandidatePool.empty()
+
+    all_idx = np.concatenate([p.idx for p in pools])
+    ranks = np.concatenate([np.arange(1, len(p) + 1) for p in pools])
+    idx, inv = _unique_first(all_idx)
+
+    score_rrf = np.zeros(len(idx), dtype=np.float32)
+    np.add.at(score_rrf, inv, (1.0 / (k_rrf + ranks)).astype(np.float32))
+
+    score_dense = np.zeros(len(idx), dtype=np.float32)
+    score_lex = np.zeros(len(idx), dtype=np.float32)
+    np.maximum.at(score_dense, inv, np.concatenate([p.dense for p in pools]))
+    np.maximum.at(score_lex, inv, np.concatenate([p.lex for p in pools]))
+
+    fused = CandidatePool(idx, dense=score_dense, lex=score_lex, hybrid=score_rrf)
+    return fused.sort_by("hybrid").head(topk)
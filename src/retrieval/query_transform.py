@@ -1,9 +1,10 @@
 from __future__ import annotations
-from typing import List, Dict
+from typing import List, Dict, Optional
 import re
 
-from langchain_ollama import ChatOllama
-from langchain_core.prompts import ChatPromptTemplate
+from src.utils.cache import LRUCache
+from src.utils.llm_client import LLMClient, get_llm_client, is_timeout_error
+from src.utils.timing import Deadline
 
 def _clean(s: str) -> str:
     s = s.strip()
@@ -40,12 +41,16 @@ class QueryTransformer:
         ollama_model: str = "qwen2.5:7b-instruct",
         base_url: str | None = None,
         temperature: float = 0.0,
+        llm: LLMClient | None = None,
+        cache: LRUCache | None = None,
     ):
-        self.llm = ChatOllama(
-            model=ollama_model,
-            base_url=base_url,  # None -> default Ollama local
-            temperature=temperature,
-        )
+        from langchain_core.prompts import ChatPromptTemplate
+
+        # client LLM di-share (koneksi, keep_alive, antrian) dengan OllamaAnswerer
+        self.llm = llm or get_llm_client(ollama_model, base_url)
+        self.temperature = temperature
+        # (query, max_variants) -> variants; 3 LLM call dilewati untuk pertanyaan berulang
+        self.cache = cache
 
         self.rewrite_prompt = ChatPromptTemplate.from_messages([
             ("system",
@@ -74,18 +79,48 @@ class QueryTransformer:
              "1. ...\n2. ...\n3. ... (opsional)\n4. ... (opsional)")
         ])
 
-    def transform(self, question: str, max_variants: int = 6) -> List[str]:
+    def _invoke(self, prompt, q0: str, deadline: Optional[Deadline]) -> Optional[str]:
+        """
+        1 LLM call; dengan deadline, timeout = sisa budget.
+        None kalau budget habis, antrian LLM penuh (LLMBusyError) atau timeout: variant itu dilewati.
+        """
+        limits = {}
+        if deadline is not None:
+            remaining_s = deadline.remaining_ms() / 1000.0
+            if remaining_s <= 0:
+                return None
+            limits = {"timeout": remaining_s, "queue_timeout": remaining_s}
+        try:
+            return self.llm.invoke(prompt, {"q": q0}, temperature=self.temperature, **limits)
+        except Exception as e:
+            if not is_timeout_error(e):
+                raise
+            return None
+
+    def transform(self, question: str, max_variants: int = 6, deadline: Optional[Deadline] = None) -> List[str]:
+        """
+        `deadline`: tiap LLM call dibatasi sisa budget; variant yang tidak sempat dibuat dilewati
+        (hasil parsial tidak di-cache). Setelah 1 call gagal (budget / antrian penuh / timeout),
+        call berikutnya tidak dicoba: tidak menunggu antrian 3x.
+        """
         q0 = _clean(question)
+        key = (q0.lower(), max_variants)
+        if self.cache is not None:
+            hit = self.cache.get(key)
+            if hit is not None:
+                return list(hit)
 
         # 1) rewrite
-        rewrite = _clean((self.rewrite_prompt | self.llm).invoke({"q": q0}).content)
+        rewrite = self._invoke(self.rewrite_prompt, q0, deadline)
 
         # 2) step-back
-        stepback = _clean((self.stepback_prompt | self.llm).invoke({"q": q0}).content)
+        stepback = self._invoke(self.stepback_prompt, q0, deadline) if rewrite is not None else None
 
         # 3) decompose
-        decomp_raw = (self.decompose_prompt | self.llm).invoke({"q": q0}).content
-        subqs = [_clean(x) for x in _parse_numbered_list(decomp_raw)][:4]
+        decomp_raw = self._invoke(self.decompose_prompt, q0, deadline) if stepback is not None else None
+        complete = None not in (rewrite, stepback, decomp_raw)
+        rewrite, stepback = _clean(rewrite or ""), _clean(stepback or "")
+        subqs = [_clean(x) for x in _parse_numbered_list(decomp_raw)][:4] if decomp_raw else []
 
         # Gabung + dedupe
         variants = [q0, rewrite, stepback] + subqs
@@ -94,4 +129,7 @@ class QueryTransformer:
             v = _clean(v)
             if v and v not in out:
                 out.append(v)
-        return out[:max_variants]
\ No newline at end of file
+        out = out[:max_variants]
+        if self.cache is not None and complete:
+            self.cache.put(key, tuple(out))
+        return out
\ No newline at end of file
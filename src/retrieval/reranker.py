@@ -1,19 +1,80 @@
-from typing import List, Dict, Any, Optional
-from sentence_transformers import CrossEncoder
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from src.retrieval.candidates import CandidatePool
+from src.utils.cache import LRUCache
 
 class Reranker:
-    def __init__(self, model_name: str = "BAAI/bge-reranker-base", device: Optional[str] = "cuda"):
+    def __init__(
+        self,
+        model_name: str = "BAAI/bge-reranker-base",
+        device: Optional[str] = "cuda",
+        cache: Optional[LRUCache] = None,
+    ):
+        from sentence_transformers import CrossEncoder  # torch di-import di sini, bukan saat import modul
+
         self.model = CrossEncoder(model_name, device=device)
+        # 1 instance di-share semua sesi Streamlit; predict diserialkan
+        self._lock = threading.Lock()
+        # skor (query, chunk idx) -> float; pertanyaan berulang tidak di-predict ulang
+        self.cache = cache
+
+    def _predict(self, items: List[Tuple[str, int, str]]) -> np.ndarray:
+        """Skor untuk (query, chunk idx, text); pasangan yang ada di cache dilewati."""
+        scores = np.zeros(len(items), dtype=np.float32)
+        todo = []
+        for j, (q, i, _) in enumerate(items):
+            hit = self.cache.get((q, i)) if self.cache is not None else None
+            if hit is None:
+                todo.append(j)
+            else:
+                scores[j] = hit
+        if todo:
+            with self._lock:
+                pred = np.asarray(self.model.predict([(items[j][0], items[j][2]) for j in todo]), dtype=np.float32)
+            scores[todo] = pred
+            if self.cache is not None:
+                for j, sc in zip(todo, pred):
+                    self.cache.put((items[j][0], items[j][1]), float(sc))
+        return scores
+
+    def rerank(
+        self,
+        query: str,
+        candidates: CandidatePool,
+        chunks_payload: List[Dict[str, Any]],
+        topk: int = 6,
+    ) -> CandidatePool:
+        if not len(candidates):
+            return candidates
+
+        items = [(query, int(i), t) for i, t in zip(candidates.idx, candidates.texts(chunks_payload))]
+        candidates.rerank = self._predict(items)
 
-    def rerank(self, query: str, candidates: List[Dict[str, Any]], topk: int = 6) -> List[Dict[str, Any]]:
-        if not candidates:
-            return []
+        return candidates.sort_by("rerank").head(topk)
 
-        pairs = [(query, c["payload"]["text"]) for c in candidates]
-        scores = self.model.predict(pairs)
+    def rerank_batch(
+        self,
+        queries: List[str],
+        pools: List[CandidatePool],
+        chunks_payload: List[Dict[str, Any]],
+        topk: Optional[int] = None,
+    ) -> List[CandidatePool]:
+        """Rerank banyak (query, pool) dengan 1 panggilan predict; topk=None -> tanpa dipotong."""
+        items = []
+        for q, pool in zip(queries, pools):
+            items.extend((q, int(i), t) for i, t in zip(pool.idx, pool.texts(chunks_payload)))
+        if not items:
+            return list(pools)
 
-        for c, s in zip(candidates, scores):
-            c["score_rerank"] = float(s)
+        scores = self._predict(items)
 
-        candidates.sort(key=lambda x: x["score_rerank"], reverse=True)
-        return candidates[:topk]
\ No newline at end of file
+        out, offset = [], 0
+        for pool in pools:
+            pool.rerank = scores[offset:offset + len(pool)]
+            offset += len(pool)
+            ranked = pool.sort_by("rerank")
+            out.append(ranked if topk is None else ranked.head(topk))
+        return out
@@ -0,0 +1,176 @@
+from __future__ import annotations
+import json
+import os
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from qdrant_client import QdrantClient
+    from qdrant_client.http import models as qm
+    from sentence_transformers import SentenceTransformer
+
+from src.retrieval.hybrid_retriever import (
+    QueryEmbeddingCache, encode_query, search_vector, search_vectors_batch, bm25_search, merge_hybrid,
+)
+from src.utils.text_utils import tokenize_basic
+
+SECTION_COLLECTION = "unesa_pedoman_sections"
+
+
+def _min_page(a, b):
+    return b if a is None else a if b is None else min(a, b)
+
+
+def _max_page(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+
+def chunk_sections(chunk: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Semua (bab, section) tempat isi chunk muncul: lokasinya sendiri + lokasi tiap salinan
+    yang digabung saat dedup ("duplicates"), jadi klausul yang sama di 2 section ada di keduanya.
+    """
+    return [chunk] + list(chunk.get("duplicates", []))
+
+
+def build_sections(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Kelompokkan chunk per (bab, section), urut kemunculan pertama.
+    Chunk hasil dedup masuk ke section semua salinannya (lihat chunk_sections).
+    Dipanggil saat indexing; hasilnya disimpan ke sections.jsonl.
+    """
+    by_key: Dict[Any, Dict[str, Any]] = {}
+    for i, c in enumerate(chunks):
+        for loc in chunk_sections(c):
+            key = (loc.get("bab", ""), loc.get("section", ""))
+            sec = by_key.get(key)
+            if sec is None:
+                sec = by_key[key] = {
+                    "section_id": len(by_key),
+                    "bab": key[0],
+                    "section": key[1],
+                    "chunk_idx": [],
+                    "page_start": loc.get("page_start"),
+                    "page_end": loc.get("page_end"),
+                    "tokens": tokenize_basic(f"{key[0]} {key[1]}"),
+                }
+            if sec["chunk_idx"] and sec["chunk_idx"][-1] == i:
+                continue  # salinan di section yang sama dengan kanoniknya
+            sec["chunk_idx"].append(i)
+            sec["page_start"] = _min_page(sec["page_start"], loc.get("page_start"))
+            sec["page_end"] = _max_page(sec["page_end"], loc.get("page_end"))
+            sec["tokens"].extend(tokenize_basic(c["text"]))
+    return list(by_key.values())
+
+
+def section_members(chunks: List[Dict[str, Any]]) -> Dict[Tuple[str, str], np.ndarray]:
+    """
+    (bab, section) -> index semua chunk di dalamnya (urut dokumen, termasuk chunk yang salinannya
+    di sana; lihat chunk_sections). Dibangun sekali per chunk store, bukan per pertanyaan.
+    """
+    out: Dict[Tuple[str, str], List[int]] = {}
+    for i, c in enumerate(chunks):
+        for loc in chunk_sections(c):
+            idx = out.setdefault((loc.get("bab", ""), loc.get("section", "")), [])
+            if not idx or idx[-1] != i:
+                idx.append(i)
+    return {k: np.asarray(v, dtype=np.int64) for k, v in out.items()}
+
+
+def section_vectors(sections: List[Dict[str, Any]], chunk_vectors: np.ndarray) -> np.ndarray:
+    """Embedding section = rata-rata embedding chunk-nya (dinormalisasi ulang), tanpa encode ulang."""
+    out = np.stack([chunk_vectors[s["chunk_idx"]].mean(axis=0) for s in sections])
+    return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+
+
+def save_sections(path: str, sections: List[Dict[str, Any]]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for s in sections:
+            f.write(json.dumps(s, ensure_ascii=False) + "\n")
+
+
+def section_filter(section_ids) -> qm.Filter:
+    from qdrant_client.http import models as qm
+
+    return qm.Filter(must=[
+        qm.FieldCondition(key="section_id", match=qm.MatchAny(any=[int(s) for s in section_ids])),
+    ])
+
+
+def section_search_params() -> qm.SearchParams:
+    """
+    Collection section kecil (ratusan titik): exact search, murah dan tidak ikut
+    hnsw_ef / quantization collection chunk (default_search_params).
+    """
+    from qdrant_client.http import models as qm
+
+    return qm.SearchParams(exact=True)
+
+
+class SectionIndex:
+    """
+    Index level section untuk retrieval coarse-to-fine:
+    pilih beberapa section teratas (dense di SECTION_COLLECTION + BM25 section),
+    lalu chunk-level search & rerank hanya di dalam section tsb.
+    """
+    def __init__(self, sections: List[Dict[str, Any]]):
+        from rank_bm25 import BM25Okapi
+
+        self.sections = sections
+        self.bm25 = BM25Okapi([s["tokens"] for s in sections])
+        self.chunk_idx = [np.asarray(s["chunk_idx"], dtype=np.int64) for s in sections]
+
+    @classmethod
+    def load(cls, path: str = "data/sections.jsonl") -> "SectionIndex":
+        return cls([json.loads(l) for l in open(path, "r", encoding="utf-8")])
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    def select(
+        self,
+        client: QdrantClient,
+        embedder: SentenceTransformer,
+        query: str,
+        top_sections: int = 3,
+        cache: Optional[QueryEmbeddingCache] = None,
+        search_params: Optional[qm.SearchParams] = None,
+    ) -> np.ndarray:
+        """`search_params`: default exact search (lihat section_search_params)."""
+        qvec = encode_query(embedder, query, cache=cache).tolist()
+        dense = search_vector(
+            client, qvec, topk=top_sections * 2, collection=SECTION_COLLECTION,
+            search_params=search_params or section_search_params(),
+        )
+        lex = bm25_search(self.bm25, query, topk=top_sections * 2)
+        return merge_hybrid(dense, lex, topk=top_sections).idx
+
+    def select_batch(
+        self,
+        client: QdrantClient,
+        queries: List[str],
+        qvecs: np.ndarray,
+        top_sections: int = 3,
+        search_params: Optional[qm.SearchParams] = None,
+    ) -> List[np.ndarray]:
+        """Seperti select untuk banyak query (vektor sudah di-encode), 1 request Qdrant."""
+        dense = search_vectors_batch(
+            client, qvecs, topk=top_sections * 2, collection=SECTION_COLLECTION,
+            search_params=search_params or section_search_params(),
+        )
+        return [
+            merge_hybrid(d, bm25_search(self.bm25, q, topk=top_sections * 2), topk=top_sections).idx
+            for q, d in zip(queries, dense)
+        ]
+
+    def chunks_in(self, section_ids) -> np.ndarray:
+        if len(section_ids) == 0:
+            return np.zeros(0, dtype=np.int64)
+        idx = np.concatenate([self.chunk_idx[s] for s in section_ids])
+        _, first = np.unique(idx, return_index=True)  # chunk hasil dedup bisa ada di > 1 section terpilih
+        return idx[np.sort(first)]
+
+    def labels(self, section_ids) -> List[str]:
+        return [f"{self.sections[s]['bab']} – {self.sections[s]['section']}" for s in section_ids]
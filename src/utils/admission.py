@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import math
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence
+
+if TYPE_CHECKING:
+    from src.utils.llm_client import LLMClient
+
+# level kumulatif: level N juga menerapkan semua level di bawahnya
+DEGRADATION_LEVELS = ("full", "no_transform", "no_corrective", "small_pool", "extractive_only")
+
+
+class LoadShedError(RuntimeError):
+    """Request ditolak karena kapasitas penuh; pesannya aman ditampilkan ke user."""
+
+
+def degradation_plan(level: int, k_pool: int = 30, k_final: int = 6) -> Dict[str, Any]:
+    """Setting pipeline untuk 1 level degradasi."""
+    return {
+        "level": level,
+        "name": DEGRADATION_LEVELS[level],
+        "transform": level < 1,        # 1: tanpa query transform (variants = [question])
+        "corrective": level < 2,       # 2: tanpa corrective pass
+        "k_pool": k_pool if level < 3 else max(k_final, k_pool // 2),  # 3: pool rerank diperkecil
+        "extractive_only": level >= 4,  # 4: tanpa LLM generation
+    }
+
+
+class AdmissionController:
+    """
+    Admission control di depan crag_retrieve + OllamaAnswerer.
+    Sinyal beban: jumlah request yang sedang diproses (in-flight) dan latency antrian LLM
+    (LLMClient.queue_ms(): EWMA yang meluruh dengan waktu, 0 saat LLM idle). Makin tinggi beban, makin tinggi level degradasi;
+    di atas `max_in_flight` request ditolak (LoadShedError).
+    """
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        in_flight_levels: Optional[Sequence[int]] = None,
+        queue_ms_levels: Sequence[float] = (1000.0, 3000.0, 6000.0, 12000.0),
+    ):
+        self.max_in_flight = max_in_flight
+        # default: naik level saat 25% / 50% / 65% / 80% kapasitas terpakai
+        self.in_flight_levels = list(in_flight_levels or [
+            max(1, math.ceil(max_in_flight * f)) for f in (0.25, 0.5, 0.65, 0.8)
+        ])
+        self.queue_ms_levels = list(queue_ms_levels)
+
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+        self.level_counts = [0] * len(DEGRADATION_LEVELS)
+
+    def level_for(self, in_flight: int, queue_ms: float = 0.0) -> int:
+        by_load = sum(1 for t in self.in_flight_levels if in_flight >= t)
+        by_queue = sum(1 for t in self.queue_ms_levels if queue_ms >= t)
+        return min(len(DEGRADATION_LEVELS) - 1, max(by_load, by_queue))
+
+    def acquire(self, llm: Optional[LLMClient] = None) -> int:
+        """
+        Daftarkan 1 request; return level degradasi yang harus dipakai.
+        Wajib diikuti release() (mis. di finally).
+        """
+        queue_ms = llm.queue_ms() if llm is not None else 0.0
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                self.shed += 1
+                raise LoadShedError(
+                    "Sistem sedang menerima terlalu banyak pertanyaan. "
+                    "Silakan coba lagi dalam beberapa saat."
+                )
+            level = self.level_for(self.in_flight, queue_ms)
+            self.in_flight += 1
+            self.admitted += 1
+            self.level_counts[level] += 1
+            return level
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.admitted + self.shed
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "shed_rate": (self.shed / total) if total else 0.0,
+            "levels": dict(zip(DEGRADATION_LEVELS, self.level_counts)),
+        }
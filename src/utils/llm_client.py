@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from langchain_ollama import ChatOllama
+
+
+class LLMBusyError(TimeoutError):
+    """Antrian LLM penuh: slot tidak didapat dalam `queue_timeout` detik."""
+
+
+# timeout (detik) untuk request HTTP yang sedang jalan di thread ini; diset LLMClient.invoke
+_CALL_TIMEOUT: ContextVar[Optional[float]] = ContextVar("llm_call_timeout", default=None)
+
+
+def _call_timeout_transport():
+    """
+    Transport httpx (1 pool koneksi) yang di-share semua ChatOllama milik 1 LLMClient.
+    Timeout diambil per request dari _CALL_TIMEOUT, jadi timeout dari sisa budget
+    tidak butuh instance ChatOllama (dan pool httpx) baru.
+    """
+    import httpx
+
+    class CallTimeoutTransport(httpx.BaseTransport):
+        def __init__(self):
+            self._inner = httpx.HTTPTransport()
+
+        def handle_request(self, request: httpx.Request) -> httpx.Response:
+            timeout = _CALL_TIMEOUT.get()
+            if timeout is not None:
+                request.extensions["timeout"] = httpx.Timeout(timeout).as_dict()
+            return self._inner.handle_request(request)
+
+        def close(self) -> None:
+            self._inner.close()
+
+    return CallTimeoutTransport()
+
+
+def is_timeout_error(e: BaseException) -> bool:
+    """LLMBusyError / TimeoutError / httpx.TimeoutException (ReadTimeout, ConnectTimeout, PoolTimeout ...)."""
+    if isinstance(e, TimeoutError):
+        return True
+    try:
+        import httpx
+    except ImportError:
+        return False
+    return isinstance(e, httpx.TimeoutException)
+
+
+class LLMClient:
+    """
+    Lapisan client Ollama yang di-share semua pemanggil LLM (query transform + answerer):
+    - ChatOllama di-cache per setting (temperature, opsi lain) dan semuanya memakai 1 transport
+      httpx, jadi koneksi HTTP dipakai ulang, bukan dibuat per pemanggil
+    - keep_alive: model tetap resident di Ollama di antara request
+    - warmup(): 1 call kecil supaya model sudah di-load sebelum pertanyaan pertama
+    - semaphore: maksimal `max_concurrency` call jalan bareng, sisanya antri
+      sampai `queue_timeout` detik lalu LLMBusyError
+    - timeout per call (default `timeout` detik), diterapkan per request HTTP
+    - queue_ms(): latency antrian terkini untuk admission control; EWMA yang meluruh
+      dengan waktu (half-life `queue_half_life_s`) dan 0 saat LLM idle
+    """
+    def __init__(
+        self,
+        model: str = "qwen2.5:7b-instruct",
+        base_url: Optional[str] = None,
+        keep_alive: str = "30m",
+        max_concurrency: int = 2,
+        queue_timeout: float = 60.0,
+        timeout: float = 120.0,
+        queue_half_life_s: float = 10.0,
+    ):
+        self.model = model
+        self.base_url = base_url
+        self.keep_alive = keep_alive
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self.queue_half_life_s = queue_half_life_s
+
+        self._sem = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._chats: Dict[Tuple, ChatOllama] = {}
+        self._transport = None
+
+        self.calls = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.busy_rejects = 0
+        self.total_queue_s = 0.0
+        self.total_call_s = 0.0
+        self.queue_ewma_ms = 0.0  # waktu tunggu slot terkini (sinyal beban untuk admission control)
+        self._queue_ewma_t = time.perf_counter()
+
+    def chat(self, temperature: float = 0.0, **params: Any) -> ChatOllama:
+        key = (temperature,) + tuple(sorted((k, repr(v)) for k, v in params.items()))
+        with self._lock:
+            llm = self._chats.get(key)
+            if llm is None:
+                from langchain_ollama import ChatOllama
+
+                if self._transport is None:
+                    self._transport = _call_timeout_transport()
+                llm = self._chats[key] = ChatOllama(
+                    model=self.model,
+                    base_url=self.base_url,  # None -> default Ollama local
+                    temperature=temperature,
+                    keep_alive=self.keep_alive,
+                    client_kwargs={"timeout": self.timeout},
+                    sync_client_kwargs={"transport": self._transport},
+                    **params,
+                )
+            return llm
+
+    def invoke(
+        self,
+        prompt,
+        inputs: Dict[str, Any],
+        temperature: float = 0.0,
+        timeout: Optional[float] = None,
+        queue_timeout: Optional[float] = None,
+        **params: Any,
+    ) -> str:
+        """
+        Jalankan `prompt | llm` dengan slot dari semaphore; return isi teks respon.
+        `timeout` / `queue_timeout` override default (mis. sisa budget request);
+        `timeout` yang diberikan = batas total call, waktu antri ikut dipotong.
+        """
+        llm = self.chat(temperature=temperature, **params)
+
+        t0 = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+        acquired = self._sem.acquire(timeout=self.queue_timeout if queue_timeout is None else queue_timeout)
+        waited = time.perf_counter() - t0
+        with self._lock:
+            self.waiting -= 1
+            self.total_queue_s += waited
+            self._observe_queue(waited)
+            if not acquired:
+                self.busy_rejects += 1
+        if not acquired:
+            raise LLMBusyError(f"LLM queue full ({self.max_concurrency} in flight, waited {waited:.1f}s)")
+
+        with self._lock:
+            self.in_flight += 1
+        t1 = time.perf_counter()
+        token = _CALL_TIMEOUT.set(self.timeout if timeout is None else max(0.001, timeout - waited))
+        try:
+            return (prompt | llm).invoke(inputs).content
+        finally:
+            _CALL_TIMEOUT.reset(token)
+            with self._lock:
+                self.in_flight -= 1
+                self.calls += 1
+                self.total_call_s += time.perf_counter() - t1
+            self._sem.release()
+
+    def _decayed_queue_ms(self, now: float) -> float:
+        return self.queue_ewma_ms * 0.5 ** ((now - self._queue_ewma_t) / self.queue_half_life_s)
+
+    def _observe_queue(self, waited_s: float) -> None:
+        """Update EWMA waktu tunggu (dipanggil dengan _lock dipegang)."""
+        now = time.perf_counter()
+        self.queue_ewma_ms = 0.8 * self._decayed_queue_ms(now) + 0.2 * waited_s * 1000.0
+        self._queue_ewma_t = now
+
+    def queue_ms(self) -> float:
+        """
+        Sinyal latency antrian untuk admission control. EWMA hanya ter-update saat ada LLM call,
+        jadi tanpa peluruhan nilai lama menempel terus (mis. di level extractive_only yang tidak
+        memanggil LLM sama sekali); saat tidak ada call yang jalan / antri, request baru tidak menunggu.
+        """
+        with self._lock:
+            if self.in_flight == 0 and self.waiting == 0:
+                return 0.0
+            return self._decayed_queue_ms(time.perf_counter())
+
+    def warmup(self) -> float:
+        """
+        Load model ke memori Ollama (1 token). Lewat invoke, jadi ikut antri di semaphore
+        dan kena timeout per call. Return durasi detik.
+        """
+        from langchain_core.prompts import ChatPromptTemplate
+
+        t0 = time.perf_counter()
+        self.invoke(ChatPromptTemplate.from_messages([("human", "ok")]), {}, num_predict=1)
+        return time.perf_counter() - t0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "calls": self.calls,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "busy_rejects": self.busy_rejects,
+            "avg_queue_ms": (self.total_queue_s / max(1, self.calls + self.busy_rejects)) * 1000.0,
+            "avg_call_ms": (self.total_call_s / max(1, self.calls)) * 1000.0,
+            "queue_ewma_ms": self.queue_ms(),
+        }
+
+
+_CLIENTS: Dict[Tuple[str, Optional[str]], LLMClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_llm_client(model: str, base_url: Optional[str] = None, **kwargs: Any) -> LLMClient:
+    """Satu LLMClient per (model, base_url) per proses; kwargs hanya dipakai saat pertama dibuat."""
+    key = (model, base_url)
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = _CLIENTS[key] = LLMClient(model=model, base_url=base_url, **kwargs)
+        return client
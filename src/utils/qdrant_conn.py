@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from qdrant_client import QdrantClient
+
+from src.indexing.index_config import load_index_config
+
+QDRANT_TRANSPORTS = ("rest", "grpc", "embedded")
+
+
+def qdrant_settings(
+    transport: Optional[str] = None,
+    url: Optional[str] = None,
+    path: Optional[str] = None,
+    grpc_port: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Setting koneksi: index config < env (QDRANT_TRANSPORT / QDRANT_URL / QDRANT_PATH) < argumen."""
+    cfg = load_index_config()
+    s = {
+        "transport": os.environ.get("QDRANT_TRANSPORT", cfg["transport"]),
+        "url": os.environ.get("QDRANT_URL", cfg["qdrant_url"]),
+        "path": os.environ.get("QDRANT_PATH", cfg["qdrant_path"]),
+        "grpc_port": int(os.environ.get("QDRANT_GRPC_PORT", cfg["grpc_port"])),
+    }
+    for k, v in (("transport", transport), ("url", url), ("path", path), ("grpc_port", grpc_port)):
+        if v is not None:
+            s[k] = v
+    if s["transport"] not in QDRANT_TRANSPORTS:
+        raise ValueError(f"Unknown Qdrant transport: {s['transport']!r}")
+    return s
+
+
+def make_qdrant_client(
+    transport: str = "rest",
+    url: str = "http://localhost:6333",
+    path: str = "data/qdrant_local",
+    grpc_port: int = 6334,
+    timeout: int = 10,
+    pool_size: int = 16,
+) -> QdrantClient:
+    """
+    Buat client baru:
+    - rest: HTTP/JSON, koneksi keep-alive dipakai ulang (pool httpx `pool_size`)
+    - grpc: protobuf lewat 1 channel HTTP/2 (prefer_grpc), lebih murah serialisasinya
+    - embedded: mode lokal on-disk di `path`, tanpa service Qdrant
+    """
+    from qdrant_client import QdrantClient
+
+    if transport == "embedded":
+        os.makedirs(path, exist_ok=True)
+        return QdrantClient(path=path)
+    if transport == "grpc":
+        return QdrantClient(url=url, grpc_port=grpc_port, prefer_grpc=True, timeout=timeout)
+    if transport == "rest":
+        import httpx
+
+        return QdrantClient(
+            url=url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+    raise ValueError(f"Unknown Qdrant transport: {transport!r}")
+
+
+_CLIENTS: Dict[Tuple[str, str], QdrantClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_qdrant_client(
+    transport: Optional[str] = None,
+    url: Optional[str] = None,
+    path: Optional[str] = None,
+    **kwargs: Any,
+) -> QdrantClient:
+    """
+    Satu client per (transport, url/path) per proses, di-share semua sesi dan thread.
+    Mode embedded wajib lewat sini: QdrantClient(path=...) mengunci folder-nya untuk 1 client saja.
+    kwargs (timeout, pool_size, grpc_port) hanya dipakai saat client pertama dibuat.
+    """
+    s = qdrant_settings(transport=transport, url=url, path=path, grpc_port=kwargs.pop("grpc_port", None))
+    key = (s["transport"], os.path.abspath(s["path"]) if s["transport"] == "embedded" else s["url"])
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = _CLIENTS[key] = make_qdrant_client(**s, **kwargs)
+        return client
+
+
+def _segments(node: Any) -> List[Dict[str, Any]]:
+    """Semua info segmen di JSON telemetry 1 collection (struktur shard beda-beda antar versi Qdrant)."""
+    found = []
+    if isinstance(node, dict):
+        if isinstance(node.get("segments"), list):
+            found += [seg.get("info", seg) for seg in node["segments"]]
+        else:
+            for v in node.values():
+                found += _segments(v)
+    elif isinstance(node, list):
+        for v in node:
+            found += _segments(v)
+    return found
+
+
+def segment_usage_mb(url: str, name: str) -> Optional[Tuple[float, float]]:
+    """
+    Ukuran terukur (RAM, disk) collection dalam MB: jumlah ram_usage_bytes / disk_usage_bytes
+    semua segmen dari endpoint telemetry Qdrant (dipakai script benchmark).
+    None kalau server tidak melaporkannya (atau transport embedded, tanpa endpoint HTTP).
+    """
+    import httpx
+
+    try:
+        r = httpx.get(f"{url.rstrip('/')}/telemetry", params={"details_level": 10}, timeout=10)
+        r.raise_for_status()
+        cols = r.json()["result"]["collections"]["collections"]
+    except (httpx.HTTPError, KeyError, TypeError, ValueError):
+        return None
+    for col in cols:
+        if col.get("id") != name:
+            continue
+        segs = _segments(col.get("shards"))
+        if not segs or "ram_usage_bytes" not in segs[0]:
+            return None
+        ram = sum(seg.get("ram_usage_bytes", 0) for seg in segs)
+        disk = sum(seg.get("disk_usage_bytes", 0) for seg in segs)
+        return ram / 2**20, disk / 2**20
+    return None
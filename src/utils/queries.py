@@ -0,0 +1,15 @@
+import json
+import random
+from typing import Any, Dict, List
+
+
+def load_queries(path: str, chunks: List[Dict[str, Any]], n: int) -> List[str]:
+    """
+    Query untuk benchmark vektor (quantization, HNSW, small vectors).
+    `path`: questions.jsonl (field "question"); kosong = potongan teks chunk acak (seed tetap).
+    """
+    if path:
+        return [json.loads(l)["question"] for l in open(path, "r", encoding="utf-8") if l.strip()][:n]
+    # tanpa file pertanyaan: potongan teks chunk acak sebagai query sintetis
+    rnd = random.Random(0)
+    return [c["text"][:200] for c in rnd.sample(chunks, k=min(n, len(chunks)))]
@@ -0,0 +1,105 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+QUERY_LOG_PATH = os.environ.get("CRAG_QUERY_LOG", "logs/query_log.jsonl")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, rapikan spasi, buang tanda baca di ujung (supaya "Cuti?" == "cuti")."""
+    q = re.sub(r"\s+", " ", question.strip().lower())
+    return q.strip(" ?!.,;:")
+
+
+class QueryLog:
+    """
+    Log pertanyaan append-only (JSONL): 1 baris per pertanyaan
+    {ts, question (teks asli), key (ternormalisasi), latency_ms, outcome ("answer" / "abstain"), ...}.
+    Teks asli disimpan karena cache embedding / rerank / transform di-key dengan teks asli:
+    replay dengan teks ternormalisasi tidak akan mengisi entry yang dipakai traffic asli.
+    """
+    def __init__(self, path: str = QUERY_LOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, question: str, latency_ms: float, outcome: str, **extra: Any) -> None:
+        row = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "question": question.strip(),
+            "key": normalize_question(question),
+            "latency_ms": round(latency_ms, 1),
+            "outcome": outcome,
+            **extra,
+        }
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def top_questions(path: str = QUERY_LOG_PATH, n: int = 20, answered_only: bool = True) -> List[str]:
+    """
+    N pertanyaan paling sering di log, dihitung per key ternormalisasi ("Cuti?" == "cuti");
+    yang dikembalikan teks asli yang paling sering diketik untuk key itu.
+    Pertanyaan yang abstain dilewati kalau answered_only.
+    """
+    if not os.path.exists(path):
+        return []
+    counts: Counter = Counter()
+    spellings: Dict[str, Counter] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # baris terpotong (mis. proses mati saat menulis)
+            if answered_only and row.get("outcome") != "answer":
+                continue
+            q = row.get("question")
+            if not q:
+                continue
+            key = row.get("key") or normalize_question(q)
+            counts[key] += 1
+            spellings.setdefault(key, Counter())[q] += 1
+    return [spellings[key].most_common(1)[0][0] for key, _ in counts.most_common(n)]
+
+
+def replay_questions(
+    questions: List[str],
+    run_one: Callable[[str], Any],
+    log_prefix: str = "[warmup]",
+) -> Dict[str, Any]:
+    """
+    Jalankan ulang pertanyaan populer satu per satu (mis. saat app start / deploy)
+    supaya model ter-load dan cache embedding/rerank/transform/answer terisi.
+    Error per pertanyaan dicatat lalu lanjut.
+    """
+    t0 = time.perf_counter()
+    ok, errors = 0, 0
+    for q in questions:
+        try:
+            run_one(q)
+            ok += 1
+        except Exception as e:
+            errors += 1
+            print(f"{log_prefix} gagal untuk {q!r}: {e}")
+    stats = {"questions": len(questions), "ok": ok, "errors": errors, "total_s": round(time.perf_counter() - t0, 2)}
+    print(f"{log_prefix} {stats}")
+    return stats
+
+
+def start_replay(
+    questions: List[str],
+    run_one: Callable[[str], Any],
+    log_prefix: str = "[warmup]",
+) -> Optional[threading.Thread]:
+    """replay_questions di background thread; None kalau tidak ada pertanyaan."""
+    if not questions:
+        return None
+    th = threading.Thread(target=replay_questions, args=(questions, run_one, log_prefix), name="warmup", daemon=True)
+    th.start()
+    return th
@@ -0,0 +1,165 @@
+import importlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# dicatat saat modul ini pertama di-import (kurang lebih = awal proses app)
+PROCESS_START = time.time()
+
+STARTUP_MODES = ("background", "lazy", "eager")
+
+
+class StartupProfile:
+    """
+    Catat waktu import + load per komponen. Setelah semua komponen yang diharapkan
+    selesai, 1 baris JSON di-append ke `path` supaya cold start bisa dibandingkan antar deploy.
+    """
+    def __init__(self, mode: str, expected: Sequence[str], path: Optional[str] = None, name: str = ""):
+        self.name = name
+        self.mode = mode
+        self.expected = list(expected)
+        self.path = path
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._flushed = False
+
+    def record(self, name: str, import_s: float, load_s: float, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.rows[name] = {
+                "component": name,
+                "import_s": round(import_s, 3),
+                "load_s": round(load_s, 3),
+                "ready_at_s": round(time.time() - PROCESS_START, 3),
+                "thread": threading.current_thread().name,
+                "error": error,
+            }
+            done = all(n in self.rows for n in self.expected)
+            if done and self.path and not self._flushed:
+                self._flushed = True
+                self._write()
+
+    def report(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self.rows.get(n, {"component": n, "status": "pending"}) for n in self.expected]
+
+    def _write(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        line = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "registry": self.name,
+            "mode": self.mode,
+            "total_s": round(max(r["ready_at_s"] for r in self.rows.values()), 3),
+            "components": list(self.rows.values()),
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+
+class LazyComponent:
+    """
+    Komponen berat yang di-load sekali dan thread-safe:
+    - start(): mulai load di background thread (UI tetap jalan)
+    - get(): ambil nilainya; kalau belum di-load, load sekarang (atau tunggu thread yang sedang load)
+    `imports` di-import dulu supaya waktu import dan waktu load tercatat terpisah.
+    Load yang gagal tidak disimpan permanen (registry hidup selama proses lewat st.cache_resource):
+    get() berikutnya mencoba lagi, error terakhir ada di `last_error`.
+    """
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        imports: Sequence[str] = (),
+        profile: Optional[StartupProfile] = None,
+    ):
+        self.name = name
+        self.loader = loader
+        self.imports = tuple(imports)
+        self.profile = profile
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._done = False
+        self._value: Any = None
+        self.last_error: Optional[BaseException] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._done
+
+    def start(self) -> None:
+        if self._thread is None and not self._done:
+            self._thread = threading.Thread(target=self._load, name=f"load-{self.name}", daemon=True)
+            self._thread.start()
+
+    def get(self) -> Any:
+        error = self._load()
+        if error is not None:
+            raise error
+        return self._value
+
+    def _load(self) -> Optional[BaseException]:
+        """Load kalau belum; return error percobaan ini (None kalau sukses / sudah ter-load)."""
+        with self._lock:  # thread lain yang get() akan menunggu di sini
+            if self._done:
+                return None
+            t0 = time.perf_counter()
+            t1 = t0
+            error: Optional[BaseException] = None
+            try:
+                for mod in self.imports:
+                    importlib.import_module(mod)
+                t1 = time.perf_counter()
+                self._value = self.loader()
+                self._done = True
+            except Exception as e:
+                error = e
+                self._thread = None  # gagal (mis. download model putus): start() / get() berikutnya mencoba lagi
+            finally:
+                t2 = time.perf_counter()
+                self.last_error = error
+                if self.profile is not None:
+                    self.profile.record(
+                        self.name, t1 - t0, t2 - t1,
+                        error=None if error is None else repr(error),
+                    )
+            return error
+
+
+class ComponentRegistry:
+    """Kumpulan LazyComponent + profil startup-nya."""
+    def __init__(self, mode: str = "background", profile_path: Optional[str] = None, name: str = ""):
+        if mode not in STARTUP_MODES:
+            raise ValueError(f"Unknown startup mode: {mode!r}")
+        self.name = name
+        self.mode = mode
+        self.profile_path = profile_path
+        self.components: Dict[str, LazyComponent] = {}
+        self.profile: Optional[StartupProfile] = None
+
+    def add(self, name: str, loader: Callable[[], Any], imports: Sequence[str] = ()) -> LazyComponent:
+        comp = LazyComponent(name, loader, imports=imports)
+        self.components[name] = comp
+        return comp
+
+    def start(self) -> "ComponentRegistry":
+        """Dipanggil sekali setelah semua komponen di-add; perilaku sesuai mode."""
+        self.profile = StartupProfile(self.mode, list(self.components), path=self.profile_path, name=self.name)
+        for comp in self.components.values():
+            comp.profile = self.profile
+        if self.mode == "background":
+            for comp in self.components.values():
+                comp.start()
+        elif self.mode == "eager":
+            for comp in self.components.values():
+                comp._load()
+        return self
+
+    def get(self, name: str) -> Any:
+        return self.components[name].get()
+
+    def __getitem__(self, name: str) -> LazyComponent:
+        return self.components[name]
+
+    def n_ready(self) -> int:
+        return sum(1 for c in self.components.values() if c.ready)
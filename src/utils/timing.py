@@ -0,0 +1,87 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentile sederhana (linear interpolation), q dalam 0-100."""
+    if not values:
+        return 0.0
+    xs = sorted(values)
+    pos = (len(xs) - 1) * (q / 100.0)
+    lo = int(pos)
+    hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (pos - lo)
+
+
+def latency_summary(values_ms: List[float]) -> Dict[str, float]:
+    if not values_ms:
+        return {"n": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    return {
+        "n": len(values_ms),
+        "mean_ms": sum(values_ms) / len(values_ms),
+        "p50_ms": percentile(values_ms, 50),
+        "p95_ms": percentile(values_ms, 95),
+        "max_ms": max(values_ms),
+    }
+
+
+class StageTimer:
+    """Akumulasi durasi (ms) per stage, mis. transform / retrieve / rerank."""
+    def __init__(self):
+        self.ms: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.ms[name] = self.ms.get(name, 0.0) + (time.perf_counter() - t0) * 1000.0
+
+
+class Deadline:
+    """Batas waktu 1 request: budget_ms dihitung dari saat objek dibuat."""
+    def __init__(self, budget_ms: float):
+        self.budget_ms = budget_ms
+        self.t_end = time.perf_counter() + budget_ms / 1000.0
+
+    def remaining_ms(self) -> float:
+        return max(0.0, (self.t_end - time.perf_counter()) * 1000.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining_ms() <= 0.0
+
+    def fits(self, cost_ms: float) -> bool:
+        """True kalau langkah dengan estimasi `cost_ms` masih muat di sisa budget."""
+        return cost_ms <= self.remaining_ms()
+
+
+class StageStats:
+    """
+    Estimasi durasi per stage (EWMA) lintas request, thread-safe.
+    Dipakai untuk memutuskan apakah attempt berikutnya masih muat di sisa budget.
+    """
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self._ewma: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, ms: float) -> None:
+        with self._lock:
+            prev = self._ewma.get(name)
+            self._ewma[name] = ms if prev is None else (1 - self.alpha) * prev + self.alpha * ms
+
+    def estimate(self, name: str, default: float = 0.0) -> float:
+        with self._lock:
+            return self._ewma.get(name, default)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._ewma)
+
+
+# statistik default per proses (dipakai crag_retrieve kalau tidak diberi StageStats sendiri)
+STAGE_STATS = StageStats()
@@ -0,0 +1,73 @@
+import pytest
+
+from src.utils import llm_client as llm_module
+from src.utils.admission import DEGRADATION_LEVELS, AdmissionController, LoadShedError, degradation_plan
+from src.utils.llm_client import LLMClient
+
+
+class Clock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(llm_module.time, "perf_counter", c)
+    return c
+
+
+def saturate(llm: LLMClient, waited_s: float = 30.0, n: int = 20) -> None:
+    for _ in range(n):
+        llm._observe_queue(waited_s)
+
+
+def test_levels_follow_in_flight_and_shed_above_max():
+    adm = AdmissionController(max_in_flight=4, in_flight_levels=[1, 2, 3, 4])
+    assert [adm.acquire() for _ in range(4)] == [0, 1, 2, 3]
+    with pytest.raises(LoadShedError):
+        adm.acquire()
+    for _ in range(4):
+        adm.release()
+    assert adm.acquire() == 0
+    assert adm.stats()["shed"] == 1
+
+
+def test_queue_level_drops_back_when_llm_goes_idle(clock):
+    llm = LLMClient(model="m")
+    adm = AdmissionController(max_in_flight=8)
+    saturate(llm)
+    llm.in_flight = 2  # masih ada call jalan: sinyal antrian dipakai
+    assert adm.acquire(llm=llm) == len(DEGRADATION_LEVELS) - 1
+    adm.release()
+
+    # beban hilang: tidak ada call jalan / antri -> level kembali 0 walau EWMA belum pernah ter-update
+    llm.in_flight = 0
+    assert adm.acquire(llm=llm) == 0
+    adm.release()
+
+
+def test_queue_signal_decays_with_wall_clock(clock):
+    llm = LLMClient(model="m", queue_half_life_s=10.0)
+    adm = AdmissionController(max_in_flight=8)
+    saturate(llm)
+    llm.waiting = 1
+    assert llm.queue_ms() > 12000.0
+    assert adm.acquire(llm=llm) == 4
+    adm.release()
+
+    clock.t += 60.0  # 6 half-life tanpa LLM call (mis. semua request extractive_only)
+    assert llm.queue_ms() < 1000.0
+    assert adm.acquire(llm=llm) == 0
+    adm.release()
+
+
+def test_degradation_plan_is_cumulative():
+    plans = [degradation_plan(level, k_pool=30, k_final=6) for level in range(len(DEGRADATION_LEVELS))]
+    assert [p["transform"] for p in plans] == [True, False, False, False, False]
+    assert [p["corrective"] for p in plans] == [True, True, False, False, False]
+    assert [p["k_pool"] for p in plans] == [30, 30, 30, 15, 15]
+    assert [p["extractive_only"] for p in plans] == [False, False, False, False, True]
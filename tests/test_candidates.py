@@ -0,0 +1,127 @@
+from typing import Dict, List
+
+import numpy as np
+import pytest
+
+from src.retrieval.candidates import CandidatePool
+from src.retrieval.hybrid_retriever import bm25_search, build_bm25, merge_hybrid, rrf_fuse
+
+
+# referensi: pipeline dict sebelum CandidatePool (key = idx, bukan chunk_id)
+def ref_merge_hybrid(dense: List[tuple], lex: List[tuple], w_dense=0.7, w_lex=0.3, topk=30) -> List[int]:
+    lex_max = max([s for _, s in lex] + [1.0])
+    merged: Dict[int, Dict[str, float]] = {}
+    for i, s in dense:
+        row = merged.setdefault(i, {"dense": 0.0, "lex": 0.0})
+        row["dense"] = max(row["dense"], s)
+    for i, s in lex:
+        row = merged.setdefault(i, {"dense": 0.0, "lex": 0.0})
+        row["lex"] = max(row["lex"], s / lex_max)
+    results = [(i, w_dense * r["dense"] + w_lex * r["lex"]) for i, r in merged.items()]
+    results.sort(key=lambda x: x[1], reverse=True)
+    return [i for i, _ in results[:topk]]
+
+
+def ref_rrf(ranked: List[List[int]], k_rrf=60, topk=30) -> List[int]:
+    fused: Dict[int, float] = {}
+    for hits in ranked:
+        for rank, i in enumerate(hits, start=1):
+            fused[i] = fused.get(i, 0.0) + 1.0 / (k_rrf + rank)
+    return [i for i, _ in sorted(fused.items(), key=lambda x: x[1], reverse=True)[:topk]]
+
+
+def pool(idx, **scores) -> CandidatePool:
+    return CandidatePool(idx, **scores)
+
+
+def test_merge_hybrid_matches_dict_pipeline():
+    dense = [(5, 0.75), (2, 0.5), (9, 0.5), (7, 0.25)]
+    lex = [(2, 8.0), (11, 4.0), (5, 2.0), (3, 0.0)]
+    got = merge_hybrid(pool([i for i, _ in dense], dense=[s for _, s in dense]),
+                       pool([i for i, _ in lex], lex=[s for _, s in lex]), topk=10)
+    assert got.idx.tolist() == ref_merge_hybrid(dense, lex, topk=10)
+    # skor lex dinormalisasi dengan max lex, dense tetap
+    j = got.idx.tolist().index(2)
+    assert got.lex[j] == pytest.approx(1.0)
+    assert got.dense[j] == pytest.approx(0.5)
+    assert got.hybrid[j] == pytest.approx(0.7 * 0.5 + 0.3 * 1.0)
+
+
+def test_merge_hybrid_ties_keep_first_seen_order():
+    # semua skor hybrid sama: urutan = kemunculan pertama (dense dulu, lalu lex), bukan urutan idx
+    got = merge_hybrid(pool([9, 4], dense=[0.0, 0.0]), pool([7, 1], lex=[0.0, 0.0]))
+    assert got.idx.tolist() == [9, 4, 7, 1]
+
+
+def test_merge_hybrid_duplicates_take_max_and_topk():
+    got = merge_hybrid(pool([1, 1, 2], dense=[0.25, 0.75, 0.5]), CandidatePool.empty(), topk=1)
+    assert got.idx.tolist() == [1]
+    assert got.dense[0] == pytest.approx(0.75)
+
+
+def test_merge_hybrid_empty_inputs():
+    assert len(merge_hybrid(CandidatePool.empty(), CandidatePool.empty())) == 0
+
+
+def test_rrf_matches_dict_pipeline():
+    ranked = [[3, 1, 4, 5], [1, 5, 9], [2, 6, 5, 3]]
+    got = rrf_fuse([pool(r, dense=np.linspace(1, 0, len(r))) for r in ranked], topk=10)
+    assert got.idx.tolist() == ref_rrf(ranked, topk=10)
+    j = got.idx.tolist().index(5)
+    assert got.hybrid[j] == pytest.approx(1 / 64 + 1 / 62 + 1 / 63)
+
+
+def test_rrf_ties_and_max_scores():
+    # 7 dan 2 sama-sama rank 1 di 1 variant: tie, yang muncul duluan menang
+    got = rrf_fuse([pool([7, 8], dense=[0.25, 0.5]), CandidatePool.empty(), pool([2, 8], lex=[3.0, 6.0])])
+    assert got.idx.tolist() == [8, 7, 2]
+    assert got.dense[0] == pytest.approx(0.5)
+    assert got.lex[0] == pytest.approx(6.0)
+    assert np.isnan(got.rerank).all()
+
+
+def test_rrf_no_pools():
+    assert len(rrf_fuse([])) == 0
+    assert len(rrf_fuse([CandidatePool.empty()])) == 0
+
+
+def test_sort_by_puts_nan_last_stable():
+    p = pool([10, 11, 12, 13], rerank=[np.nan, 0.5, np.nan, 0.5])
+    assert p.sort_by("rerank").idx.tolist() == [11, 13, 10, 12]
+
+
+def test_exclude_and_concat_keep_order_and_scores():
+    a = pool([4, 2, 8], dense=[0.5, 0.25, 0.75], rerank=[1.0, np.nan, 2.0])
+    b = pool([1, 2], lex=[3.0, 4.0])
+    rest = a.exclude(b.idx)
+    assert rest.idx.tolist() == [4, 8]
+    assert rest.rerank.tolist() == [1.0, 2.0]
+    both = rest.concat(b)
+    assert both.idx.tolist() == [4, 8, 1, 2]
+    assert both.lex.tolist() == [0.0, 0.0, 3.0, 4.0]
+    assert np.isnan(both.rerank[2:]).all()
+    assert both.head(10).idx.tolist() == [4, 8, 1, 2]
+
+
+def test_to_hits_omits_unranked_rerank():
+    payload = [{"chunk_id": f"c{i}", "text": f"t{i}"} for i in range(3)]
+    hits = pool([2, 0], rerank=[0.5, np.nan]).to_hits(payload)
+    assert [h["chunk_id"] for h in hits] == ["c2", "c0"]
+    assert hits[0]["score_rerank"] == 0.5
+    assert "score_rerank" not in hits[1]
+
+
+def test_bm25_restrict_scores_subset_only():
+    pytest.importorskip("rank_bm25")
+    payload = [{"text": t} for t in [
+        "cuti akademik mahasiswa", "wisuda sarjana", "cuti bersama dosen", "biaya kuliah", "cuti cuti cuti"]]
+    bm25 = build_bm25(payload)
+    full = bm25_search(bm25, "cuti", topk=3)
+    assert full.idx.tolist()[0] == 4
+    sub = bm25_search(bm25, "cuti", topk=5, restrict=np.array([0, 1, 2]))
+    assert set(sub.idx.tolist()) == {0, 1, 2}
+    # skor restrict == skor penuh untuk chunk yang sama
+    everything = bm25_search(bm25, "cuti", topk=5)
+    scores = dict(zip(everything.idx.tolist(), everything.lex))
+    for i, s in zip(sub.idx.tolist(), sub.lex):
+        assert s == pytest.approx(scores[i])
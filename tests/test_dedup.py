@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from src.indexing.dedup import dedup_chunks, rerank_pool_shrink
+from src.retrieval.section_index import build_sections, section_members
+
+CLAUSE = ("mahasiswa yang tidak melakukan registrasi administrasi pada semester berjalan "
+          "dinyatakan berstatus non aktif dan wajib mengurus surat keterangan ke fakultas")
+
+
+def chunk(cid, text, bab, section, page):
+    return {"chunk_id": cid, "text": text, "bab": bab, "section": section, "page_start": page, "page_end": page}
+
+
+@pytest.fixture
+def chunks():
+    return [
+        chunk("c0", "cuti akademik diajukan paling lambat dua minggu sebelum perkuliahan dimulai", "BAB I", "Cuti", 3),
+        chunk("c1", CLAUSE, "BAB I", "Registrasi", 4),
+        chunk("c2", "yudisium dilaksanakan setiap akhir semester oleh fakultas masing masing", "BAB II", "Yudisium", 9),
+        chunk("c3", CLAUSE + ".", "BAB III", "Status Mahasiswa", 15),
+    ]
+
+
+def test_dedup_collapses_copies_with_provenance(chunks):
+    kept, st = dedup_chunks(chunks)
+    assert [c["chunk_id"] for c in kept] == ["c0", "c1", "c2"]
+    assert kept[1]["duplicates"][0]["chunk_id"] == "c3"
+    assert kept[1]["duplicates"][0]["section"] == "Status Mahasiswa"
+    assert st["removed"] == 1 and st["clusters"] == 1
+    assert st["index_shrink"] == pytest.approx(0.25)
+
+
+def test_dedup_keeps_distinct_chunks(chunks):
+    kept, st = dedup_chunks(chunks[:3])
+    assert len(kept) == 3 and st["removed"] == 0
+    assert all("duplicates" not in c for c in kept)
+
+
+def test_shared_clause_stays_in_every_section(chunks):
+    kept, _ = dedup_chunks(chunks)
+    sections = {s["section"]: s for s in build_sections(kept)}
+    assert sections["Registrasi"]["chunk_idx"] == [1]
+    assert sections["Status Mahasiswa"]["chunk_idx"] == [1]
+    assert sections["Status Mahasiswa"]["page_start"] == 15
+    members = section_members(kept)
+    assert members[("BAB III", "Status Mahasiswa")].tolist() == [1]
+    assert members[("BAB I", "Cuti")].tolist() == [0]
+
+
+def test_rerank_pool_shrink_counts_copies(chunks):
+    pytest.importorskip("rank_bm25")
+    kept, _ = dedup_chunks(chunks)
+    ps = rerank_pool_shrink(chunks, kept, k_pool=4, n_queries=4)
+    # pool = semua 4 chunk, 1 di antaranya salinan
+    assert ps["pool_slots_avg"] == pytest.approx(4.0)
+    assert ps["pool_unique_avg"] == pytest.approx(3.0)
+    assert ps["pool_shrink"] == pytest.approx(0.25)
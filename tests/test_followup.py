@@ -0,0 +1,113 @@
+import threading
+
+import numpy as np
+import pytest
+
+from src.retrieval import followup
+from src.retrieval.followup import ConversationState, followup_retrieve
+from src.retrieval.reranker import Reranker
+from src.retrieval.section_index import section_members
+from src.utils.text_utils import tokenize_basic
+from src.utils.timing import StageStats
+
+PAYLOAD = [
+    {"chunk_id": "cuti-1", "bab": "BAB I", "section": "Cuti", "text": "prosedur cuti akademik dan syarat pengajuan"},
+    {"chunk_id": "cuti-2", "bab": "BAB I", "section": "Cuti", "text": "lama cuti akademik paling lama dua semester"},
+    {"chunk_id": "wisuda-1", "bab": "BAB IV", "section": "Wisuda", "text": "syarat wisuda sarjana dan jadwal wisuda"},
+]
+
+
+class OverlapReranker(Reranker):
+    """Cross-encoder tiruan: skor = (porsi token query yang ada di chunk)^2."""
+    def __init__(self):
+        self.cache = None
+        self._lock = threading.Lock()
+        self.queries = []
+
+    def _predict(self, items):
+        out = []
+        for q, _, text in items:
+            self.queries.append(q)
+            qt, tt = tokenize_basic(q), set(tokenize_basic(text))
+            out.append((sum(t in tt for t in qt) / len(qt)) ** 2)
+        return np.asarray(out, dtype=np.float32)
+
+
+@pytest.fixture
+def fallback(monkeypatch):
+    calls = []
+
+    def fake_crag(question, *args, **kwargs):
+        calls.append(question)
+        top = [{"chunk_id": "wisuda-1", "payload": PAYLOAD[2], "score_rerank": 1.0}]
+        return top, {"mode": "sequential", "attempts": [], "timings_ms": {}, "pool_idx": [2]}
+
+    monkeypatch.setattr(followup, "crag_retrieve", fake_crag)
+    return calls
+
+
+def state_after_cuti() -> ConversationState:
+    state = ConversationState()
+    state.update("prosedur cuti akademik", [{"payload": PAYLOAD[0]}], [0])
+    return state
+
+
+def run(question, state):
+    return followup_retrieve(question, state, None, None, PAYLOAD, None, OverlapReranker(), None,
+                             k_final=2, min_rerank=0.2, min_cov=0.05)
+
+
+def test_same_topic_uses_cached_pool(fallback):
+    state = state_after_cuti()
+    top, debug = run("berapa lama cuti akademik", state)
+    assert debug["mode"] == "followup"
+    assert fallback == []
+    assert {t["chunk_id"] for t in top} == {"cuti-1", "cuti-2"}
+    assert state.turns == 2
+
+
+def test_topic_change_falls_back_to_full_retrieval(fallback):
+    # "prev + follow-up" masih mencocokkan chunk cuti di atas threshold; skor follow-up sendiri tidak
+    state = state_after_cuti()
+    top, debug = run("syarat wisuda sarjana", state)
+    assert fallback == ["syarat wisuda sarjana"]
+    assert debug["attempts"][0]["rerank_top_with_context"] >= 0.2
+    assert not debug["attempts"][0]["ok"]
+    assert top[0]["chunk_id"] == "wisuda-1"
+    assert state.section == ("BAB IV", "Wisuda")
+
+
+def test_anchor_question_survives_two_hops(fallback):
+    state = state_after_cuti()
+    run("berapa lama cuti akademik", state)
+    rr = OverlapReranker()
+    top, debug = followup_retrieve("syarat pengajuan", state, None, None, PAYLOAD, None, rr, None,
+                                   k_final=2, min_rerank=0.2, min_cov=0.05)
+    assert debug["mode"] == "followup"
+    assert state.question == "prosedur cuti akademik"
+    assert rr.queries[0] == "prosedur cuti akademik syarat pengajuan"
+    assert state.turns == 3
+
+
+def test_section_members_built_once():
+    dup = dict(PAYLOAD[2], duplicates=[{"bab": "BAB I", "section": "Cuti"}])
+    members = section_members(PAYLOAD[:2] + [dup])
+    assert members[("BAB I", "Cuti")].tolist() == [0, 1, 2]
+    assert members[("BAB IV", "Wisuda")].tolist() == [2]
+
+    state = state_after_cuti()
+    state.pool_idx = np.zeros(0, dtype=np.int64)
+    assert state.candidates(members).idx.tolist() == [0, 1, 2]
+    assert state.candidates(members, limit=2).idx.tolist() == [0, 1]
+
+
+def test_spent_budget_skips_fallback(fallback):
+    state = state_after_cuti()
+    stats = StageStats()
+    stats.observe("attempt", 60_000.0)
+    top, debug = followup_retrieve("syarat wisuda sarjana", state, None, None, PAYLOAD, None, OverlapReranker(), None,
+                                   k_final=2, min_rerank=0.2, min_cov=0.05, budget_ms=1000, stage_stats=stats)
+    assert top == [] and fallback == []
+    assert debug["budget_exhausted"]
+    assert "followup" in stats.snapshot()
+    assert not state.has_context
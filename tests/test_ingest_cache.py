@@ -0,0 +1,69 @@
+import pytest
+
+pdfplumber = pytest.importorskip("pdfplumber")
+
+from scripts.ingest_pdf import PageCache, extract_pages, page_content_hash
+
+TOUNICODE_A = (b"/CIDInit /ProcSet findresource begin 12 dict begin begincmap 1 begincodespacerange <00> <FF> "
+               b"endcodespacerange 1 beginbfchar <41> <0041> endbfchar endcmap end end")
+
+
+def make_pdf(path, form_text: bytes, tounicode: bytes = TOUNICODE_A, obj_shift: int = 0):
+    """PDF 1 halaman: teks ada di dalam Form XObject (/Fm1 Do), font dengan ToUnicode."""
+    form = b"BT /F1 12 Tf 20 20 Td (" + form_text + b") Tj ET"
+    content = b"q /Fm1 Do Q"
+    n = 3 + obj_shift  # obj_shift: nomor objek berbeda, isi sama (PDF ditulis ulang)
+    objs = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: b"<< /Type /Pages /Kids [%d 0 R] /Count 1 >>" % n,
+        n: (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 200 100] /Contents %d 0 R "
+            b"/Resources << /XObject << /Fm1 %d 0 R >> >> >>" % (n + 1, n + 2)),
+        n + 1: b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream",
+        n + 2: (b"<< /Type /XObject /Subtype /Form /BBox [0 0 200 100] /Resources << /Font << /F1 %d 0 R >> >> "
+                b"/Length %d >>\nstream\n" % (n + 3, len(form)) + form + b"\nendstream"),
+        n + 3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /ToUnicode %d 0 R >>" % (n + 4),
+        n + 4: b"<< /Length %d >>\nstream\n" % len(tounicode) + tounicode + b"\nendstream",
+    }
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for num in sorted(objs):
+        offsets[num] = len(out)
+        out += b"%d 0 obj\n" % num + objs[num] + b"\nendobj\n"
+    size = max(objs) + 1
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for num in range(1, size):
+        out += (b"%010d 00000 n \n" % offsets[num]) if num in offsets else b"0000000000 65535 f \n"
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref)
+    path.write_bytes(bytes(out))
+    return str(path)
+
+
+def page_hash(path):
+    with pdfplumber.open(path) as pdf:
+        return page_content_hash(pdf.pages[0])
+
+
+def test_hash_stable_for_same_content_and_renumbered_objects(tmp_path):
+    a = page_hash(make_pdf(tmp_path / "a.pdf", b"AAA"))
+    assert a == page_hash(make_pdf(tmp_path / "b.pdf", b"AAA"))
+    assert a == page_hash(make_pdf(tmp_path / "c.pdf", b"AAA", obj_shift=5))
+
+
+def test_hash_changes_with_form_xobject_only(tmp_path):
+    # content stream halaman identik ("/Fm1 Do"); yang berubah hanya isi XObject
+    assert page_hash(make_pdf(tmp_path / "a.pdf", b"AAA")) != page_hash(make_pdf(tmp_path / "b.pdf", b"AAB"))
+
+
+def test_hash_changes_with_tounicode_only(tmp_path):
+    other = TOUNICODE_A.replace(b"<0041>", b"<0042>")
+    assert page_hash(make_pdf(tmp_path / "a.pdf", b"AAA")) != page_hash(make_pdf(tmp_path / "b.pdf", b"AAA", other))
+
+
+def test_cache_hit_only_when_page_unchanged(tmp_path):
+    cache = PageCache(str(tmp_path / "cache"))
+    extract_pages(make_pdf(tmp_path / "v1.pdf", b"AAA"), cache=cache)
+    extract_pages(make_pdf(tmp_path / "v1b.pdf", b"AAA"), cache=cache)
+    pages = extract_pages(make_pdf(tmp_path / "v2.pdf", b"AAB"), cache=cache)
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+    assert pages[0]["page"] == 1
@@ -0,0 +1,25 @@
+from src.utils.query_log import QueryLog, normalize_question, top_questions
+
+
+def test_normalize_question():
+    assert normalize_question("  Bagaimana   prosedur CUTI? ") == "bagaimana prosedur cuti"
+
+
+def test_top_questions_groups_by_key_and_returns_raw_text(tmp_path):
+    log = QueryLog(str(tmp_path / "q.jsonl"))
+    for q in ["Bagaimana prosedur cuti?", "Bagaimana prosedur cuti?", "bagaimana prosedur cuti", "Syarat wisuda?"]:
+        log.append(q, 100.0, "answer")
+    for _ in range(5):
+        log.append("Apa itu DO?", 50.0, "abstain")
+
+    top = top_questions(log.path, n=5)
+    # teks asli (yang dipakai cache embedding / rerank / transform), bukan key ternormalisasi
+    assert top == ["Bagaimana prosedur cuti?", "Syarat wisuda?"]
+    assert "Apa itu DO?" in top_questions(log.path, n=5, answered_only=False)
+
+
+def test_top_questions_reads_old_rows_without_key(tmp_path):
+    path = tmp_path / "q.jsonl"
+    path.write_text('{"question": "cuti", "outcome": "answer"}\n{"question": "Cuti?", "outcome": "answer"}\n{bad\n',
+                    encoding="utf-8")
+    assert top_questions(str(path)) == ["cuti"]
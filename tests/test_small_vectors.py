@@ -0,0 +1,70 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.indexing import index_config
+from src.indexing.small_vectors import SmallProjection
+from src.retrieval.hybrid_retriever import default_small_projection
+
+
+def unit_rows(n, d, seed=0):
+    x = np.random.default_rng(seed).normal(size=(n, d)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("method", ["pca", "truncate"])
+def test_fit_project_shapes_and_norm(method):
+    vecs = unit_rows(50, 32)
+    proj = SmallProjection.fit(vecs, 8, method=method)
+    out = proj.project(vecs)
+    assert proj.dim == 8 and out.shape == (50, 8) and out.dtype == np.float32
+    assert np.allclose(np.linalg.norm(out, axis=1), 1.0, atol=1e-5)
+    assert proj.project(vecs[0]).shape == (8,)
+
+
+def test_fit_rejects_invalid_dims():
+    with pytest.raises(ValueError):
+        SmallProjection.fit(unit_rows(50, 32), 32)
+    with pytest.raises(ValueError):
+        SmallProjection.fit(unit_rows(5, 32), 8, method="pca")  # cuma 5 komponen PCA
+    assert SmallProjection.fit(unit_rows(5, 32), 8, method="truncate").dim == 8
+
+
+def test_save_load_roundtrip(tmp_path):
+    vecs = unit_rows(40, 16)
+    proj = SmallProjection.fit(vecs, 4)
+    path = str(tmp_path / "proj.npz")
+    proj.save(path)
+    loaded = SmallProjection.load(path, oversampling=2.0)
+    assert loaded.method == "pca" and loaded.oversampling == 2.0
+    assert np.allclose(loaded.project(vecs), proj.project(vecs))
+    assert SmallProjection.load(str(tmp_path / "missing.npz")) is None
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    path = tmp_path / "index_config.json"
+    monkeypatch.setattr(index_config, "INDEX_CONFIG_PATH", str(path))
+    default_small_projection.cache_clear()
+    yield lambda **cfg: path.write_text(json.dumps(cfg), encoding="utf-8")
+    default_small_projection.cache_clear()
+
+
+def test_default_projection_off_without_small_dim(config):
+    config(small_dim=None)
+    assert default_small_projection() is None
+
+
+def test_default_projection_missing_file_is_a_clear_error(config, tmp_path):
+    config(small_dim=8, small_projection=str(tmp_path / "nope.npz"))
+    with pytest.raises(FileNotFoundError, match="small_dim=8"):
+        default_small_projection()
+
+
+def test_default_projection_dim_mismatch(config, tmp_path):
+    path = str(tmp_path / "proj.npz")
+    SmallProjection.fit(unit_rows(40, 16), 4).save(path)
+    config(small_dim=8, small_projection=path)
+    with pytest.raises(ValueError, match="dim 4"):
+        default_small_projection()
@@ -0,0 +1,40 @@
+import pytest
+
+from src.utils.startup import ComponentRegistry, LazyComponent
+
+
+def flaky(fail_times: int):
+    calls = {"n": 0}
+
+    def loader():
+        calls["n"] += 1
+        if calls["n"] <= fail_times:
+            raise OSError("download putus")
+        return "model"
+    return loader, calls
+
+
+def test_failed_load_is_retried_on_next_get():
+    loader, calls = flaky(1)
+    comp = LazyComponent("embedder", loader)
+    with pytest.raises(OSError):
+        comp.get()
+    assert not comp.ready
+    assert isinstance(comp.last_error, OSError)
+
+    assert comp.get() == "model"
+    assert comp.ready and comp.last_error is None
+    assert comp.get() == "model"
+    assert calls["n"] == 2  # sukses tidak di-load ulang
+
+
+def test_failure_at_boot_recovers_via_get():
+    loader, calls = flaky(1)
+    reg = ComponentRegistry(mode="eager")
+    reg.add("bm25", loader)
+    reg.start()  # load gagal saat boot, tidak melempar
+    assert not reg["bm25"].ready
+    assert reg.get("bm25") == "model"
+    assert reg.n_ready() == 1
+    # profil mencatat percobaan terakhir (sukses)
+    assert reg.profile.report()[0]["error"] is None
@@ -0,0 +1,97 @@
+import httpx
+import pytest
+
+from src.generation.ollama_generate import OllamaAnswerer
+from src.utils import llm_client as llm_module
+from src.utils.llm_client import LLMClient
+from src.utils.timing import Deadline, StageStats
+
+TOP = [{
+    "chunk_id": "c0",
+    "score_rerank": 0.9,
+    "payload": {"chunk_id": "c0", "bab": "BAB I", "section": "Cuti", "page_start": 3, "page_end": 3,
+                "text": "Cuti akademik diajukan paling lambat dua minggu sebelum perkuliahan dimulai."},
+}]
+
+
+class RecordingLLM(LLMClient):
+    def __init__(self):
+        super().__init__(model="m")
+        self.invoked = []
+
+    def invoke(self, prompt, inputs, **kwargs):
+        self.invoked.append(kwargs)
+        raise AssertionError("LLM tidak boleh dipanggil")
+
+
+def test_deadline_and_fits():
+    d = Deadline(10_000)
+    assert not d.expired
+    assert d.fits(100) and not d.fits(60_000)
+    gone = Deadline(0)
+    assert gone.expired and gone.remaining_ms() == 0.0
+    assert gone.fits(0)  # itulah sebabnya answerer juga cek expired
+
+
+def test_stage_stats_ewma():
+    st = StageStats(alpha=0.5)
+    assert st.estimate("rerank", default=7.0) == 7.0
+    st.observe("rerank", 100.0)
+    st.observe("rerank", 200.0)
+    assert st.estimate("rerank") == pytest.approx(150.0)
+    assert st.snapshot() == {"rerank": pytest.approx(150.0)}
+
+
+def test_expired_budget_answers_extractively_without_llm():
+    llm = RecordingLLM()
+    answerer = OllamaAnswerer(model="m", llm=llm)
+    assert answerer.avg_llm_ms() == 0.0  # belum ada data durasi: fits(0) selalu True
+    ans = answerer.answer("bagaimana prosedur cuti?", TOP, deadline=Deadline(0))
+    assert llm.invoked == []
+    assert "Cuti akademik" in ans
+    assert answerer.counts["budget_extractive"] == 1
+
+
+def test_call_timeout_is_per_request_on_one_transport():
+    transport = llm_module._call_timeout_transport()
+    seen = []
+    transport._inner = httpx.MockTransport(
+        lambda req: seen.append(req.extensions["timeout"]["read"]) or httpx.Response(200, json={}))
+    client = httpx.Client(transport=transport, timeout=120.0)
+
+    client.get("http://ollama/api/chat")
+    token = llm_module._CALL_TIMEOUT.set(2.5)
+    try:
+        client.get("http://ollama/api/chat")
+    finally:
+        llm_module._CALL_TIMEOUT.reset(token)
+    client.get("http://ollama/api/chat")
+    assert seen == [120.0, 2.5, 120.0]
+
+
+def test_is_timeout_error():
+    req = httpx.Request("POST", "http://ollama/api/chat")
+    assert llm_module.is_timeout_error(httpx.ReadTimeout("slow", request=req))
+    assert llm_module.is_timeout_error(llm_module.LLMBusyError("full"))
+    assert llm_module.is_timeout_error(TimeoutError())
+    assert not llm_module.is_timeout_error(httpx.ConnectError("down", request=req))
+
+    class TimeoutConfigError(ValueError):
+        pass
+
+    assert not llm_module.is_timeout_error(TimeoutConfigError())  # nama kelas saja tidak cukup
+
+
+def test_spent_budget_abstains_unless_partial_gate_opted_in():
+    from src.retrieval.candidates import CandidatePool
+    from src.retrieval.crag import _best_so_far
+
+    best = (0.5, TOP, CandidatePool([0]))  # rerank lolos, coverage tidak
+    debug = {}
+    assert _best_so_far(best, 0.1, debug) == []
+    assert debug == {"budget_exhausted": True, "partial_gate": False}
+
+    debug = {}
+    assert _best_so_far(best, 0.1, debug, allow_partial=True) == TOP
+    assert debug["partial_gate"] and debug["pool_idx"] == [0]
+    assert _best_so_far(best, 0.9, {}, allow_partial=True) == []